@@ -58,7 +58,23 @@ else
 	echo "===> SEED_PRODUCTS not set (or !=1) — skipping product seeding"
 fi
 
+# Background work the web requests depend on: the payment webhook inbox is
+# only applied to orders by process_webhooks, and run_periodic_jobs releases
+# expired stock holds, reconciles missed payments and purges idempotency keys.
+# Each loop restarts its command if it exits. Set RUN_BACKGROUND_JOBS=0 when
+# these run as a separate service instead (see Procfile / railway.toml).
+if [ "${RUN_BACKGROUND_JOBS:-1}" = "1" ]; then
+	echo "===> Starting background jobs (webhook inbox, periodic maintenance)"
+	(while true; do python manage.py process_webhooks --forever || echo "process_webhooks exited; restarting in 5s"; sleep 5; done) &
+	(while true; do python manage.py run_periodic_jobs || echo "run_periodic_jobs exited; restarting in 5s"; sleep 5; done) &
+else
+	echo "===> RUN_BACKGROUND_JOBS=0 — webhook worker and periodic jobs must run elsewhere"
+fi
+
 PORT_TO_BIND=${PORT:-8000}
 
+# Threaded workers: a request waiting on Cashfree holds one thread, not the
+# whole worker (the gateway bulkhead is CASHFREE_MAX_CONCURRENT per worker)
 echo "===> Starting Gunicorn on 0.0.0.0:${PORT_TO_BIND}"
-exec gunicorn wellness_project.wsgi:application --bind 0.0.0.0:${PORT_TO_BIND} --workers 3 --timeout 120
+exec gunicorn wellness_project.wsgi:application --bind 0.0.0.0:${PORT_TO_BIND} \
+	--workers ${WEB_CONCURRENCY:-3} --worker-class gthread --threads ${GUNICORN_THREADS:-8} --timeout 120
@@ -114,9 +114,11 @@ const ProductCard = ({ product }) => {
               <span className="original-price">₹{product.original_price?.toLocaleString()}</span>
             )}
           </div>
-          {product.bulk_discount && (
+          {product.bulk_tiers?.length > 0 && (
             <div className="bulk-discount">
-              <small>Bulk discount available</small>
+              <small>
+                Buy {product.bulk_tiers[0].min_quantity}+ and save {Number(product.bulk_tiers[0].percent)}%
+              </small>
             </div>
           )}
         </div>
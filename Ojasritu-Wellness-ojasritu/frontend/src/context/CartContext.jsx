@@ -82,17 +82,34 @@ export function CartProvider({ children }) {
     [refresh] // refresh is now stable, so this is safe
   );
 
+  // Several changes in one request; the response is the updated cart,
+  // so no follow-up refresh is needed.
+  const applyBatch = useCallback(async (operations) => {
+    if (!operations.length) return { ok: true };
+    try {
+      const data = await cartAPI.batch(operations);
+      setRawCart(data);
+      return { ok: true };
+    } catch (e) {
+      console.error('❌ Cart batch failed:', e);
+      return {
+        ok: false,
+        status: e?.status,
+        error: e?.data?.error || e?.message || "Failed to update cart",
+      };
+    }
+  }, []);
+
+  const updateQuantity = useCallback(
+    (cartItemId, quantity) => applyBatch([{ op: 'set', item_id: cartItemId, quantity }]),
+    [applyBatch]
+  );
+
   const clearCart = useCallback(async () => {
-    // No backend clear endpoint; remove items one-by-one.
     const currentItems = rawCart?.items || [];
     console.log(`🧹 Clearing cart: removing ${currentItems.length} items`);
-    for (const it of currentItems) {
-      // best-effort
-      // eslint-disable-next-line no-await-in-loop
-      await cartAPI.removeItem(it.id).catch(() => {});
-    }
-    await refresh();
-  }, [rawCart, refresh]);
+    await applyBatch(currentItems.map((it) => ({ op: 'remove', item_id: it.id })));
+  }, [rawCart, applyBatch]);
 
   // FIX #4: Memoize items to prevent unnecessary re-renders
   // Only recalculate when rawCart actually changes
@@ -138,6 +155,8 @@ export function CartProvider({ children }) {
       items,
       addItem,
       removeItem,
+      updateQuantity,
+      applyBatch,
       clearCart,
       refresh,
       loading,
@@ -145,7 +164,7 @@ export function CartProvider({ children }) {
       totalCount: totals.totalCount,
       totalPrice: totals.totalPrice,
     }),
-    [items, addItem, removeItem, clearCart, refresh, loading, error, totals]
+    [items, addItem, removeItem, updateQuantity, applyBatch, clearCart, refresh, loading, error, totals]
   );
 
   return (
@@ -40,7 +40,8 @@ export default function Cart() {
         }).catch(() => ({ ok: false }));
 
         if (apiResponse?.ok) {
-          const ordersData = await apiResponse.json();
+          const data = await apiResponse.json();
+          const ordersData = Array.isArray(data?.results) ? data.results : (Array.isArray(data) ? data : []);
           // Transform API response to match expected format
           const orders = Array.isArray(ordersData) 
             ? ordersData.map(order => ({
@@ -4,8 +4,16 @@ import "./Checkout.css";
 import { useCart } from "../context/CartContext";
 import { cashfreeAPI } from "../services/apiService";
 
+const newIdempotencyKey = () =>
+  typeof crypto !== "undefined" && crypto.randomUUID
+    ? crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
 export default function Checkout() {
   const { items, totalPrice, refresh } = useCart();
+  // One key per cart state: double clicks and retries replay the same
+  // Cashfree order, while a changed cart gets a fresh one
+  const idempotencyKey = useMemo(newIdempotencyKey, [items]);
   const [paymentStatus, setPaymentStatus] = useState(null);
   const [receipt, setReceipt] = useState(null);
   const [submitting, setSubmitting] = useState(false);
@@ -16,7 +24,7 @@ export default function Checkout() {
     setSubmitting(true);
     setError(null);
     try {
-      const res = await cashfreeAPI.createOrder();
+      const res = await cashfreeAPI.createOrder(idempotencyKey);
       
       if (res.payment_redirect_url) {
         // Redirect to Cashfree payment page
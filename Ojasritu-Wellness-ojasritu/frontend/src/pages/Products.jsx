@@ -22,16 +22,13 @@ const Products = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        // Fetch products using API service
-        const productData = await productsAPI.getAll();
+        // Listing is cursor-paginated; filtering below is client-side, so load every page
+        const productList = await productsAPI.getAllPages();
         
         // Log response for debugging (log once)
-        console.log("✅ Products API Response:", productData);
+        console.log("✅ Products API Response:", productList);
 
-        // Ensure data is array and filter active products
-        const activeProducts = Array.isArray(productData)
-          ? productData.filter((p) => p.status === "active")
-          : [];
+        const activeProducts = productList.filter((p) => p.status === "active");
 
         setAllProducts(activeProducts);
 
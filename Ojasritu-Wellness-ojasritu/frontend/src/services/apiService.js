@@ -108,6 +108,26 @@ const fetchWithErrorHandling = async (url, options = {}) => {
   }
 };
 
+/**
+ * Follow cursor pagination (`{results, next}`) to the end and return every row.
+ * `next` is an absolute URL; only its path below /api and its query are reused.
+ */
+const fetchAllPages = async (url) => {
+  const rows = [];
+  let nextUrl = url;
+  while (nextUrl) {
+    const data = await fetchWithErrorHandling(nextUrl);
+    if (!Array.isArray(data?.results)) {
+      return Array.isArray(data) ? data : rows;
+    }
+    rows.push(...data.results);
+    if (!data.next) break;
+    const next = new URL(data.next, window.location.origin);
+    nextUrl = `${next.pathname.replace(/^\/api/, '')}${next.search}`;
+  }
+  return rows;
+};
+
 /**
  * PRODUCTS API
  */
@@ -119,11 +139,23 @@ export const productsAPI = {
     return fetchWithErrorHandling(url);
   },
 
+  // Get every product page (largest page size, so a few requests) as one array
+  getAllPages: async (params = {}) => {
+    const queryString = new URLSearchParams({ page_size: 100, ...params }).toString();
+    return fetchAllPages(`/products/?${queryString}`);
+  },
+
   // Get single product by slug
   getBySlug: async (slug) => {
     return fetchWithErrorHandling(`/products/${slug}/`);
   },
 
+  // Get several products in one request, in the given order
+  getBySlugs: async (slugs) => {
+    const query = slugs.map(encodeURIComponent).join(',');
+    return fetchWithErrorHandling(`/products/batch/?slugs=${query}`);
+  },
+
   // Get products by category
   getByCategory: async (category) => {
     return fetchWithErrorHandling(`/products/?category=${category}`);
@@ -173,6 +205,15 @@ export const cartAPI = {
       method: 'DELETE',
     });
   },
+
+  // Apply several changes in one request; returns the updated cart.
+  // operations: [{ op: 'add' | 'set' | 'remove', product_id | item_id, quantity }]
+  batch: async (operations) => {
+    return fetchWithErrorHandling('/cart/batch/', {
+      method: 'POST',
+      body: JSON.stringify({ operations }),
+    });
+  },
 };
 
 /**
@@ -273,10 +314,12 @@ export const prebookAPI = {
  * CASHFREE PAYMENT API
  */
 export const cashfreeAPI = {
-  // Create a Cashfree order for cart
-  createOrder: async () => {
+  // Create a Cashfree order for cart. Reuse the same idempotencyKey for
+  // retries of one checkout so the server replays instead of re-ordering.
+  createOrder: async (idempotencyKey) => {
     return fetchWithErrorHandling('/cashfree/create/', {
       method: 'POST',
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
     });
   },
 };
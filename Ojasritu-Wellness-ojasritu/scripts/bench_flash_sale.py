@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Flash sale on a single SKU: many concurrent checkouts racing for little stock.
+Usage: python scripts/bench_flash_sale.py [--stock 200] [--buyers 2000] [--threads 32] [--gateway-ms 40]
+
+Compares shop.inventory.reserve (conditional UPDATE in a short transaction,
+gateway call after commit) with the row-lock approach it replaces
+(SELECT ... FOR UPDATE, check, save, gateway call while the lock is held).
+The lock variant needs SELECT ... FOR UPDATE and is skipped on SQLite; on
+PostgreSQL it shows the convoy: every buyer queues behind the previous
+buyer's gateway round trip. Both must sell exactly --stock units. SQLite
+serialises all writers behind one file lock, so its tail latency reflects
+that lock rather than the statement under test.
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchutil import setup_django, throwaway_database
+
+setup_django()
+
+from django.db import connection, connections, transaction
+
+from shop import inventory
+from shop.models import Category, Order, Product, StockReservation
+
+_ids = iter(range(10 ** 9))
+_ids_lock = threading.Lock()
+
+
+def next_order_id():
+    with _ids_lock:
+        return f'FLASH-{next(_ids)}'
+
+
+def new_order():
+    return Order.objects.create(
+        order_id=next_order_id(), total_amount=100, final_amount=100, payment_method='cashfree',
+    )
+
+
+def conditional(product_id, gateway_s):
+    with transaction.atomic():
+        order = new_order()
+        try:
+            inventory.reserve(order, [(product_id, 1)])
+        except inventory.OutOfStock:
+            transaction.set_rollback(True)
+            return False
+    time.sleep(gateway_s)
+    return True
+
+
+def row_lock(product_id, gateway_s):
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product_id)
+        if product.quantity_in_stock < 1:
+            return False
+        new_order()
+        product.quantity_in_stock -= 1
+        product.save(update_fields=['quantity_in_stock'])
+        time.sleep(gateway_s)
+    return True
+
+
+def run(strategy, product_id, buyers, threads, gateway_s):
+    latencies = []
+
+    def buyer(_):
+        start = time.perf_counter()
+        try:
+            sold = strategy(product_id, gateway_s)
+        finally:
+            connections.close_all()
+        latencies.append((time.perf_counter() - start) * 1000)
+        return sold
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        sold = sum(pool.map(buyer, range(buyers)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return sold, elapsed, latencies
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stock', type=int, default=200)
+    parser.add_argument('--buyers', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--gateway-ms', type=float, default=40, help='Simulated Cashfree create-order latency')
+    args = parser.parse_args()
+
+    strategies = [('conditional UPDATE', conditional)]
+    if connection.features.has_select_for_update:
+        strategies.append(('SELECT FOR UPDATE', row_lock))
+
+    with throwaway_database(file_backed=True):
+        category = Category.objects.create(name='Bench', slug='bench')
+        product = Product.objects.create(
+            name='Launch Kit', slug='launch-kit', sku='LAUNCH-1', price=999, category=category,
+            dosha_type='tridosha', image='products/p.png', quantity_in_stock=args.stock,
+        )
+        print(f'{args.buyers} buyers, {args.threads} threads, {args.stock} units, '
+              f'{args.gateway_ms:g} ms gateway ({connection.vendor})\n')
+        if not connection.features.has_select_for_update:
+            print('SELECT FOR UPDATE variant skipped: not supported by this backend\n')
+        for label, strategy in strategies:
+            Product.objects.filter(pk=product.pk).update(quantity_in_stock=args.stock)
+            StockReservation.objects.all().delete()
+            Order.objects.all().delete()
+            sold, elapsed, latencies = run(strategy, product.pk, args.buyers, args.threads, args.gateway_ms / 1000)
+            product.refresh_from_db(fields=['quantity_in_stock'])
+            print(f'{label:<20} {args.buyers / elapsed:8.0f} checkouts/s   '
+                  f'p50 {statistics.median(latencies):7.1f} ms   p99 {percentile(latencies, 0.99):8.1f} ms   '
+                  f'max {latencies[-1]:8.1f} ms')
+            print(f'{"":<20} sold {sold}, left {product.quantity_in_stock}, '
+                  f'oversold {max(0, sold - args.stock)}, '
+                  f'stock accounted for: {sold + product.quantity_in_stock == args.stock}\n')
+
+
+if __name__ == '__main__':
+    main()
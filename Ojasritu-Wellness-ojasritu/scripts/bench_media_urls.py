@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Serialize product cards with per-object build_absolute_uri() versus shop/media.py.
+Usage: python scripts/bench_media_urls.py [--products 1000] [--repeat 7]
+
+Products are unsaved in-memory instances, so only serialization is measured.
+"""
+import argparse
+
+from benchutil import report, setup_django, timed
+
+setup_django()
+
+from django.conf import settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from shop.api import ProductSerializer
+from shop.media import _storage_url
+from shop.models import Category, Product
+
+
+class BuildAbsoluteURISerializer(ProductSerializer):
+    """The previous get_image: storage URL plus build_absolute_uri per product."""
+
+    def get_image(self, obj):
+        if not obj.image:
+            return None
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(obj.image.url)
+        return obj.image.url
+
+
+def products(n):
+    category = Category(id=1, name='Bench', slug='bench')
+    return [
+        Product(
+            id=i, name=f'Churna {i}', slug=f'churna-{i}', sku=f'B-{i}', description='d', benefits='b',
+            ingredients='i', price=100, category=category, dosha_type='vata',
+            image=f'products/churna-{i}.png',
+        )
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    rows = products(args.products)
+    host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS and settings.ALLOWED_HOSTS[0] != '*' else 'localhost'
+
+    def serialize(serializer_class, fields=None):
+        query = f'?fields={fields}' if fields else ''
+        request = Request(APIRequestFactory().get(f'/api/products/{query}', HTTP_HOST=host))
+        return serializer_class(rows, many=True, context={'request': request}).data
+
+    print(f'Serializing {args.products} products\n')
+    for fields in (None, 'image'):
+        label = 'all fields' if fields is None else 'image only'
+        report(f'build_absolute_uri  ({label})', timed(lambda: serialize(BuildAbsoluteURISerializer, fields), args.repeat))
+        _storage_url.cache_clear()
+        report(f'media_url, cold     ({label})', timed(lambda: serialize(ProductSerializer, fields), 1))
+        report(f'media_url, warm     ({label})', timed(lambda: serialize(ProductSerializer, fields), args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Price 10k carts with shop/pricing.py, with and without the memoized tier parsing.
+Usage: python scripts/bench_pricing.py [--carts 10000] [--products 500] [--repeat 5]
+
+Products are unsaved in-memory instances, so only pricing is measured.
+"""
+import argparse
+import random
+from decimal import Decimal
+
+from benchutil import report, setup_django, timed
+
+setup_django()
+
+from shop import pricing
+from shop.models import Product
+
+TIER_TABLES = [{}, {'10': 10}, {'10': 10, '50': 15}, {'5': 5, '20': 12.5, '100': 20}, {'3': '7.5'}]
+
+
+def catalog(n, rng):
+    products = []
+    for i in range(n):
+        price = Decimal(rng.randint(9900, 249900)) / 100
+        products.append(Product(
+            id=i, price=price, discount_price=price * Decimal('0.9') if rng.random() < 0.3 else None,
+            bulk_discount=dict(rng.choice(TIER_TABLES)),
+        ))
+    return products
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--carts', type=int, default=10000)
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    products = catalog(args.products, rng)
+    carts = [
+        [(rng.choice(products), rng.choice((1, 1, 2, 3, 5, 10, 12, 25, 60))) for _ in range(rng.randint(1, 8))]
+        for _ in range(args.carts)
+    ]
+    lines = sum(len(cart) for cart in carts)
+    print(f'{args.carts} carts, {lines} lines, {args.products} products\n')
+
+    def run():
+        for cart in carts:
+            pricing.price_cart(cart)
+
+    def run_naive():
+        # Same arithmetic, but the tier table is parsed for every line
+        for cart in carts:
+            total = pricing.ZERO
+            for product, quantity in cart:
+                base = pricing.base_unit_price(product)
+                percent = pricing.ZERO
+                for tier in pricing._parse_tiers.__wrapped__((product.bulk_discount or {}).items()):
+                    if quantity >= tier.min_quantity:
+                        percent = tier.percent
+                        break
+                total += (pricing._discounted(base, percent) if percent else base) * quantity
+
+    report('parse tiers on every line', timed(run_naive, args.repeat))
+    pricing._parse_tiers.cache_clear()
+    report('pricing.price_cart (memoized tiers)', timed(run, args.repeat))
+    info = pricing._parse_tiers.cache_info()
+    print(f'\ntier table cache: {info.currsize} entries, {info.hits} hits, {info.misses} misses')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Compare indexed product search against the old icontains scan on a large catalog.
+Usage: python scripts/bench_search.py [--products 100000] [--repeat 5] [--no-memory]
+"""
+import argparse
+import random
+import time
+
+from benchutil import report, setup_django, throwaway_database, timed
+
+setup_django()
+
+from django.db.models import Q
+
+from shop import search
+from shop.models import Category, Product
+from shop.search_index import ProductSearchIndex
+
+HERBS = ['ashwagandha', 'triphala', 'amla', 'brahmi', 'shatavari', 'guduchi', 'neem', 'tulsi',
+         'haritaki', 'bibhitaki', 'guggulu', 'shallaki', 'manjistha', 'arjuna', 'giloy', 'moringa']
+HINDI = ['अश्वगंधा', 'त्रिफला', 'आंवला', 'ब्राह्मी', 'शतावरी', 'गुडूची', 'नीम', 'तुलसी']
+FORMS = ['churna', 'capsule', 'oil', 'tablet', 'juice', 'ghrita', 'kwath', 'avaleha']
+QUERIES = ['ashwagandha', 'triph', 'amla juice', 'शतावरी', 'neem oil', 'guggulu tablet', 'xyzzy']
+
+
+def seed(n, batch=5000):
+    rng = random.Random(7)
+    # Filler vocabulary so descriptions look like prose rather than keyword lists
+    filler = [''.join(rng.choices('abcdeghiklmnoprstuvy', k=rng.randint(3, 9))) for _ in range(5000)]
+    category = Category.objects.create(name='Bench', slug='bench')
+    rows = []
+    for i in range(n):
+        herb, form = rng.choice(HERBS), rng.choice(FORMS)
+        rows.append(Product(
+            name=f'{herb.title()} {form.title()} {i}', hindi_name=rng.choice(HINDI),
+            slug=f'bench-{i}', sku=f'BENCH-{i}',
+            description=' '.join(rng.choices(filler, k=30) + [rng.choice(HERBS)]),
+            benefits='पाचन सुधार, ऊर्जा वृद्धि, प्रतिरक्षा ' + rng.choice(HINDI),
+            ingredients=', '.join(rng.sample(HERBS, 2)),
+            price=100, category=category, dosha_type='vata', image='products/p.png',
+        ))
+        if len(rows) == batch:
+            Product.objects.bulk_create(rows)
+            rows = []
+    Product.objects.bulk_create(rows)
+    search.rebuild_index()
+
+
+def icontains(query):
+    condition = Q()
+    for token in search.tokenize(query):
+        condition &= Q(name__icontains=token) | Q(description__icontains=token)
+    return list(Product.objects.filter(condition, status='active').values_list('id', flat=True)[:20])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-memory', action='store_true', help='Skip the in-process index')
+    args = parser.parse_args()
+
+    with throwaway_database():
+        print(f'Seeding {args.products} products ...')
+        seed(args.products)
+        print(f'Backend: {search.backend()}\n')
+        index = None
+        if not args.no_memory:
+            index = ProductSearchIndex()
+            start = time.perf_counter()
+            index.rebuild()
+            print(f'In-process index built in {time.perf_counter() - start:.1f} s\n')
+        for query in QUERIES:
+            report(f'icontains  {query!r}', timed(lambda: icontains(query), args.repeat))
+            report(f'{search.backend():<10} {query!r}', timed(lambda: search.ranked_ids(query, 20), args.repeat))
+            if index is not None:
+                report(f'memory     {query!r}', timed(lambda: index.search(query, 20), args.repeat, number=20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Shared helpers for the scripts/bench_*.py micro-benchmarks.
+
+Benchmarks run against a throwaway database created the same way the test
+runner does it (an in-memory SQLite DB locally, ``test_<name>`` on
+PostgreSQL), so they never touch development or production data.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.insert(0, str(PROJECT_ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wellness_project.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def throwaway_database(file_backed=False):
+    """``file_backed`` puts a SQLite test DB in a temporary file so threaded
+    benchmarks wait on the database lock instead of failing with "table is
+    locked" as the shared in-memory DB does. It has no effect elsewhere."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    if file_backed and connection.vendor == 'sqlite':
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tempfile.gettempdir(), 'ojasritu_bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def timed(fn, repeat=5, number=1):
+    """Run ``fn`` ``number`` times per round and return per-call timings in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) * 1000 / number)
+    return samples
+
+
+def report(label, samples):
+    print(f'{label:<44} median {statistics.median(samples):9.3f} ms   min {min(samples):9.3f} ms')
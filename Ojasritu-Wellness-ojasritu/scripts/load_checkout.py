@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Load test: catalog latency while checkouts wait on a slow payment gateway.
+Usage: python scripts/load_checkout.py [--gateway-ms 2000] [--duration 10] [--workers 3] [--threads 8]
+
+Runs the app under gunicorn twice, once with sync workers and once with
+gthread workers (the Procfile setting), against a throwaway SQLite file and
+a local stand-in for Cashfree that answers after --gateway-ms. Each run
+measures /api/products/ latency alone, then again while --checkout-clients
+keep calling /api/cashfree/create/. With sync workers every worker ends up
+parked on the gateway and catalog latency climbs to the gateway delay; with
+gthread workers and the CASHFREE_MAX_CONCURRENT bulkhead it stays flat and
+excess checkouts get a fast 503.
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchutil import PROJECT_ROOT, setup_django
+
+SETTINGS_TEMPLATE = '''
+from wellness_project.settings import *  # noqa
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+DATABASES = {{'default': {{'ENGINE': 'django.db.backends.sqlite3', 'NAME': {db!r}, 'OPTIONS': {{'timeout': 30}}}}}}
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def slow_gateway(delay_s):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            time.sleep(delay_s)
+            data = json.dumps({'order_id': body.get('order_id'), 'payment_session_id': 'load-test'}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def seed(users):
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from rest_framework.authtoken.models import Token
+
+    from shop.models import Cart, CartItem, Category, Product, Profile
+
+    call_command('migrate', verbosity=0)
+    category = Category.objects.create(name='Load', slug='load')
+    products = [
+        Product.objects.create(
+            name=f'Load Herb {i}', slug=f'load-{i}', sku=f'LOAD-{i}', price=100 + i, category=category,
+            dosha_type='vata', image='products/p.png', quantity_in_stock=10 ** 6,
+        )
+        for i in range(30)
+    ]
+    tokens = []
+    for i in range(users):
+        user = User.objects.create_user(username=f'load{i}', email=f'load{i}@example.com')
+        Profile.objects.create(user=user, phone='9876543210')
+        CartItem.objects.create(cart=Cart.objects.create(customer=user), product=products[i % len(products)])
+        tokens.append(Token.objects.create(user=user).key)
+    return tokens
+
+
+def start_gunicorn(worker_class, args, env):
+    port = free_port()
+    command = [
+        sys.executable, '-m', 'gunicorn', 'wellness_project.wsgi:application', '--bind', f'127.0.0.1:{port}',
+        # gunicorn silently switches sync workers to gthread when --threads > 1
+        '--workers', str(args.workers), '--worker-class', worker_class,
+        '--threads', str(args.threads if worker_class == 'gthread' else 1),
+        '--timeout', '120', '--log-level', 'warning',
+    ]
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env)
+    base = f'http://127.0.0.1:{port}'
+    import requests
+    for _ in range(100):
+        try:
+            if requests.get(f'{base}/api/products/', timeout=2).ok:
+                return process, base
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f'gunicorn ({worker_class}) did not come up on {base}')
+
+
+def hammer(base, duration, catalog_clients, checkout_tokens):
+    import requests
+
+    stop = time.monotonic() + duration
+    catalog_ms, checkout_codes = [], []
+    lock = threading.Lock()
+
+    def browse():
+        session = requests.Session()
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            try:
+                session.get(f'{base}/api/products/', timeout=120)
+            except requests.ConnectionError:
+                # gunicorn closed an idle keep-alive connection; reconnect
+                continue
+            with lock:
+                catalog_ms.append((time.perf_counter() - start) * 1000)
+
+    def checkout(token):
+        session = requests.Session()
+        session.headers['Authorization'] = f'Token {token}'
+        while time.monotonic() < stop:
+            try:
+                code = session.post(f'{base}/api/cashfree/create/', json={}, timeout=120).status_code
+            except requests.ConnectionError:
+                code = 'dropped'
+            with lock:
+                checkout_codes.append(code)
+
+    threads = [threading.Thread(target=browse) for _ in range(catalog_clients)]
+    threads += [threading.Thread(target=checkout, args=(token,)) for token in checkout_tokens]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(catalog_ms), checkout_codes
+
+
+def describe(label, samples, codes=None):
+    if not samples:
+        print(f'  {label:<28} no catalog responses')
+        return
+    p99 = samples[min(len(samples) - 1, int(0.99 * len(samples)))]
+    line = (f'  {label:<28} catalog p50 {statistics.median(samples):8.1f} ms   p99 {p99:8.1f} ms   '
+            f'max {samples[-1]:8.1f} ms   ({len(samples)} requests)')
+    if codes:
+        counts = {code: codes.count(code) for code in sorted(set(codes), key=str)}
+        line += '   checkouts ' + ', '.join(f'{code}: {n}' for code, n in counts.items())
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--gateway-ms', type=float, default=2000)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--catalog-clients', type=int, default=4)
+    parser.add_argument('--checkout-clients', type=int, default=12)
+    parser.add_argument('--max-concurrent', type=int, default=4, help='CASHFREE_MAX_CONCURRENT per worker')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ojasritu-load-')
+    with open(os.path.join(workdir, 'load_settings.py'), 'w') as f:
+        f.write(SETTINGS_TEMPLATE.format(db=os.path.join(workdir, 'load.sqlite3')))
+    sys.path.insert(0, workdir)
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'load_settings'
+    gateway = slow_gateway(args.gateway_ms / 1000)
+    env = {
+        **os.environ,
+        'PYTHONPATH': os.pathsep.join([workdir, str(PROJECT_ROOT), os.environ.get('PYTHONPATH', '')]),
+        'CASHFREE_API_BASE': f'http://127.0.0.1:{gateway.server_port}/pg',
+        'CASHFREE_APP_ID': 'load', 'CASHFREE_SECRET_KEY': 'load',
+        'CASHFREE_MAX_CONCURRENT': str(args.max_concurrent),
+        'CASHFREE_READ_TIMEOUT': str(args.gateway_ms / 1000 + 30),
+    }
+    os.environ.update({k: env[k] for k in ('CASHFREE_API_BASE', 'CASHFREE_APP_ID', 'CASHFREE_SECRET_KEY')})
+
+    try:
+        setup_django()
+        tokens = seed(args.checkout_clients)
+        print(f'{args.workers} workers, gateway {args.gateway_ms:g} ms, {args.catalog_clients} catalog clients, '
+              f'{args.checkout_clients} checkout clients, {args.duration:g} s per phase\n')
+        for worker_class in ('sync', 'gthread'):
+            process, base = start_gunicorn(worker_class, args, env)
+            try:
+                print(f'{worker_class} workers' + (f' x {args.threads} threads' if worker_class == 'gthread' else ''))
+                describe('catalog only', hammer(base, args.duration, args.catalog_clients, [])[0])
+                describe('catalog + slow checkouts', *hammer(base, args.duration, args.catalog_clients, tokens))
+                print()
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+    finally:
+        gateway.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
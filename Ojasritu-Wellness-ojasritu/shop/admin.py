@@ -1,8 +1,9 @@
 from django.contrib import admin
 from .models import (
     Category, Product, ProductReview, Cart, CartItem,
-    Order, Booking, Rebooking, Article, FAQ, ContactMessage, GurukulNotification, BlogPost
+    Order, StockReservation, WebhookEvent, Booking, Rebooking, Article, FAQ, ContactMessage, GurukulNotification, BlogPost
 )
+from .ratings import AGGREGATE_FIELDS
 
 # ✅ CATEGORY ADMIN
 @admin.register(Category)
@@ -19,7 +20,8 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ['status', 'category', 'dosha_type', 'is_bestseller', 'is_featured', 'is_organic', 'created_at']
     search_fields = ['name', 'hindi_name', 'description', 'sku']
     prepopulated_fields = {'slug': ('name',)}
-    readonly_fields = ['image_preview', 'created_at', 'updated_at']
+    # Review aggregates are maintained by shop/ratings.py; hand edits would drift
+    readonly_fields = ['image_preview', *AGGREGATE_FIELDS, 'created_at', 'updated_at']
     
     def image_preview(self, obj):
         """Display product image thumbnail in admin"""
@@ -65,6 +67,24 @@ class OrderAdmin(admin.ModelAdmin):
     readonly_fields = ['order_id', 'created_at', 'updated_at']
 
 
+# ✅ STOCK RESERVATION ADMIN
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['order', 'product', 'quantity', 'status', 'expires_at', 'updated_at']
+    list_filter = ['status']
+    search_fields = ['order__order_id', 'product__name', 'product__sku']
+    raw_id_fields = ['order', 'product']
+
+
+# ✅ WEBHOOK INBOX ADMIN
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['dedupe_key', 'provider', 'received_at', 'processed_at', 'outcome', 'attempts']
+    list_filter = ['provider', 'outcome']
+    search_fields = ['order_ref', 'dedupe_key']
+    readonly_fields = ['provider', 'dedupe_key', 'order_ref', 'payment_status', 'body', 'headers', 'received_at']
+
+
 # ✅ BOOKING ADMIN
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
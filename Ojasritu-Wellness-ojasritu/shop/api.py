@@ -1,10 +1,13 @@
 from rest_framework import serializers, viewsets, routers, status
 from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.urls import path, include
 from django.middleware.csrf import get_token
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.db.models import Prefetch
 from .models import (
     Category, Product, ProductReview, Cart, CartItem,
     Order, Rebooking, Article, FAQ, ContactMessage, GurukulNotification
@@ -27,22 +30,59 @@ from google.auth.transport import requests as google_requests
 from django.core.files.base import ContentFile
 import requests
 
+from . import carts, facets, inventory, pricing, recommendations, search, webhooks
+from .search_index import product_index
+from .fieldsets import (
+    FIELDS_PARAM, OMIT_PARAM, SparseFieldsetMixin, SparseFieldsetSerializerMixin,
+    normalize_param as normalize_fieldset_param,
+)
+from .media import MediaURLSerializerMixin, absolute, media_url
+from .idempotency import idempotent
+from .cache import CONTENT, CatalogCacheMixin, ConditionalGetMixin, cached_catalog_data, cached_catalog_many, catalog_cache_stats
+
 # Import Cashfree helpers
-from .cashfree import create_cashfree_order, verify_signature, normalize_status, CashfreeError
+from .cashfree import (
+    create_cashfree_order, verify_signature, CashfreeError, GatewayBusy, gateway_slot,
+)
 
 
 # ===== SERIALIZERS =====
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(MediaURLSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'hindi_name', 'slug', 'description', 'icon', 'background_image']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+# Sort options for /api/products/<slug>/reviews/; each ends in a unique key for
+# keyset pagination and matches an index on ProductReview
+REVIEW_ORDERINGS = {
+    'recent': ('-created_at', '-id'),
+    'helpful': ('-helpful_count', '-created_at', '-id'),
+    'rating': ('-rating', '-created_at', '-id'),
+}
+EMBEDDED_REVIEWS = 5
+
+
+class ProductSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     discount_percentage = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
+    bulk_tiers = serializers.SerializerMethodField()
+    
+    # ?fields=card: what a product tile renders, without the long text fields
+    field_presets = {
+        'card': (
+            'id', 'name', 'hindi_name', 'slug', 'price', 'discount_price', 'discount_percentage',
+            'category_name', 'image', 'dosha_type', 'quantity_in_stock', 'is_bestseller',
+            'rating', 'total_reviews', 'bulk_tiers',
+        ),
+    }
+    model_field_sources = {
+        'category_name': ('category__name',),
+        'discount_percentage': ('price', 'discount_price'),
+        'bulk_tiers': ('bulk_discount', 'price', 'discount_price'),
+    }
     
     class Meta:
         model = Product
@@ -50,7 +90,14 @@ class ProductSerializer(serializers.ModelSerializer):
             'id', 'name', 'hindi_name', 'slug', 'description', 'benefits',
             'ingredients', 'price', 'discount_price', 'discount_percentage',
             'category', 'category_name', 'image', 'dosha_type', 'quantity_in_stock',
-            'is_bestseller', 'is_featured', 'rating', 'status', 'sku'
+            'is_bestseller', 'is_featured', 'rating', 'total_reviews', 'status', 'sku', 'bulk_tiers'
+        ]
+    
+    def get_bulk_tiers(self, obj):
+        """Quantity discounts for listing badges, e.g. "10+ units: 10% off"."""
+        return [
+            {'min_quantity': t['min_quantity'], 'percent': str(t['percent']), 'unit_price': str(t['unit_price'])}
+            for t in pricing.tier_badges(obj)
         ]
     
     def get_discount_percentage(self, obj):
@@ -60,23 +107,33 @@ class ProductSerializer(serializers.ModelSerializer):
     
     def get_image(self, obj):
         """Return full absolute image URL for production."""
-        if not obj.image:
-            return None
-        request = self.context.get('request')
-        if request is not None:
-            return request.build_absolute_uri(obj.image.url)
-        # Fallback to relative URL
-        return obj.image.url if obj.image else None
+        # Relative when serialized without a request (e.g. the search index)
+        return media_url(obj.image, self.context.get('request'))
 
 
 class ProductDetailSerializer(ProductSerializer):
     reviews = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
+    
+    model_field_sources = {
+        **ProductSerializer.model_field_sources,
+        'reviews': (),
+        'rating_histogram': tuple(f'rating_{star}_count' for star in range(1, 6)),
+    }
     
     class Meta(ProductSerializer.Meta):
-        fields = ProductSerializer.Meta.fields + ['usage_instructions', 'scientific_research', 'gallery', 'reviews']
+        fields = ProductSerializer.Meta.fields + [
+            'usage_instructions', 'scientific_research', 'gallery', 'rating_histogram', 'reviews'
+        ]
+    
+    def get_rating_histogram(self, obj):
+        return obj.get_rating_histogram()
     
     def get_reviews(self, obj):
-        reviews = obj.reviews.all()[:5]
+        # Prefetched (already sliced) by ProductViewSet.get_queryset
+        reviews = getattr(obj, 'top_reviews', None)
+        if reviews is None:
+            reviews = obj.reviews.select_related('customer').order_by(*REVIEW_ORDERINGS['recent'])[:EMBEDDED_REVIEWS]
         return ProductReviewSerializer(reviews, many=True).data
 
 
@@ -92,26 +149,56 @@ class ProductReviewSerializer(serializers.ModelSerializer):
 class CartItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.IntegerField(write_only=True)
+    unit_price = serializers.SerializerMethodField()
+    bulk_discount_percent = serializers.SerializerMethodField()
     total_price = serializers.SerializerMethodField()
     
     class Meta:
         model = CartItem
-        fields = ['id', 'product', 'product_id', 'quantity', 'total_price', 'added_at']
+        fields = ['id', 'product', 'product_id', 'quantity', 'unit_price', 'bulk_discount_percent',
+                  'total_price', 'added_at']
+    
+    def _line(self, obj):
+        # Priced once per item and shared by the three price fields
+        line = getattr(obj, '_line_price', None)
+        if line is None or line.quantity != obj.quantity:
+            line = obj._line_price = pricing.price_line(obj.product, obj.quantity)
+        return line
+    
+    def get_unit_price(self, obj):
+        return self._line(obj).unit_price
+    
+    def get_bulk_discount_percent(self, obj):
+        return self._line(obj).discount_percent
     
     def get_total_price(self, obj):
-        return obj.get_total_price()
+        return self._line(obj).total
 
 
 class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
+    subtotal = serializers.SerializerMethodField()
+    discount = serializers.SerializerMethodField()
     total_price = serializers.SerializerMethodField()
     
     class Meta:
         model = Cart
-        fields = ['id', 'customer', 'items', 'total_price', 'created_at']
+        fields = ['id', 'customer', 'items', 'subtotal', 'discount', 'total_price', 'created_at']
+    
+    def _quote(self, obj):
+        quote = getattr(obj, '_price_quote', None)
+        if quote is None:
+            quote = obj._price_quote = pricing.price_cart(obj.items.all())
+        return quote
+    
+    def get_subtotal(self, obj):
+        return self._quote(obj).subtotal
+    
+    def get_discount(self, obj):
+        return self._quote(obj).discount
     
     def get_total_price(self, obj):
-        return obj.get_total_price()
+        return self._quote(obj).total
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -140,7 +227,7 @@ class RebookingSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class ArticleSerializer(serializers.ModelSerializer):
+class ArticleSerializer(MediaURLSerializerMixin, serializers.ModelSerializer):
     author_name = serializers.CharField(source='author.username', read_only=True)
     
     class Meta:
@@ -171,36 +258,180 @@ class GurukulNotificationSerializer(serializers.ModelSerializer):
 
 # ===== VIEWSETS =====
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     lookup_field = 'slug'
 
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(ConditionalGetMixin, CatalogCacheMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = ProductSerializer
     lookup_field = 'slug'
+    cache_params = facets.FILTER_PARAMS + (FIELDS_PARAM, OMIT_PARAM)
+    # Meta.ordering columns, needed to build pagination cursors
+    always_load = ('id', 'is_featured', 'is_bestseller', 'created_at')
+    batch_max = 50
+
+    def normalize_cache_param(self, name, value):
+        if name in ('bestseller', 'organic', 'featured'):
+            # get_queryset treats any non-empty value as "only these"
+            return '1' if value else ''
+        if name in (FIELDS_PARAM, OMIT_PARAM):
+            return normalize_fieldset_param(value)
+        return value
     
     def get_queryset(self):
-        queryset = Product.objects.filter(status='active')
-        category = self.request.query_params.get('category')
-        dosha = self.request.query_params.get('dosha')
-        bestseller = self.request.query_params.get('bestseller')
-        
-        if category:
-            queryset = queryset.filter(category__slug=category)
-        if dosha:
-            queryset = queryset.filter(dosha_type=dosha)
-        if bestseller:
-            queryset = queryset.filter(is_bestseller=True)
-        
-        return queryset
+        # category_name is rendered for every product, so join it up front
+        queryset = Product.objects.filter(status='active').select_related('category')
+        fields = self.get_requested_fields()
+        if self.action == 'retrieve' and (fields is None or 'reviews' in fields):
+            # Sliced prefetch: one query returns at most EMBEDDED_REVIEWS per product
+            recent = ProductReview.objects.select_related('customer').order_by(*REVIEW_ORDERINGS['recent'])
+            queryset = queryset.prefetch_related(
+                Prefetch('reviews', queryset=recent[:EMBEDDED_REVIEWS], to_attr='top_reviews')
+            )
+        queryset = self.sparse_queryset(queryset)
+        return facets.apply_filters(queryset, facets.selected_filters(self.request.query_params))
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return ProductDetailSerializer
         return ProductSerializer
 
+    @action(detail=False, methods=['get'], pagination_class=None, url_path='facets')
+    def facet_counts(self, request):
+        """Counts per category, dosha and flag for the currently applied filters.
+
+        Each facet is counted against the other filters only, so the sidebar can
+        show what switching a value would return.
+        """
+        return Response(facets.product_facets(request.query_params))
+
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def search(self, request):
+        """Ranked product search over name, Hindi name, description, benefits and ingredients.
+
+        Served from the in-process index (shop/search_index.py) unless
+        PRODUCT_SEARCH_BACKEND is set to 'database'.
+        """
+        query = (request.query_params.get('q') or '').strip()
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 50))
+        except ValueError:
+            limit = 20
+        if not query:
+            results = []
+        elif getattr(settings, 'PRODUCT_SEARCH_BACKEND', 'memory') == 'database':
+            products = search.search_products(query, self.get_queryset(), limit=limit)
+            results = self.get_serializer(products, many=True).data
+        else:
+            results = self.render_cards(product_index.search(query, limit=limit))
+        return Response({'query': query, 'count': len(results), 'results': results})
+
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def batch(self, request):
+        """Hydrate several products in one request: ``?ids=3,1,7`` or ``?slugs=a,b``.
+
+        Results keep the requested order; unknown or inactive products are
+        listed under ``missing``. Each product is cached individually.
+        """
+        ids = request.query_params.get('ids')
+        slugs = request.query_params.get('slugs')
+        if bool(ids) == bool(slugs):
+            return Response({'error': 'Pass exactly one of "ids" or "slugs"'}, status=status.HTTP_400_BAD_REQUEST)
+        lookup = 'id' if ids else 'slug'
+        values = list(dict.fromkeys(v.strip() for v in (ids or slugs).split(',') if v.strip()))
+        if len(values) > self.batch_max:
+            return Response({'error': f'At most {self.batch_max} products per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if lookup == 'id':
+            try:
+                values = [int(v) for v in values]
+            except ValueError:
+                return Response({'error': 'ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        cards = self.product_cards(lookup, values)
+        results = self.render_cards(cards[v] for v in values if v in cards)
+        return Response({'results': results, 'missing': [v for v in values if v not in cards]})
+
+    @action(detail=True, methods=['get'], pagination_class=None)
+    def related(self, request, slug=None):
+        """Products frequently bought together with this one.
+
+        Lists come from ``manage.py build_bought_together``; products without
+        purchase history fall back to the same category and dosha.
+        """
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 8)), recommendations.TOP_K))
+        except ValueError:
+            limit = 8
+
+        # Resolve the slug first (through the per-product card cache, which
+        # stores nothing for unknown slugs) so junk slugs cannot fill the cache
+        card = self.product_cards('slug', [slug]).get(slug)
+        if card is None:
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        product_id = card['id']
+
+        def build():
+            product = Product.objects.only('id', 'category_id', 'dosha_type').get(pk=product_id)
+            ids = recommendations.related_ids(product, recommendations.TOP_K)
+            cards = self.product_cards('id', ids)
+            return [cards[pk] for pk in ids if pk in cards]
+
+        # One cache read per request; rebuilt when the catalog version moves
+        related = cached_catalog_data(f'related:{product_id}', build)
+        return Response({'results': self.render_cards(related[:limit])})
+
+    def product_cards(self, lookup, values):
+        """Card payloads keyed by ``lookup`` value, each cached per product."""
+        def load(missing):
+            products = list(
+                Product.objects.filter(status='active', **{f'{lookup}__in': missing}).select_related('category')
+            )
+            # Serialized without a request so entries are host-independent
+            payloads = ProductSerializer(products, many=True).data
+            return {getattr(product, lookup): payload for product, payload in zip(products, payloads)}
+
+        return cached_catalog_many(f'product:{lookup}', values, load)
+
+    @action(detail=True, methods=['get'])
+    def reviews(self, request, slug=None):
+        """Cursor-paginated reviews with ``?sort=recent|helpful|rating``.
+
+        The star histogram comes from the product's stored aggregates.
+        """
+        sort = request.query_params.get('sort') or 'recent'
+        if sort not in REVIEW_ORDERINGS:
+            return Response({'error': f'sort must be one of: {", ".join(REVIEW_ORDERINGS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        product = get_object_or_404(
+            Product.objects.only('id', 'rating', 'total_reviews', *(f'rating_{star}_count' for star in range(1, 6))),
+            slug=slug, status='active',
+        )
+        reviews = (ProductReview.objects.filter(product=product).select_related('customer')
+                   .order_by(*REVIEW_ORDERINGS[sort]))
+        page = self.paginator.paginate_queryset(reviews, request, view=self)
+        response = self.paginator.get_paginated_response(ProductReviewSerializer(page, many=True).data)
+        response.data.update({
+            'sort': sort,
+            'rating': product.rating,
+            'total_reviews': product.total_reviews,
+            'histogram': product.get_rating_histogram(),
+        })
+        return response
+
+    def render_cards(self, cards):
+        """Apply ?fields=/?omit= and absolute image URLs to cached card payloads."""
+        fields = self.get_requested_fields()
+        results = []
+        for card in cards:
+            card = dict(card) if fields is None else {name: card[name] for name in fields if name in card}
+            if card.get('image'):
+                card['image'] = absolute(card['image'], self.request)
+            results.append(card)
+        return results
+
 
 class ProductReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ProductReviewSerializer
@@ -208,18 +439,30 @@ class ProductReviewViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return ProductReview.objects.filter(product__slug=self.kwargs.get('product_slug'))
     
+    # Rating aggregates on Product are adjusted by signals; keep them in the
+    # same transaction as the review row.
+    @transaction.atomic
     def perform_create(self, serializer):
         product = Product.objects.get(slug=self.kwargs.get('product_slug'))
         serializer.save(product=product, customer=self.request.user)
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
 
 
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     
     def get_queryset(self):
+        queryset = Order.objects.select_related('customer')
         if self.request.user.is_staff:
-            return Order.objects.all()
-        return Order.objects.filter(customer=self.request.user)
+            return queryset
+        return queryset.filter(customer=self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(customer=self.request.user)
@@ -229,21 +472,24 @@ class RebookingViewSet(viewsets.ModelViewSet):
     serializer_class = RebookingSerializer
     
     def get_queryset(self):
+        queryset = Rebooking.objects.select_related('customer')
         if self.request.user.is_staff:
-            return Rebooking.objects.all()
-        return Rebooking.objects.filter(customer=self.request.user)
+            return queryset
+        return queryset.filter(customer=self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(customer=self.request.user)
 
 
-class ArticleViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Article.objects.filter(is_published=True)
+class ArticleViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    conditional_namespace = CONTENT
+    queryset = Article.objects.filter(is_published=True).select_related('author')
     serializer_class = ArticleSerializer
     lookup_field = 'slug'
 
 
-class FAQViewSet(viewsets.ReadOnlyModelViewSet):
+class FAQViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    conditional_namespace = CONTENT
     queryset = FAQ.objects.filter(is_active=True)
     serializer_class = FAQSerializer
     
@@ -266,6 +512,13 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
         return ContactMessage.objects.filter(email=self.request.user.email)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def catalog_cache_status(request):
+    """Hit/miss counters and current version of the catalog response cache."""
+    return Response(catalog_cache_stats())
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def ojas_gurukul_notify(request):
@@ -302,7 +555,7 @@ def ojas_gurukul_notify(request):
 
 
 # ===== PROFILE SERIALIZER & VIEW =====
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(MediaURLSerializerMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     email = serializers.CharField(source='user.email', read_only=True)
 
@@ -355,39 +608,42 @@ def add_to_cart(request):
         return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
     
     product_id = request.data.get('product_id')
-    quantity = request.data.get('quantity', 1)
+    quantity = carts.parse_quantity(request.data.get('quantity', 1))
     
     if not product_id:
         return Response({'error': 'product_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if quantity is None:
+        return Response({'error': f'quantity must be a whole number between 1 and {carts.MAX_QUANTITY}'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
         product = Product.objects.get(id=product_id, status='active')
     except Product.DoesNotExist:
         return Response({'error': 'Product not found or inactive'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Get or create cart for user
-    cart, created = Cart.objects.get_or_create(customer=request.user)
-    
-    # Get or create cart item
-    cart_item, item_created = CartItem.objects.get_or_create(
-        cart=cart,
-        product=product,
-        defaults={'quantity': quantity}
-    )
-    
-    if not item_created:
-        # Item exists, update quantity
-        cart_item.quantity += int(quantity)
-        cart_item.save()
+    with transaction.atomic():
+        # quantity = quantity + n in the database, so concurrent taps both count;
+        # the cart lock keeps the add out of a batch's read-fold-write
+        cart = carts.lock_cart(request.user)
+        carts.add_item(cart, product, quantity)
+        
+        # Total and line count from one joined query, priced in a single pass
+        quote = cart.get_price_quote()
     
     return Response({
         'success': True,
         'message': f'{product.name} added to cart',
-        'cart_total': float(cart.get_total_price()),
-        'cart_items_count': cart.items.count()
+        'cart_total': float(quote.total),
+        'cart_items_count': len(quote.lines)
     }, status=status.HTTP_200_OK)
 
 
+def _carts_with_items():
+    # Items, products and categories in one query; CartSerializer prices from it
+    return Cart.objects.prefetch_related(
+        Prefetch('items', queryset=CartItem.objects.select_related('product__category'))
+    )
+
+
 @api_view(['GET'])
 def get_cart(request):
     """Get user's cart contents"""
@@ -395,7 +651,7 @@ def get_cart(request):
         return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
-        cart = Cart.objects.get(customer=request.user)
+        cart = _carts_with_items().get(customer=request.user)
         serializer = CartSerializer(cart, context={'request': request})
         return Response(serializer.data)
     except Cart.DoesNotExist:
@@ -413,60 +669,122 @@ def remove_from_cart(request, item_id):
         return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
     
     try:
-        cart = Cart.objects.get(customer=request.user)
-        cart_item = CartItem.objects.get(id=item_id, cart=cart)
-        product_name = cart_item.product.name
-        cart_item.delete()
+        with transaction.atomic():
+            cart_item = CartItem.objects.select_related('cart', 'product').get(
+                id=item_id, cart__customer=request.user)
+            product_name = cart_item.product.name
+            cart = cart_item.cart
+            cart_item.delete()
+            quote = cart.get_price_quote()
         
         return Response({
             'success': True,
             'message': f'{product_name} removed from cart',
-            'cart_total': float(cart.get_total_price()),
-            'cart_items_count': cart.items.count()
+            'cart_total': float(quote.total),
+            'cart_items_count': len(quote.lines)
         })
-    except (Cart.DoesNotExist, CartItem.DoesNotExist):
+    except CartItem.DoesNotExist:
         return Response({'error': 'Item not found in cart'}, status=status.HTTP_404_NOT_FOUND)
 
 
+@api_view(['POST'])
+def cart_batch(request):
+    """Apply several cart changes at once and return the updated cart.
+
+    Body: ``{"operations": [{"op": "add", "product_id": 3, "quantity": 2},
+    {"op": "set", "item_id": 7, "quantity": 5}, {"op": "remove", "item_id": 8}]}``.
+    ``set``/``remove`` accept either ``item_id`` or ``product_id``; ``set`` to
+    0 removes the line. Either every operation applies or none does.
+    """
+    if not request.user.is_authenticated:
+        return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    try:
+        with transaction.atomic():
+            # Lock the cart row so concurrent writes fold against fresh quantities
+            cart = carts.lock_cart(request.user)
+            carts.apply_operations(cart, request.data.get('operations'))
+    except carts.CartBatchError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    cart = _carts_with_items().get(pk=cart.pk)
+    return Response(CartSerializer(cart, context={'request': request}).data)
+
+
 # ===== CASHFREE PAYMENT API =====
 
 @csrf_exempt
 @api_view(['POST'])
+@idempotent('checkout')
 def cashfree_create_order(request):
     """
     Create a Cashfree order for the current user's cart.
     Returns payment session ID and redirect URL.
+    Send an Idempotency-Key header to make retries safe (shop/idempotency.py).
     """
     if not request.user.is_authenticated:
         return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
 
+    return _cashfree_checkout(request)
+
+
+def _cashfree_checkout(request):
     try:
         cart = Cart.objects.get(customer=request.user)
     except Cart.DoesNotExist:
         return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
 
-    cart_total = float(cart.get_total_price())
-    if cart.items.count() == 0 or cart_total <= 0:
+    items = list(cart.items.select_related('product'))
+    quote = pricing.price_cart(items)
+    cart_total = float(quote.total)
+    if not items or cart_total <= 0:
         return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
 
+    try:
+        # Bounded per process so slow gateway calls cannot take every thread
+        with gateway_slot():
+            return _start_checkout(request, items, quote)
+    except GatewayBusy as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '2'})
+
+
+def _start_checkout(request, items, quote):
+    """Create the pending order, reserve stock and open a Cashfree payment session."""
+    cart_total = float(quote.total)
+    order = None
     try:
         # Generate unique order ID
         from .cashfree import safe_order_id
         cf_order_id = safe_order_id()
 
-        # Create Django Order record (pending)
-        order = Order.objects.create(
-            customer=request.user,
-            order_id=cf_order_id,
-            total_amount=cart_total,
-            discount_amount=0,
-            tax_amount=0,
-            final_amount=cart_total,
-            status='pending',
-            payment_method='cashfree',
-            payment_status='pending',
-            cashfree_order_id=cf_order_id,
-        )
+        # Order and stock reservation commit together, before the gateway
+        # call, so product rows are never locked across a network round trip
+        with transaction.atomic():
+            order = Order.objects.create(
+                customer=request.user,
+                order_id=cf_order_id,
+                total_amount=quote.subtotal,
+                discount_amount=quote.discount,
+                tax_amount=0,
+                final_amount=quote.total,
+                status='pending',
+                payment_method='cashfree',
+                payment_status='pending',
+                cashfree_order_id=cf_order_id,
+                # What was bought, as priced at checkout; also mined by shop/recommendations.py
+                cart_snapshot=[
+                    {
+                        'product_id': item.product_id,
+                        'name': item.product.name,
+                        'quantity': item.quantity,
+                        'price': str(line.unit_price),
+                        'bulk_discount_percent': str(line.discount_percent),
+                        'total': str(line.total),
+                    }
+                    for item, line in zip(items, quote.lines)
+                ],
+            )
+            inventory.reserve(order, [(item.product_id, item.quantity) for item in items])
 
         # Prepare return and notify URLs (adjust domain as needed)
         base_url = request.build_absolute_uri('/').rstrip('/')
@@ -500,26 +818,47 @@ def cashfree_create_order(request):
             'payment_redirect_url': cf_response.get('payments', {}).get('1', {}).get('url'),
         }, status=status.HTTP_200_OK)
 
+    except inventory.OutOfStock as e:
+        available = Product.objects.filter(pk=e.product_id).values_list('quantity_in_stock', flat=True).first() or 0
+        name = next(item.product.name for item in items if item.product_id == e.product_id)
+        return Response(
+            {'error': f'Only {available} of {name} left in stock', 'product_id': e.product_id, 'available': available},
+            status=status.HTTP_409_CONFLICT
+        )
     except CashfreeError as e:
         logger.error(f"Cashfree error: {e}")
+        _abandon_checkout(order)
         return Response(
             {'error': f'Payment gateway error: {str(e)}'},
             status=status.HTTP_400_BAD_REQUEST
         )
     except Exception as e:
         logger.exception("Unexpected error creating Cashfree order")
+        _abandon_checkout(order)
         return Response(
             {'error': 'Failed to create payment order'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
+def _abandon_checkout(order):
+    """No payment session exists for ``order``: put its stock back on sale."""
+    if order is None or order.pk is None:
+        return
+    with transaction.atomic():
+        inventory.release(order)
+        Order.objects.filter(pk=order.pk).update(status='cancelled', payment_status='failed')
+
+
 @csrf_exempt
 @api_view(['POST'])
+# Cashfree calls anonymously; the signature is the authentication
+@permission_classes([AllowAny])
 def cashfree_webhook(request):
     """
-    Handle Cashfree webhook notifications for payment status updates.
-    Verifies signature and updates order status.
+    Receive Cashfree webhook notifications for payment status updates.
+    Verifies the signature and stores the event in the webhook inbox; orders
+    are updated by ``manage.py process_webhooks`` (see shop/webhooks.py).
     """
     try:
         # Get raw body for signature verification
@@ -533,40 +872,20 @@ def cashfree_webhook(request):
 
         # Parse webhook data
         data = request.data or json.loads(raw_body)
-        order_id = data.get('order_id')
-        payment_status = data.get('payment_status')
+        order_id, payment_status = webhooks.parse(data)
 
         if not order_id or not payment_status:
             return Response({'error': 'Missing order_id or payment_status'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Find and update order
-        try:
-            order = Order.objects.get(cashfree_order_id=order_id)
-        except Order.DoesNotExist:
-            logger.error(f"Webhook for non-existent order: {order_id}")
-            return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
-
-        # Normalize status
-        normalized_status = normalize_status(payment_status)
-        
-        # Update order atomically
-        if order.payment_status != normalized_status:
-            order.payment_status = normalized_status
-            if normalized_status == 'paid':
-                order.status = 'completed'
-            elif normalized_status == 'failed':
-                order.status = 'cancelled'
-            order.save()
-
-            logger.info(f"Updated order {order_id} to status {normalized_status}")
-
+        # Retries of an event already in the inbox are acknowledged the same way
+        webhooks.record(raw_body, request.headers, order_id, payment_status)
         return Response({'success': True}, status=status.HTTP_200_OK)
 
     except json.JSONDecodeError:
         logger.error("Invalid JSON in Cashfree webhook")
         return Response({'error': 'Invalid JSON'}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        logger.exception("Error processing Cashfree webhook")
+        logger.exception("Error recording Cashfree webhook")
         return Response({'error': 'Webhook processing failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -574,24 +893,26 @@ def cashfree_webhook(request):
 
 @csrf_exempt
 @api_view(['POST'])
+@idempotent('checkout')
 def create_prebooking(request):
     """Create a pre-booking order (legacy endpoint, now uses Cashfree)"""
     if not request.user.is_authenticated:
         return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
     
     # Redirect to Cashfree flow
-    return cashfree_create_order(request)
+    return _cashfree_checkout(request)
 
 
 @csrf_exempt
 @api_view(['POST'])
+@idempotent('checkout')
 def create_prebooking_from_cart(request):
     """Create a single pre-booking order for the user's entire cart (legacy, now uses Cashfree)."""
     if not request.user.is_authenticated:
         return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
 
     # Redirect to Cashfree flow
-    return cashfree_create_order(request)
+    return _cashfree_checkout(request)
 
 
 # ===== ROUTER =====
@@ -621,6 +942,8 @@ urlpatterns += [
     path('cashfree/webhook/', cashfree_webhook, name='api-cashfree-webhook'),
     # Ojas Gurukul notify endpoint
     path('ojas-gurukul/notify/', ojas_gurukul_notify, name='api-ojas-gurukul-notify'),
+    # Catalog cache counters (staff only)
+    path('catalog/cache-stats/', catalog_cache_status, name='api-catalog-cache-stats'),
 ]
 
 
@@ -0,0 +1,213 @@
+"""Versioned response cache and conditional GET for read-mostly endpoints.
+
+Every cache key and ETag embeds a version number. Writes (see
+``shop/signals.py``) bump the version instead of deleting keys, so stale
+entries are simply never read again and expire on their own timeout.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+CATALOG = 'catalog'
+CONTENT = 'content'
+CATALOG_STATS_KEYS = {'hits': 'catalog:stats:hits', 'misses': 'catalog:stats:misses'}
+
+
+def _timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 600)
+
+
+def _version_keys(namespace):
+    return f'{namespace}:version', f'{namespace}:modified'
+
+
+def get_version_info(namespace):
+    """Return ``(version, last_modified_timestamp)`` for a namespace.
+
+    Namespaces are ``catalog`` (products, categories, reviews) and
+    ``content`` (articles, FAQs).
+    """
+    version_key, modified_key = _version_keys(namespace)
+    values = cache.get_many([version_key, modified_key])
+    if version_key not in values:
+        # Seed from the clock rather than 1: if the key is ever evicted the new
+        # version cannot collide with keys written under an older one.
+        now = time.time()
+        cache.add(version_key, int(now * 1000), timeout=None)
+        cache.add(modified_key, now, timeout=None)
+        values = cache.get_many([version_key, modified_key])
+    return values[version_key], values.get(modified_key) or time.time()
+
+
+def get_version(namespace):
+    return get_version_info(namespace)[0]
+
+
+def bump_version(namespace):
+    version_key, modified_key = _version_keys(namespace)
+    try:
+        version = cache.incr(version_key)
+    except ValueError:
+        get_version_info(namespace)
+        version = cache.incr(version_key)
+    cache.set(modified_key, time.time(), timeout=None)
+    return version
+
+
+def get_catalog_version():
+    return get_version(CATALOG)
+
+
+def bump_catalog_version():
+    return bump_version(CATALOG)
+
+
+def _count(stat, n=1):
+    key = CATALOG_STATS_KEYS[stat]
+    try:
+        cache.incr(key, n)
+    except ValueError:
+        if not cache.add(key, n, timeout=None):
+            cache.incr(key, n)
+
+
+def catalog_cache_stats():
+    hits = cache.get(CATALOG_STATS_KEYS['hits'], 0)
+    misses = cache.get(CATALOG_STATS_KEYS['misses'], 0)
+    total = hits + misses
+    return {
+        'version': get_catalog_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+    }
+
+
+def catalog_cache_key(namespace, request, params):
+    """Build a cache key from the normalized filter tuple and the catalog version.
+
+    The host is part of the key because serialized image URLs and pagination
+    links are absolute.
+    """
+    parts = '|'.join(f'{name}={value}' for name, value in params)
+    return f'catalog:{get_catalog_version()}:{namespace}:{request.scheme}://{request.get_host()}:{parts}'
+
+
+def cached_catalog_data(name, build):
+    """Return ``build()`` cached under ``name`` for the current catalog version.
+
+    For derived data (not rendered responses) that only changes with the catalog.
+    """
+    key = f'catalog:{get_catalog_version()}:{name}'
+    data = cache.get(key)
+    if data is not None:
+        _count('hits')
+        return data
+    _count('misses')
+    data = build()
+    cache.set(key, data, _timeout())
+    return data
+
+
+def cached_catalog_many(name, keys, build_missing):
+    """Batch form of ``cached_catalog_data`` for per-object entries.
+
+    ``build_missing(missing_keys)`` returns ``{key: data}`` for the keys it
+    could resolve; those are stored and merged into the result, the others
+    are left out.
+    """
+    version = get_catalog_version()
+    cache_keys = {f'catalog:{version}:{name}:{key}': key for key in keys}
+    found = {cache_keys[k]: data for k, data in cache.get_many(list(cache_keys)).items()}
+    missing = [key for key in keys if key not in found]
+    if found:
+        _count('hits', len(found))
+    if missing:
+        _count('misses', len(missing))
+        built = build_missing(missing)
+        cache.set_many({f'catalog:{version}:{name}:{key}': data for key, data in built.items()}, _timeout())
+        found.update(built)
+    return found
+
+
+class CatalogCacheMixin:
+    """Serve ``list()`` from pre-rendered JSON bytes keyed on the catalog version.
+
+    Views declare the query parameters that affect the response in
+    ``cache_params``; ``normalize_cache_param`` may canonicalize their values
+    so equivalent requests share an entry. Only JSON responses are cached, the
+    browsable API always renders fresh.
+    """
+    cache_params = ()
+
+    def normalize_cache_param(self, name, value):
+        return value
+
+    def get_cache_params(self, request):
+        params = [(name, self.normalize_cache_param(name, request.query_params.get(name) or ''))
+                  for name in self.cache_params]
+        paginator = self.paginator
+        if paginator is not None:
+            params.append(('cursor', request.query_params.get(paginator.cursor_query_param, '')))
+            params.append(('page_size', paginator.get_page_size(request)))
+        return tuple(params)
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+
+        key = catalog_cache_key(self.basename, request, self.get_cache_params(request))
+        body = cache.get(key)
+        if body is not None:
+            _count('hits')
+            return HttpResponse(body, content_type=renderer.media_type)
+
+        _count('misses')
+        response = super().list(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        body = renderer.render(response.data, request.accepted_media_type, self.get_renderer_context())
+        cache.set(key, body, _timeout())
+        return HttpResponse(body, content_type=renderer.media_type)
+
+
+class ConditionalGetMixin:
+    """Answer ``If-None-Match`` / ``If-Modified-Since`` from a version counter.
+
+    The strong ETag hashes the namespace version together with the absolute
+    URL and the negotiated format, and ``Last-Modified`` is the time of the
+    last bump. Both are known before the queryset or serializer runs, so an
+    unchanged resource costs one cache lookup and returns 304 with no body.
+    """
+    conditional_namespace = CATALOG
+
+    def get_validators(self, request):
+        version, modified = get_version_info(self.conditional_namespace)
+        fingerprint = f'{self.conditional_namespace}:{version}:{request.accepted_renderer.format}:{request.build_absolute_uri()}'
+        etag = '"%s"' % hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+        return etag, int(modified)
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = http_date(last_modified)
+        # Let browsers keep the body but revalidate on every navigation
+        response.headers.setdefault('Cache-Control', 'no-cache')
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
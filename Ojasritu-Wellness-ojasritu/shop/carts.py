@@ -0,0 +1,188 @@
+"""Atomic cart mutations.
+
+Every change to a line is a single statement: quantity increments are
+``UPDATE ... SET quantity = quantity + n``, so concurrent taps add up
+instead of overwriting each other, and the ``(cart, product)`` unique
+constraint turns a racing first insert into a retry of that update.
+Writers that read lines and write back absolute quantities (batches,
+the login merge) hold the cart row lock from ``lock_cart``, and so does
+``add_item``'s caller, so a single add can never land between such a
+read and its write and be overwritten.
+Lines are capped at ``MAX_QUANTITY`` units however the units arrive.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Least
+
+from .models import Cart, CartItem, Product
+
+MAX_QUANTITY = 999
+MAX_OPERATIONS = 100
+OPERATIONS = ('add', 'set', 'remove')
+# Anonymous visitors keep ``{product_id: quantity}`` in the session
+# (shop/views.py); merge_session_cart folds it into the DB cart at login.
+SESSION_CART_KEY = 'cart'
+
+
+def get_cart(user):
+    # OneToOne on customer: get_or_create recovers from a concurrent create
+    cart, _ = Cart.objects.get_or_create(customer=user)
+    return cart
+
+
+def lock_cart(user):
+    """Get or create ``user``'s cart with its row locked until the transaction ends."""
+    cart, _ = Cart.objects.select_for_update().get_or_create(customer=user)
+    return cart
+
+
+def add_item(cart, product, quantity):
+    """Add ``quantity`` units of ``product``; returns True if a new line was created."""
+    increment = Least(F('quantity') + quantity, MAX_QUANTITY)
+    if CartItem.objects.filter(cart=cart, product=product).update(quantity=increment):
+        return False
+    try:
+        with transaction.atomic():
+            CartItem.objects.create(cart=cart, product=product, quantity=min(quantity, MAX_QUANTITY))
+        return True
+    except IntegrityError:
+        # Another request inserted the line between our UPDATE and INSERT
+        CartItem.objects.filter(cart=cart, product=product).update(quantity=increment)
+        return False
+
+
+def set_quantity(cart, product, quantity):
+    """Set the line to exactly ``quantity`` units, removing it at zero."""
+    if quantity <= 0:
+        CartItem.objects.filter(cart=cart, product=product).delete()
+        return
+    if CartItem.objects.filter(cart=cart, product=product).update(quantity=quantity):
+        return
+    try:
+        with transaction.atomic():
+            CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+    except IntegrityError:
+        CartItem.objects.filter(cart=cart, product=product).update(quantity=quantity)
+
+
+def parse_quantity(value, minimum=1, maximum=MAX_QUANTITY):
+    """Validate a quantity from request data; returns None when invalid."""
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        return None
+    if not minimum <= quantity <= maximum:
+        return None
+    return quantity
+
+
+class CartBatchError(ValueError):
+    """A batch operation was malformed or named an unavailable product."""
+
+
+def _parse_operation(index, raw, lines_by_item):
+    if not isinstance(raw, dict) or raw.get('op') not in OPERATIONS:
+        raise CartBatchError(f'operations[{index}]: op must be one of {", ".join(OPERATIONS)}')
+    op = raw['op']
+    if raw.get('item_id') is not None and op != 'add':
+        try:
+            product_id = lines_by_item[int(raw['item_id'])]
+        except (KeyError, TypeError, ValueError):
+            raise CartBatchError(f'operations[{index}]: item_id is not in this cart')
+    else:
+        try:
+            product_id = int(raw.get('product_id'))
+        except (TypeError, ValueError):
+            raise CartBatchError(f'operations[{index}]: product_id is required')
+    quantity = 0
+    if op != 'remove':
+        quantity = parse_quantity(raw.get('quantity', 1), minimum=1 if op == 'add' else 0)
+        if quantity is None:
+            raise CartBatchError(f'operations[{index}]: quantity is out of range')
+    return op, product_id, quantity
+
+
+def apply_operations(cart, operations):
+    """Apply a list of add/set/remove operations to ``cart`` in one go.
+
+    Operations are folded into a final quantity per product first, so a
+    stepper tapped five times costs the same as one tap: one read of the
+    cart's lines, one ``IN`` query validating products, one
+    ``INSERT ... ON CONFLICT DO UPDATE`` and one ``DELETE``. Call inside
+    ``transaction.atomic()`` with the cart from ``lock_cart`` so the
+    read-fold-write cannot interleave with another cart write.
+
+    Raises ``CartBatchError`` before writing anything if an operation is
+    invalid.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise CartBatchError('operations must be a non-empty list')
+    if len(operations) > MAX_OPERATIONS:
+        raise CartBatchError(f'at most {MAX_OPERATIONS} operations per batch')
+
+    current = {}
+    lines_by_item = {}
+    for item_id, product_id, quantity in cart.items.values_list('id', 'product_id', 'quantity'):
+        current[product_id] = quantity
+        lines_by_item[item_id] = product_id
+
+    final = {}
+    for index, raw in enumerate(operations):
+        op, product_id, quantity = _parse_operation(index, raw, lines_by_item)
+        if op == 'add':
+            quantity = min(quantity + final.get(product_id, current.get(product_id, 0)), MAX_QUANTITY)
+        final[product_id] = quantity
+
+    wanted = {pk for pk, quantity in final.items() if quantity > 0}
+    available = set(Product.objects.filter(pk__in=wanted, status='active').order_by().values_list('pk', flat=True))
+    if wanted - available:
+        missing = ', '.join(str(pk) for pk in sorted(wanted - available))
+        raise CartBatchError(f'Products not found or inactive: {missing}')
+
+    _upsert(cart, {pk: q for pk, q in final.items() if q > 0 and q != current.get(pk)})
+    removed = [pk for pk, quantity in final.items() if quantity == 0 and pk in current]
+    if removed:
+        CartItem.objects.filter(cart=cart, product_id__in=removed).delete()
+
+
+def _upsert(cart, quantities):
+    """Write ``{product_id: quantity}`` as one INSERT ... ON CONFLICT DO UPDATE."""
+    if quantities:
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, product_id=pk, quantity=quantity) for pk, quantity in quantities.items()],
+            update_conflicts=True, unique_fields=['cart', 'product'], update_fields=['quantity'],
+        )
+
+
+def _session_quantities(raw):
+    quantities = {}
+    if not isinstance(raw, dict):
+        return quantities
+    for key, value in raw.items():
+        try:
+            product_id, quantity = int(key), int(value)
+        except (TypeError, ValueError):
+            continue
+        if quantity > 0:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+def merge_session_cart(session, user):
+    """Move the anonymous session cart into ``user``'s DB cart.
+
+    Quantities add to lines already in the cart; products that are gone or
+    inactive are dropped. Costs a fixed number of queries however many
+    products the session holds: cart lock, one ``IN`` query for products,
+    one for the existing lines, and one bulk upsert. The session key is
+    removed only once the merge has committed.
+    """
+    quantities = _session_quantities(session.get(SESSION_CART_KEY))
+    if quantities:
+        with transaction.atomic():
+            cart = lock_cart(user)
+            active = Product.objects.filter(pk__in=quantities, status='active').order_by().values_list('pk', flat=True)
+            quantities = {pk: quantities[pk] for pk in active}
+            current = dict(cart.items.filter(product_id__in=quantities).values_list('product_id', 'quantity'))
+            _upsert(cart, {pk: min(current.get(pk, 0) + quantity, MAX_QUANTITY) for pk, quantity in quantities.items()})
+    session.pop(SESSION_CART_KEY, None)
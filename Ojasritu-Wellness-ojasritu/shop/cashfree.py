@@ -1,25 +1,223 @@
 import base64
 import hashlib
 import hmac
+import logging
+import os
+import random
+import threading
+import time
 import uuid
-from typing import Dict, Any, Tuple
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import quote
 
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
 
 
 class CashfreeError(Exception):
     """Raised when Cashfree interaction fails."""
 
+    def __init__(self, message='', status_code=None, retry_after=None):
+        super().__init__(message)
+        # HTTP status and Retry-After (seconds) when Cashfree answered at all
+        self.status_code = status_code
+        self.retry_after = retry_after
+
 
 def _env() -> str:
     return (getattr(settings, 'CASHFREE_ENV', 'TEST') or 'TEST').strip().upper()
 
 
 def base_url() -> str:
+    override = getattr(settings, 'CASHFREE_API_BASE', '')
+    if override:
+        return override.rstrip('/')
     return 'https://api.cashfree.com/pg' if _env() == 'PROD' else 'https://sandbox.cashfree.com/pg'
 
 
+# ---------------------------------------------------------------------------
+# Pooled HTTP session
+#
+# One keep-alive Session per process (gunicorn workers each get their own
+# after fork), so checkouts reuse the TCP/TLS connection to Cashfree instead
+# of handshaking every time. Only GETs are retried on 5xx/read errors; a POST
+# is retried only when the connection could not be opened, i.e. when nothing
+# was sent. Backoff is exponential with full jitter so workers that failed
+# together do not retry together.
+# ---------------------------------------------------------------------------
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class _JitteredRetry(Retry):
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff > 0 else 0
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def _timeouts() -> Tuple[float, float]:
+    return (
+        float(getattr(settings, 'CASHFREE_CONNECT_TIMEOUT', 3.05)),
+        float(getattr(settings, 'CASHFREE_READ_TIMEOUT', 10)),
+    )
+
+
+def _build_session() -> requests.Session:
+    retries = int(getattr(settings, 'CASHFREE_MAX_RETRIES', 3))
+    retry = _JitteredRetry(
+        total=retries, connect=retries, read=retries, status=retries,
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        status_forcelist=RETRY_STATUSES,
+        backoff_factor=float(getattr(settings, 'CASHFREE_RETRY_BACKOFF', 0.25)),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        # Everything goes to one host, so one pool sized for the worker's threads
+        pool_connections=1,
+        pool_maxsize=int(getattr(settings, 'CASHFREE_POOL_SIZE', 10)),
+        pool_block=False,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                _session, _session_pid = _build_session(), os.getpid()
+    return _session
+
+
+def reset_session() -> None:
+    """Drop pooled connections, e.g. after changing CASHFREE_* settings."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+# ---------------------------------------------------------------------------
+# Bulkhead
+#
+# gunicorn runs gthread workers (see Procfile), so a checkout waiting on
+# Cashfree only ties up one thread. The semaphore caps how many threads per
+# process may wait on the gateway at once, leaving the rest for catalog
+# traffic however slow Cashfree gets; checkouts beyond the cap get a fast
+# 503 instead of queueing.
+# ---------------------------------------------------------------------------
+
+
+class GatewayBusy(CashfreeError):
+    """Every gateway slot in this process is taken."""
+
+
+_slots = None
+_slots_size = None
+_slots_lock = threading.Lock()
+
+
+def _gateway_slots() -> threading.BoundedSemaphore:
+    global _slots, _slots_size
+    size = max(1, int(getattr(settings, 'CASHFREE_MAX_CONCURRENT', 4)))
+    if _slots is None or _slots_size != size:
+        with _slots_lock:
+            if _slots is None or _slots_size != size:
+                _slots, _slots_size = threading.BoundedSemaphore(size), size
+    return _slots
+
+
+@contextmanager
+def gateway_slot():
+    """Hold one of CASHFREE_MAX_CONCURRENT slots; raise GatewayBusy if none frees up in time."""
+    slots = _gateway_slots()
+    if not slots.acquire(timeout=float(getattr(settings, 'CASHFREE_SLOT_WAIT', 0.5))):
+        raise GatewayBusy('Payment gateway is busy, please retry in a moment')
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+# Per-process call latency, keyed by call name; read with gateway_stats()
+_stats: Dict[str, Dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+
+def _record(call: str, elapsed_ms: float, attempts: int, ok: bool) -> None:
+    with _stats_lock:
+        stats = _stats.setdefault(call, {'calls': 0, 'errors': 0, 'retries': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        stats['calls'] += 1
+        stats['errors'] += 0 if ok else 1
+        stats['retries'] += attempts - 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+
+def gateway_stats() -> Dict[str, Dict[str, float]]:
+    """Latency counters for this process: calls, errors, retries, avg/max ms."""
+    with _stats_lock:
+        return {
+            call: {**stats, 'avg_ms': stats['total_ms'] / stats['calls'] if stats['calls'] else 0.0}
+            for call, stats in _stats.items()
+        }
+
+
+def reset_gateway_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def _request(call: str, method: str, path: str, json: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    headers, _secret = _headers()
+    start = time.perf_counter()
+    try:
+        resp = get_session().request(method, f"{base_url()}{path}", json=json, headers=headers, timeout=_timeouts())
+    except requests.RequestException as e:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _record(call, elapsed_ms, 1, ok=False)
+        logger.warning('cashfree %s %s failed after %.0f ms: %s', call, path, elapsed_ms, e)
+        raise CashfreeError(f'Cashfree unreachable: {e}') from e
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    retries = getattr(resp.raw, 'retries', None)
+    attempts = 1 + (len(retries.history) if retries is not None else 0)
+    _record(call, elapsed_ms, attempts, ok=resp.ok)
+    logger.info('cashfree %s %s -> %s in %.0f ms (%d attempts)', call, path, resp.status_code, elapsed_ms, attempts)
+
+    try:
+        data = resp.json()
+    except Exception:
+        data = {'message': resp.text}
+    # Proxies and outages can answer with a JSON list or scalar
+    if not isinstance(data, dict):
+        if resp.ok:
+            raise CashfreeError(f'Unexpected Cashfree response: {resp.text[:200]}', status_code=resp.status_code)
+        data = {'message': resp.text}
+    if not resp.ok:
+        retry_after = resp.headers.get('Retry-After', '')
+        raise CashfreeError(
+            data.get('message') or data, status_code=resp.status_code,
+            retry_after=float(retry_after) if retry_after.replace('.', '', 1).isdigit() else None,
+        )
+    return data
+
+
 def _headers() -> Tuple[Dict[str, str], str]:
     app_id = getattr(settings, 'CASHFREE_APP_ID', None)
     secret = getattr(settings, 'CASHFREE_SECRET_KEY', None)
@@ -44,8 +242,8 @@ def create_cashfree_order(
 ) -> Dict[str, Any]:
     """
     Create a Cashfree order and return the gateway payload (session id, order id, link).
+    Not retried once the request may have reached Cashfree.
     """
-    headers, _secret = _headers()
     payload = {
         'order_id': order_id,
         'order_amount': float(amount),
@@ -63,14 +261,7 @@ def create_cashfree_order(
         },
     }
 
-    resp = requests.post(f"{base_url()}/orders", json=payload, headers=headers, timeout=12)
-    try:
-        data = resp.json()
-    except Exception:
-        data = {'message': resp.text}
-
-    if not resp.ok:
-        raise CashfreeError(data.get('message') or data)
+    data = _request('create_order', 'POST', '/orders', json=payload)
 
     if not data.get('payment_session_id'):
         raise CashfreeError('Cashfree did not return a payment_session_id')
@@ -78,6 +269,14 @@ def create_cashfree_order(
     return data
 
 
+def get_cashfree_order(order_id: str) -> Dict[str, Any]:
+    """
+    Fetch an order's current state from Cashfree (``order_status`` etc.).
+    Safe to retry, so transient 5xx and read timeouts are retried with backoff.
+    """
+    return _request('get_order', 'GET', f'/orders/{quote(order_id, safe="")}')
+
+
 def verify_signature(raw_body: bytes, signature: str) -> bool:
     """
     Verify webhook/callback signature using HMAC-SHA256 of the raw body.
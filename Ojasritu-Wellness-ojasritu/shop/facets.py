@@ -0,0 +1,87 @@
+"""Facet counts for the product filter sidebar.
+
+All counts come from a single ``GROUP BY`` over the facet columns of active
+products. The grouped rows are few (categories x doshas x three flags), so
+the per-facet numbers are folded from them in Python. Counts are
+disjunctive: each facet is counted with every *other* applied filter, so
+choosing a dosha still shows how many products the other doshas would give.
+"""
+from django.db.models import Count
+
+from .cache import cached_catalog_data
+from .models import Product
+
+# (query parameter, grouped column); flag facets only ever filter on True
+VALUE_FACETS = (('category', 'category__slug'), ('dosha', 'dosha_type'))
+FLAG_FACETS = (('bestseller', 'is_bestseller'), ('organic', 'is_organic'), ('featured', 'is_featured'))
+FACETS = VALUE_FACETS + FLAG_FACETS
+FILTER_PARAMS = tuple(param for param, _ in FACETS)
+COLUMNS = dict(FACETS)
+
+
+def selected_filters(query_params):
+    """Return the applied filters as ``{param: value}``; flags become ``True``."""
+    selected = {}
+    for param, _ in VALUE_FACETS:
+        value = query_params.get(param)
+        if value:
+            selected[param] = value
+    for param, _ in FLAG_FACETS:
+        # Any non-empty value means "only these", matching the list endpoint
+        if query_params.get(param):
+            selected[param] = True
+    return selected
+
+
+def apply_filters(queryset, selected):
+    return queryset.filter(**{COLUMNS[param]: value for param, value in selected.items()})
+
+
+def _matches(row, selected, skip=None):
+    return all(row[COLUMNS[param]] == value for param, value in selected.items() if param != skip)
+
+
+def compute_facets(selected):
+    rows = list(
+        Product.objects.filter(status='active')
+        .order_by()
+        .values(*(column for _, column in FACETS), 'category__name')
+        .annotate(n=Count('id'))
+    )
+    dosha_labels = dict(Product.DOSHA_CHOICES)
+
+    categories, doshas = {}, {}
+    flags = {param: {True: 0, False: 0} for param, _ in FLAG_FACETS}
+    total = 0
+    for row in rows:
+        n = row['n']
+        if _matches(row, selected):
+            total += n
+        entry = categories.setdefault(row['category__slug'], {
+            'value': row['category__slug'], 'label': row['category__name'], 'count': 0,
+        })
+        if _matches(row, selected, skip='category'):
+            entry['count'] += n
+        entry = doshas.setdefault(row['dosha_type'], {
+            'value': row['dosha_type'], 'label': dosha_labels.get(row['dosha_type'], row['dosha_type']), 'count': 0,
+        })
+        if _matches(row, selected, skip='dosha'):
+            entry['count'] += n
+        for param, column in FLAG_FACETS:
+            if _matches(row, selected, skip=param):
+                flags[param][row[column]] += n
+
+    facets = {
+        'category': sorted(categories.values(), key=lambda e: (-e['count'], e['label'])),
+        'dosha': sorted(doshas.values(), key=lambda e: (-e['count'], e['value'])),
+    }
+    for param, _ in FLAG_FACETS:
+        facets[param] = [{'value': value, 'count': flags[param][value]} for value in (True, False)]
+    return {'filters': selected, 'total': total, 'facets': facets}
+
+
+def product_facets(query_params):
+    """Facet counts for the filters in ``query_params``, cached per combination."""
+    selected = selected_filters(query_params)
+    parts = '|'.join(f'{param}={selected.get(param, "")}' for param in FILTER_PARAMS)
+    return cached_catalog_data(f'facets:{parts}', lambda: compute_facets(selected))
@@ -0,0 +1,99 @@
+"""Sparse fieldsets for read endpoints: ``?fields=`` and ``?omit=``.
+
+``?fields=`` takes a comma-separated list of serializer field names and/or
+preset names declared in the serializer's ``field_presets`` (for example
+``?fields=card`` or ``?fields=card,dosha_type``). ``?omit=`` removes fields
+from whatever would otherwise be rendered. Unknown names are ignored.
+
+Only the top-level serializer of a response is trimmed; a product nested in
+a cart line always renders in full. Views use ``SparseFieldsetMixin`` to load
+just the columns the remaining fields read.
+"""
+from rest_framework.serializers import ListSerializer
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _split(value):
+    return [name for name in (part.strip() for part in (value or '').split(',')) if name]
+
+
+def requested_fields(serializer_class, query_params):
+    """Field names to render in declaration order, or ``None`` for all of them."""
+    requested = _split(query_params.get(FIELDS_PARAM))
+    omitted = set(_split(query_params.get(OMIT_PARAM)))
+    if not requested and not omitted:
+        return None
+    available = list(serializer_class.Meta.fields)
+    presets = getattr(serializer_class, 'field_presets', {})
+    if requested:
+        names = set()
+        for name in requested:
+            names.update(presets.get(name, (name,)))
+    else:
+        names = set(available)
+    names -= omitted
+    return [name for name in available if name in names]
+
+
+def normalize_param(value):
+    """Canonical form of a ``fields``/``omit`` value for cache keys."""
+    return ','.join(sorted(set(_split(value))))
+
+
+class SparseFieldsetSerializerMixin:
+    """Drop fields not selected by the request's ``fields``/``omit`` parameters.
+
+    ``model_field_sources`` maps serializer fields that are not plain model
+    fields to the model columns they read (``()`` for none), so views can
+    build a matching ``.only()``.
+    """
+    field_presets = {}
+    model_field_sources = {}
+
+    def _is_response_root(self):
+        root = self.root
+        return root is self or (isinstance(root, ListSerializer) and root.child is self and root.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or not self._is_response_root():
+            return fields
+        names = requested_fields(type(self), request.query_params)
+        if names is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in names}
+
+    @classmethod
+    def model_fields_for(cls, names):
+        columns = set()
+        for name in names:
+            columns.update(cls.model_field_sources.get(name, (name,)))
+        return columns
+
+
+class SparseFieldsetMixin:
+    """View mixin restricting the queryset to the columns the response renders.
+
+    ``always_load`` lists columns needed regardless of the fieldset, such as
+    the ordering used by cursor pagination.
+    """
+    always_load = ('id',)
+
+    def get_requested_fields(self):
+        return requested_fields(self.get_serializer_class(), self.request.query_params)
+
+    def sparse_queryset(self, queryset):
+        names = self.get_requested_fields()
+        if names is None:
+            return queryset
+        columns = self.get_serializer_class().model_fields_for(names) | set(self.always_load)
+        related = {column.split('__', 1)[0] for column in columns if '__' in column}
+        # A relation that is select_related() must not be deferred itself
+        columns |= related
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns)
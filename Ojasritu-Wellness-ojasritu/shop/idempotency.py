@@ -0,0 +1,183 @@
+"""``Idempotency-Key`` support for endpoints that create orders.
+
+A client sends the same ``Idempotency-Key`` header on every retry of one
+logical request. The first request claims the key by inserting a row, which
+the ``(user, scope, key)`` unique constraint lets only one request win, and
+runs the view. A duplicate that arrives while it runs polls the row until the
+first finishes, then gets the stored response back. So does any later
+repeat until the key expires.
+
+Only 2xx responses are stored. On an error response or an exception the
+claim is deleted, so the client can retry with the same key once whatever
+failed has been fixed (stock, gateway). Reusing a key with a different
+request body is rejected with 422.
+
+A claim is a lease: if the worker holding it dies (or gunicorn's timeout
+kills it) the row stays ``processing``, and once ``claim_lease()`` has passed
+the next request with the same key takes it over instead of getting 409
+until the key expires.
+
+Requests without the header behave exactly as before.
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def key_ttl():
+    return timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+
+
+def _wait_seconds():
+    # Long enough to cover a checkout's gateway call (CASHFREE_READ_TIMEOUT)
+    return float(getattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 15))
+
+
+def claim_lease():
+    """How long a ``processing`` claim is honoured before it counts as abandoned."""
+    return timedelta(seconds=_wait_seconds() + float(getattr(settings, 'CASHFREE_READ_TIMEOUT', 10)))
+
+
+def _abandoned(row, now=None):
+    return row.status == 'processing' and row.claimed_at <= (now or timezone.now()) - claim_lease()
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _claim(user, scope, key, request_hash, now):
+    """Insert the claim row; returns None if it was won, else the existing row."""
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    user=user, scope=scope, key=key, request_hash=request_hash,
+                    claimed_at=now, expires_at=now + key_ttl(),
+                )
+            return None
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(user=user, scope=scope, key=key).first()
+            if existing is None:
+                continue  # released between our insert and read
+            if existing.expires_at <= now:
+                # An expired key the purge has not reached yet counts as unused
+                IdempotencyKey.objects.filter(pk=existing.pk, expires_at__lte=now).delete()
+                continue
+            if existing.request_hash == request_hash and _abandoned(existing, now):
+                # Take over a dead holder's claim; the conditional update lets
+                # only one of several retries win it
+                taken = IdempotencyKey.objects.filter(
+                    pk=existing.pk, status='processing', claimed_at=existing.claimed_at,
+                ).update(claimed_at=now)
+                if taken:
+                    return None
+                continue
+            return existing
+    return IdempotencyKey.objects.filter(user=user, scope=scope, key=key).first()
+
+
+def _await_result(row):
+    """Poll a ``processing`` row until it is ``done``, released or the wait runs out."""
+    deadline = time.monotonic() + _wait_seconds()
+    delay = 0.05
+    while row is not None and row.status == 'processing' and not _abandoned(row) and time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+        row = IdempotencyKey.objects.filter(pk=row.pk).first()
+    return row
+
+
+def _replay(row):
+    response = Response(row.response_body, status=row.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _in_progress():
+    return Response(
+        {'error': f'A request with this {HEADER} is still in progress'},
+        status=status.HTTP_409_CONFLICT, headers={'Retry-After': '2'},
+    )
+
+
+def idempotent(scope):
+    """Make a DRF function view idempotent per user on the ``Idempotency-Key`` header.
+
+    Place it below ``@api_view``. Views sharing a ``scope`` share keys, so a
+    retry that lands on a sibling endpoint still gets the original response.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key or not request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            request_hash = _fingerprint(request)
+            claimed_at = timezone.now()
+            row = _claim(request.user, scope, key, request_hash, claimed_at)
+            if row is not None:
+                if row.request_hash != request_hash:
+                    return Response(
+                        {'error': f'{HEADER} was already used for a different request'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                row = _await_result(row)
+                if row is not None and row.status == 'done':
+                    return _replay(row)
+                if row is not None and not _abandoned(row):
+                    return _in_progress()
+                # The first request failed and released the key, or died
+                # holding it: run it again
+                claimed_at = timezone.now()
+                if _claim(request.user, scope, key, request_hash, claimed_at) is not None:
+                    return _in_progress()
+
+            # Only touch the row while we still hold the claim
+            claimed = IdempotencyKey.objects.filter(
+                user=request.user, scope=scope, key=key, status='processing', claimed_at=claimed_at,
+            )
+            try:
+                response = view(request, *args, **kwargs)
+            except Exception:
+                claimed.delete()
+                raise
+            if 200 <= response.status_code < 300:
+                claimed.update(status='done', response_status=response.status_code, response_body=response.data)
+            else:
+                claimed.delete()
+            return response
+        return wrapper
+    return decorator
+
+
+def purge_expired(batch_size=5000, now=None):
+    """Delete expired keys in batches (uses the ``expires_at`` index); returns how many."""
+    now = now or timezone.now()
+    purged = 0
+    while True:
+        ids = list(IdempotencyKey.objects.filter(expires_at__lte=now).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return purged
+        # No dependents and no signals, so this is a single DELETE ... WHERE id IN (...)
+        purged += IdempotencyKey.objects.filter(pk__in=ids).delete()[0]
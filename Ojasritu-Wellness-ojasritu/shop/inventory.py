@@ -0,0 +1,172 @@
+"""Stock reservations for checkouts awaiting payment.
+
+Creating a Cashfree checkout takes stock with one conditional statement
+per product::
+
+    UPDATE shop_product SET quantity_in_stock = quantity_in_stock - n
+    WHERE id = %s AND quantity_in_stock >= n
+
+so stock can never go negative and no row is read-then-written. The row
+lock lasts only for that short transaction; the gateway call happens after
+it commits, so a flash sale on one SKU queues for milliseconds rather than
+for a network round trip. Products are always updated in id order so two
+multi-product checkouts cannot deadlock.
+
+A reservation is then ``committed`` when the webhook reports payment,
+``released`` (stock returned) when payment fails, or released by
+``manage.py release_expired_reservations`` once its TTL passes.
+
+Cached product cards include ``quantity_in_stock``. To keep a sale from
+flushing the catalog cache on every checkout, the catalog version is only
+bumped when a product sells out or comes back in stock; counts in cached
+cards may otherwise lag by up to ``CATALOG_CACHE_TIMEOUT``.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .models import Product, StockReservation
+
+logger = logging.getLogger(__name__)
+
+
+class OutOfStock(Exception):
+    """Raised by reserve() when a product has fewer units than requested."""
+
+    def __init__(self, product_id, requested):
+        self.product_id = product_id
+        self.requested = requested
+        super().__init__(f'Product {product_id}: fewer than {requested} in stock')
+
+
+def reservation_ttl():
+    return timedelta(minutes=getattr(settings, 'STOCK_RESERVATION_TTL_MINUTES', 15))
+
+
+def _by_product(pairs):
+    totals = defaultdict(int)
+    for product_id, quantity in pairs:
+        totals[product_id] += quantity
+    # Fixed lock order across concurrent checkouts
+    return sorted(totals.items())
+
+
+def _take(product_id, quantity):
+    return Product.objects.filter(pk=product_id, quantity_in_stock__gte=quantity).update(
+        quantity_in_stock=F('quantity_in_stock') - quantity
+    )
+
+
+def _sold_out(product_ids):
+    return Product.objects.filter(pk__in=product_ids, quantity_in_stock=0).exists()
+
+
+def reserve(order, lines, ttl=None):
+    """Take stock for ``order``; ``lines`` is ``[(product_id, quantity), ...]``.
+
+    Raises ``OutOfStock`` for the first product that cannot be covered. Run
+    inside ``transaction.atomic()`` so stock already taken for earlier
+    products is rolled back with it.
+    """
+    expires_at = timezone.now() + (ttl or reservation_ttl())
+    wanted = _by_product(lines)
+    for product_id, quantity in wanted:
+        if not _take(product_id, quantity):
+            raise OutOfStock(product_id, quantity)
+    StockReservation.objects.bulk_create([
+        StockReservation(order=order, product_id=product_id, quantity=quantity, expires_at=expires_at)
+        for product_id, quantity in wanted
+    ])
+    if _sold_out([product_id for product_id, _ in wanted]):
+        transaction.on_commit(bump_catalog_version)
+
+
+def _lock_held(queryset):
+    queryset = queryset.filter(status='held')
+    if connection.features.has_select_for_update_skip_locked:
+        # A concurrent sweeper or webhook already owns those rows
+        queryset = queryset.select_for_update(skip_locked=True)
+    return list(queryset.values_list('pk', 'product_id', 'quantity'))
+
+
+@transaction.atomic
+def _release(queryset):
+    held = _lock_held(queryset)
+    if not held:
+        return 0
+    StockReservation.objects.filter(pk__in=[pk for pk, _, _ in held], status='held').update(
+        status='released', updated_at=timezone.now(),
+    )
+    returned = _by_product((product_id, quantity) for _, product_id, quantity in held)
+    restocked = _sold_out([product_id for product_id, _ in returned])
+    for product_id, quantity in returned:
+        Product.objects.filter(pk=product_id).update(quantity_in_stock=F('quantity_in_stock') + quantity)
+    if restocked:
+        transaction.on_commit(bump_catalog_version)
+    return len(held)
+
+
+def release(order):
+    """Return the stock held for ``order`` (payment failed or abandoned)."""
+    return release_orders([order.pk])
+
+
+def release_orders(order_ids):
+    return _release(StockReservation.objects.filter(order_id__in=order_ids))
+
+
+def commit(order):
+    """Keep the stock taken for ``order`` now that it is paid."""
+    return commit_orders([order.pk])
+
+
+@transaction.atomic
+def commit_orders(order_ids):
+    """Keep the stock taken for paid orders, in one statement for the usual case.
+
+    If a reservation already expired and its stock went back on sale, stock
+    is taken again; when that is no longer possible the reservation stays
+    ``released`` and the oversell is logged for staff to resolve.
+    """
+    now = timezone.now()
+    committed = StockReservation.objects.filter(order_id__in=order_ids, status='held').update(
+        status='committed', updated_at=now,
+    )
+    lapsed = (
+        StockReservation.objects.filter(order_id__in=order_ids, status='released')
+        .select_related('order').order_by('product_id')
+    )
+    for reservation in lapsed:
+        if _take(reservation.product_id, reservation.quantity):
+            StockReservation.objects.filter(pk=reservation.pk).update(status='committed', updated_at=now)
+            committed += 1
+        else:
+            logger.error(
+                'Order %s paid after its reservation expired; product %s is short by %s',
+                reservation.order.order_id, reservation.product_id, reservation.quantity,
+            )
+    return committed
+
+
+def release_expired(now=None, batch_size=500):
+    """Release every held reservation past its expiry; returns how many."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        ids = list(
+            StockReservation.objects.filter(status='held', expires_at__lt=now)
+            .order_by('expires_at').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return released
+        count = _release(StockReservation.objects.filter(pk__in=ids))
+        if not count:
+            # Everything left is locked by someone else releasing it
+            return released
+        released += count
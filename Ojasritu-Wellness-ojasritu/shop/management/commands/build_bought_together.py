@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from shop import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild "frequently bought together" lists from the cart snapshots of paid orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=recommendations.TOP_K,
+                            help='Related products kept per product')
+        parser.add_argument('--min-support', type=int, default=2,
+                            help='Minimum number of orders a pair must appear in together')
+
+    def handle(self, *args, **options):
+        count = recommendations.build(top_k=options['top_k'], min_support=options['min_support'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Stored bought-together lists for {count} products'))
@@ -0,0 +1,88 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from shop import query_audit
+from shop.models import Category, Order, Product, ProductReview
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the registered hot queries and flag full-table scans and unindexed sorts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, metavar='N',
+                            help='Seed N synthetic products (and N/2 orders and reviews) inside a '
+                                 'transaction that is rolled back afterwards, so plans reflect a large catalog')
+        parser.add_argument('--strict', action='store_true', help='Exit with an error if any query is flagged')
+
+    def handle(self, *args, **options):
+        reports = []
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self.seed(options['seed'])
+                    self.stdout.write(f'Seeded {options["seed"]} products (rolled back at the end)')
+                with connection.cursor() as cursor:
+                    # Fresh statistics so the planner sees the real table sizes
+                    cursor.execute('ANALYZE')
+                reports = query_audit.audit()
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        flagged = 0
+        for report in reports:
+            if report.ok:
+                self.stdout.write(self.style.SUCCESS(f'✓ {report.label}'))
+            else:
+                flagged += 1
+                problems = [f'full scan of {table}' for table in report.seq_scans]
+                if report.sorts:
+                    problems.append('sort not served by an index')
+                self.stdout.write(self.style.WARNING(f'✗ {report.label}: {", ".join(problems)}'))
+            if options['verbosity'] > 1 or not report.ok:
+                for line in report.plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        summary = f'{len(reports) - flagged}/{len(reports)} hot queries use an index'
+        if flagged and options['strict']:
+            raise CommandError(summary)
+        self.stdout.write(summary)
+
+    def seed(self, n, batch=5000):
+        rng = random.Random(42)
+        User = get_user_model()
+        users = User.objects.bulk_create(
+            [User(username=f'index-audit-{i}') for i in range(100)]
+        )
+        categories = Category.objects.bulk_create(
+            [Category(name=f'Audit {i}', slug=f'index-audit-{i}') for i in range(8)]
+        )
+        doshas = [value for value, _ in Product.DOSHA_CHOICES]
+        products = []
+        for i in range(n):
+            products.append(Product(
+                name=f'Audit product {i}', slug=f'index-audit-{i}', sku=f'AUDIT-{i}',
+                description='', benefits='', ingredients='', price=100,
+                category=rng.choice(categories), dosha_type=rng.choice(doshas), image='products/audit.png',
+                status='active' if rng.random() < 0.9 else 'draft',
+                is_bestseller=rng.random() < 0.1, is_featured=rng.random() < 0.05,
+            ))
+        products = Product.objects.bulk_create(products, batch_size=batch)
+        Order.objects.bulk_create([
+            Order(
+                order_id=f'INDEX-AUDIT-{i}', customer=users[i % len(users)], total_amount=100, final_amount=100,
+                payment_method='cashfree', cashfree_order_id=f'cf_audit_{i}' if i % 3 else '',
+            )
+            for i in range(n // 2)
+        ], batch_size=batch)
+        ProductReview.objects.bulk_create([
+            ProductReview(product=products[i], customer=users[i % len(users)], rating=5, title='t', comment='c')
+            for i in range(n // 2)
+        ], batch_size=batch)
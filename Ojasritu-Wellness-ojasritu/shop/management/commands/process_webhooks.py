@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop import webhooks
+
+
+class Command(BaseCommand):
+    help = 'Apply stored payment webhooks to orders (run as a worker with --forever, or from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Events claimed per transaction')
+        parser.add_argument('--forever', action='store_true', help='Keep polling the inbox instead of exiting when empty')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep between polls with --forever')
+
+    def handle(self, *args, **options):
+        while True:
+            handled, failed = webhooks.drain(batch_size=options['batch_size'])
+            if handled or failed or not options['forever']:
+                self.stdout.write(self.style.SUCCESS(f'✓ Processed {handled} webhook events ({failed} failed)'))
+            if not options['forever']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from shop import idempotency
+
+
+class Command(BaseCommand):
+    help = 'Delete Idempotency-Key records past their TTL (IDEMPOTENCY_KEY_TTL_HOURS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Keys deleted per statement')
+
+    def handle(self, *args, **options):
+        purged = idempotency.purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Purged {purged} expired idempotency keys'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from shop import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index (needed after bulk_create or raw imports)'
+
+    def handle(self, *args, **options):
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'✓ Indexed {count} products using the {search.backend()} backend'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from shop import ratings
+from shop.cache import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = 'Recompute product rating aggregates (sum, count, average, 1-5 star histogram) from reviews'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            changed = ratings.recompute_all()
+        if changed:
+            # bulk_update skips signals, so cached listings have to be invalidated here
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'✓ Recomputed rating aggregates; {len(changed)} products were out of date'))
@@ -0,0 +1,40 @@
+import argparse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shop import reconcile
+
+
+def positive_float(value):
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f'must be greater than 0, got {value}')
+    return number
+
+
+def positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f'must be greater than 0, got {value}')
+    return number
+
+
+class Command(BaseCommand):
+    help = 'Check long-pending orders against Cashfree and apply missed payment results (run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=positive_int, default=8, help='Concurrent gateway status calls')
+        parser.add_argument('--rate', type=positive_float, default=getattr(settings, 'CASHFREE_RECONCILE_RATE', 10.0),
+                            help='Maximum gateway status calls per second')
+        parser.add_argument('--limit', type=int, default=None, help='Check at most this many orders')
+        parser.add_argument('--batch-size', type=positive_int, default=500, help='Orders looked up and updated per transaction')
+
+    def handle(self, *args, **options):
+        result = reconcile.reconcile(
+            limit=options['limit'], workers=options['workers'], rate=options['rate'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Checked {result.checked} pending orders, updated {len(result.applied)} ({result.errors} lookups failed)'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from shop import inventory
+
+
+class Command(BaseCommand):
+    help = 'Return stock held by unpaid checkouts whose reservation TTL has passed (run every minute or two)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Reservations released per transaction')
+
+    def handle(self, *args, **options):
+        released = inventory.release_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Released {released} expired stock reservations'))
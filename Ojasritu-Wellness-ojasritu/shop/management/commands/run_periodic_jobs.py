@@ -0,0 +1,45 @@
+import logging
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# (command, seconds between runs)
+JOBS = [
+    ('release_expired_reservations', 60),
+    ('reconcile_payments', 600),
+    ('purge_idempotency_keys', 3600),
+]
+
+
+class Command(BaseCommand):
+    help = 'Run the shop maintenance commands on their schedules (started by entrypoint.sh; --once for cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run every job once and exit')
+        parser.add_argument('--tick', type=float, default=5.0, help='Seconds between schedule checks')
+
+    def run(self, name):
+        try:
+            call_command(name, stdout=self.stdout, stderr=self.stderr)
+        except Exception:
+            # One failing job must not stop the others from running
+            logger.exception('Periodic job %s failed', name)
+
+    def handle(self, *args, **options):
+        if options['once']:
+            for name, _interval in JOBS:
+                self.run(name)
+            return
+        next_run = {name: 0.0 for name, _interval in JOBS}
+        while True:
+            for name, interval in JOBS:
+                if time.monotonic() >= next_run[name]:
+                    self.run(name)
+                    next_run[name] = time.monotonic() + interval
+            # Drop connections the database closed or that broke mid-job
+            close_old_connections()
+            time.sleep(options['tick'])
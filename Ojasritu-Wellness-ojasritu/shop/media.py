@@ -0,0 +1,68 @@
+"""Absolute media URLs without per-object URL building.
+
+DRF's file fields and ``request.build_absolute_uri(obj.image.url)`` resolve
+the storage URL and re-parse the request's scheme and host for every image
+of every object. Here the scheme+host prefix is computed once per request
+(or taken from ``MEDIA_PUBLIC_ORIGIN`` when media is served from a fixed
+domain) and absolute URLs are memoized per ``(prefix, storage, file name)``.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import models
+from rest_framework import serializers
+
+_ABSOLUTE_PREFIXES = ('http://', 'https://', '//')
+
+
+def media_prefix(request=None):
+    """``scheme://host`` for media URLs, or ``''`` to keep them relative."""
+    origin = getattr(settings, 'MEDIA_PUBLIC_ORIGIN', '')
+    if origin:
+        return origin.rstrip('/')
+    if request is None:
+        return ''
+    # Cache on the HttpRequest so DRF's Request wrapper and views share it
+    http_request = getattr(request, '_request', request)
+    prefix = getattr(http_request, '_media_url_prefix', None)
+    if prefix is None:
+        prefix = f'{http_request.scheme}://{http_request.get_host()}'
+        http_request._media_url_prefix = prefix
+    return prefix
+
+
+def absolute(url, request=None):
+    """Prefix a storage-relative URL; already absolute URLs pass through."""
+    if not url or url.startswith(_ABSOLUTE_PREFIXES):
+        return url
+    return media_prefix(request) + url
+
+
+@lru_cache(maxsize=8192)
+def _storage_url(prefix, storage, name):
+    url = storage.url(name)
+    if prefix and not url.startswith(_ABSOLUTE_PREFIXES):
+        url = prefix + url
+    return url
+
+
+def media_url(file, request=None):
+    """Absolute URL of a ``FieldFile`` (``None`` when the field is empty)."""
+    if not file:
+        return None
+    return _storage_url(media_prefix(request), file.storage, file.name)
+
+
+class MediaImageField(serializers.ImageField):
+    """``ImageField`` whose representation comes from ``media_url``."""
+
+    def to_representation(self, value):
+        return media_url(value, self.context.get('request'))
+
+
+class MediaURLSerializerMixin:
+    """Map model ``ImageField``s to ``MediaImageField`` on a ``ModelSerializer``."""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: MediaImageField,
+    }
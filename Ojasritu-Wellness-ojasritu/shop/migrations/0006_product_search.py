@@ -0,0 +1,54 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_FIELDS = ('name', 'hindi_name', 'description', 'benefits', 'ingredients')
+
+
+def create_search_index(apps, schema_editor):
+    """GIN index on PostgreSQL, FTS5 shadow table on SQLite, nothing elsewhere."""
+    vendor = schema_editor.connection.vendor
+    columns = ', '.join(SEARCH_FIELDS)
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS product_search_gin ON shop_product USING GIN (search_vector)'
+        )
+        schema_editor.execute(
+            "UPDATE shop_product SET search_vector = "
+            "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(hindi_name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'C') || "
+            "setweight(to_tsvector('simple', coalesce(benefits, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(ingredients, '')), 'B')"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS shop_product_fts USING fts5("
+            f"{columns}, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO shop_product_fts (rowid, {columns}) SELECT id, {columns} FROM shop_product'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS product_search_gin')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS shop_product_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0005_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0007_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='shop_order_order_i_6fac8b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='shop_order_custome_edf08a_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='shop_produc_slug_76971b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='shop_produc_categor_d249e3_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_cursor_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['cashfree_order_id'], name='order_cashfree_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['-is_featured', '-is_bestseller', '-created_at', '-id'], name='product_active_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['category', '-is_featured', '-is_bestseller', '-created_at', '-id'], name='product_active_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['dosha_type', '-is_featured', '-is_bestseller', '-created_at', '-id'], name='product_active_dosha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_bestseller', True), ('status', 'active')), fields=['-is_featured', '-is_bestseller', '-created_at', '-id'], name='product_bestseller_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(fields=['product', '-created_at', '-id'], name='review_product_recent_idx'),
+        ),
+    ]
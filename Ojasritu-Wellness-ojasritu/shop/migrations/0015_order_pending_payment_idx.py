@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0014_webhook_event'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('payment_status', 'pending')), fields=['created_at'], name='order_pending_payment_idx'),
+        ),
+    ]
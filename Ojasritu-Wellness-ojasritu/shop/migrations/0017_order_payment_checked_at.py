@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0016_idempotencykey_claimed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='payment_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.contrib.postgres.search import SearchVectorField
+
+from .pricing import price_cart, price_line
 
 # ✅ Category Model
 class Category(models.Model):
@@ -83,17 +87,46 @@ class Product(models.Model):
     # Ratings & Reviews
     rating = models.FloatField(default=0, validators=[MinValueValidator(0), MaxValueValidator(5)])
     total_reviews = models.PositiveIntegerField(default=0)
+    # Running aggregates maintained by shop/ratings.py; never aggregated at read time
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Full-text search (PostgreSQL only, maintained by shop/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         ordering = ['-is_featured', '-is_bestseller', '-created_at']
+        # Storefront queries only ever read active products and order by
+        # Meta.ordering + pk (keyset pagination), so the indexes are partial on
+        # status='active' and end in that ordering. Filtered listings get an
+        # index per filter column; slug (unique) and category (FK) are already
+        # indexed. Checked by `manage.py index_audit`.
         indexes = [
-            models.Index(fields=['slug']),
-            models.Index(fields=['category']),
             models.Index(fields=['status']),
+            models.Index(
+                fields=['-is_featured', '-is_bestseller', '-created_at', '-id'],
+                name='product_active_cursor_idx', condition=models.Q(status='active'),
+            ),
+            models.Index(
+                fields=['category', '-is_featured', '-is_bestseller', '-created_at', '-id'],
+                name='product_active_category_idx', condition=models.Q(status='active'),
+            ),
+            models.Index(
+                fields=['dosha_type', '-is_featured', '-is_bestseller', '-created_at', '-id'],
+                name='product_active_dosha_idx', condition=models.Q(status='active'),
+            ),
+            models.Index(
+                fields=['-is_featured', '-is_bestseller', '-created_at', '-id'],
+                name='product_bestseller_idx', condition=models.Q(status='active', is_bestseller=True),
+            ),
         ]
     
     def __str__(self):
@@ -104,6 +137,9 @@ class Product(models.Model):
             return int(((self.price - self.discount_price) / self.price) * 100)
         return 0
     
+    def get_rating_histogram(self):
+        return {star: getattr(self, f'rating_{star}_count') for star in range(1, 6)}
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
@@ -128,11 +164,33 @@ class ProductReview(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['product', 'customer']
+        indexes = [
+            # One per sort option of /api/products/<slug>/reviews/
+            models.Index(fields=['product', '-created_at', '-id'], name='review_product_recent_idx'),
+            models.Index(fields=['product', '-helpful_count', '-created_at', '-id'], name='review_product_helpful_idx'),
+            models.Index(fields=['product', '-rating', '-created_at', '-id'], name='review_product_rating_idx'),
+        ]
     
     def __str__(self):
         return f"{self.product.name} - {self.rating}⭐ by {self.customer.username}"
 
 
+# ✅ ProductAssociation Model
+class ProductAssociation(models.Model):
+    """Precomputed "frequently bought together" list for one product.
+
+    Rebuilt offline by `manage.py build_bought_together` (shop/recommendations.py).
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='association')
+    # Top-k co-purchased product ids, best first, with their co-occurrence counts
+    related_ids = models.JSONField(default=list)
+    counts = models.JSONField(default=list)
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Bought with {self.product.name}: {self.related_ids}"
+
+
 # ✅ Cart Model
 class Cart(models.Model):
     """Shopping cart for customers"""
@@ -143,8 +201,14 @@ class Cart(models.Model):
     def __str__(self):
         return f"Cart of {self.customer.username}"
     
+    def get_price_quote(self):
+        """Price every line from one joined query (see shop/pricing.py)."""
+        return price_cart(self.items.select_related('product').only(
+            'cart', 'quantity', 'product', 'product__price', 'product__discount_price', 'product__bulk_discount',
+        ))
+    
     def get_total_price(self):
-        return sum(item.get_total_price() for item in self.items.all())
+        return self.get_price_quote().total
 
 
 # ✅ CartItem Model
@@ -155,9 +219,15 @@ class CartItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     added_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        constraints = [
+            # One line per product; add_to_cart relies on it to upsert (shop/carts.py)
+            models.UniqueConstraint(fields=['cart', 'product'], name='cartitem_unique_product'),
+        ]
+    
     def get_total_price(self):
-        price = self.product.discount_price or self.product.price
-        return price * self.quantity
+        # Includes bulk_discount tiers (shop/pricing.py)
+        return price_line(self.product, self.quantity).total
     
     def __str__(self):
         return f"{self.product.name} x {self.quantity}"
@@ -210,6 +280,8 @@ class Order(models.Model):
     transaction_id = models.CharField(max_length=200, blank=True)
     cashfree_order_id = models.CharField(max_length=120, blank=True)
     cashfree_payment_session_id = models.CharField(max_length=200, blank=True)
+    # Last time reconcile_payments asked Cashfree about a still-pending payment
+    payment_checked_at = models.DateTimeField(null=True, blank=True)
     cart_snapshot = models.JSONField(default=list, blank=True)
     
     # Notes
@@ -227,15 +299,107 @@ class Order(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['order_id']),
-            models.Index(fields=['customer']),
             models.Index(fields=['status']),
+            # Cursor indexes for the staff listing and the per-customer listing
+            models.Index(fields=['-created_at', '-id'], name='order_cursor_idx'),
+            models.Index(fields=['customer', '-created_at', '-id'], name='order_customer_cursor_idx'),
+            # Payment webhooks look orders up by the gateway's id
+            models.Index(fields=['cashfree_order_id'], name='order_cashfree_order_idx'),
+            # reconcile_payments scans the oldest still-pending payments
+            models.Index(fields=['created_at'], condition=models.Q(payment_status='pending'),
+                         name='order_pending_payment_idx'),
         ]
     
     def __str__(self):
         return f"Order {self.order_id}"
 
 
+# ✅ Stock held for an order while its payment is pending (shop/inventory.py)
+class StockReservation(models.Model):
+    STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('committed', 'Committed'),
+        ('released', 'Released'),
+    ]
+    
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='held')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            # release_expired_reservations: held rows, oldest expiry first
+            models.Index(fields=['expires_at'], condition=models.Q(status='held'), name='reservation_held_expiry_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} x {self.quantity} for {self.order_id} ({self.status})"
+
+
+# ✅ Payment gateway webhook inbox (shop/webhooks.py)
+class WebhookEvent(models.Model):
+    """A received webhook, stored before any processing.
+
+    Rows are only ever inserted and then stamped as processed; the raw body
+    and headers are kept as received for audits and replays.
+    """
+    provider = models.CharField(max_length=20, default='cashfree')
+    # order id + normalized status: Cashfree retries of one event collapse
+    dedupe_key = models.CharField(max_length=200, unique=True)
+    order_ref = models.CharField(max_length=120)
+    payment_status = models.CharField(max_length=20)
+    body = models.TextField()
+    headers = models.JSONField(default=dict)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    outcome = models.CharField(max_length=20, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        indexes = [
+            # process_webhooks drains unprocessed rows in arrival order
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True), name='webhook_pending_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.provider} {self.dedupe_key}"
+
+
+# ✅ Idempotency-Key store for order-creating endpoints (shop/idempotency.py)
+class IdempotencyKey(models.Model):
+    STATUS_CHOICES = [
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='processing')
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    # When the current holder claimed the key; a 'processing' row whose claim
+    # is older than idempotency.claim_lease() is abandoned and can be taken over
+    claimed_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        constraints = [
+            # Concurrent duplicates race on this insert; exactly one wins
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='idempotency_key_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope}:{self.key} ({self.status})"
+
+
 # Keep old Booking class for backward compatibility, but redirect to Rebooking
 class Booking(models.Model):
     """Service Bookings & Rebooking"""
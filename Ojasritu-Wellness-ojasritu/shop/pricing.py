@@ -0,0 +1,137 @@
+"""Price carts, checkouts and listing badges from one set of rules.
+
+A product's unit price is ``discount_price or price``. ``bulk_discount``
+holds quantity tiers as ``{"min_quantity": percent_off}``, e.g.
+``{"10": 10, "50": 15}``: 10 or more units are 10% off, 50 or more 15% off.
+The discounted unit price is rounded half-up to the paisa and the line
+total is that unit price times the quantity, all in ``Decimal``.
+
+Tier tables are parsed once per distinct table (``_parse_tiers`` is
+memoized on the table's contents) and the result is kept on the product
+instance, so pricing a cart is one pass over its lines.
+"""
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
+
+PAISA = Decimal('0.01')
+HUNDRED = Decimal('100')
+ZERO = Decimal('0.00')
+
+
+@dataclass(frozen=True)
+class Tier:
+    min_quantity: int
+    percent: Decimal
+
+
+@dataclass(slots=True)
+class LinePrice:
+    product_id: int
+    quantity: int
+    base_unit_price: Decimal
+    unit_price: Decimal
+    discount_percent: Decimal
+    total: Decimal
+
+    @property
+    def savings(self):
+        return self.base_unit_price * self.quantity - self.total
+
+
+@dataclass(slots=True)
+class CartPrice:
+    lines: tuple
+    subtotal: Decimal
+    total: Decimal
+    item_count: int
+
+    @property
+    def discount(self):
+        return self.subtotal - self.total
+
+
+@lru_cache(maxsize=4096)
+def _parse_tiers(items):
+    tiers = []
+    for raw_quantity, raw_percent in items:
+        try:
+            quantity = int(raw_quantity)
+            percent = Decimal(str(raw_percent))
+        except (TypeError, ValueError, InvalidOperation):
+            continue
+        if quantity > 1 and ZERO < percent < HUNDRED:
+            tiers.append(Tier(quantity, percent))
+    # Largest threshold first so the first match is the best tier
+    return tuple(sorted(tiers, key=lambda t: t.min_quantity, reverse=True))
+
+
+def tiers_for(product):
+    """Parsed tiers of a product, largest ``min_quantity`` first."""
+    table = product.bulk_discount
+    if not table or not isinstance(table, dict):
+        return ()
+    # Remembered on the instance for as long as bulk_discount is the same object
+    cached = product.__dict__.get('_bulk_tiers')
+    if cached is not None and cached[0] is table:
+        return cached[1]
+    try:
+        tiers = _parse_tiers(tuple(sorted(table.items())))
+    except TypeError:
+        # Unhashable or mixed-type values: parse without the memo
+        tiers = _parse_tiers.__wrapped__(table.items())
+    product.__dict__['_bulk_tiers'] = (table, tiers)
+    return tiers
+
+
+def base_unit_price(product):
+    price = product.discount_price or product.price
+    # Unsaved instances may still hold the int/float/str they were built with
+    return price if isinstance(price, Decimal) else Decimal(str(price))
+
+
+def _discounted(base, percent):
+    return (base * (HUNDRED - percent) / HUNDRED).quantize(PAISA, rounding=ROUND_HALF_UP)
+
+
+def price_line(product, quantity):
+    quantity = int(quantity)
+    base = base_unit_price(product)
+    percent = ZERO
+    for tier in tiers_for(product):
+        if quantity >= tier.min_quantity:
+            percent = tier.percent
+            break
+    unit = _discounted(base, percent) if percent else base
+    return LinePrice(product.pk, quantity, base, unit, percent, unit * quantity)
+
+
+def price_cart(lines):
+    """Price ``(product, quantity)`` pairs or cart items in a single pass."""
+    priced = []
+    subtotal = total = ZERO
+    count = 0
+    for line in lines:
+        if isinstance(line, tuple):
+            product, quantity = line
+        else:
+            product, quantity = line.product, line.quantity
+        result = price_line(product, quantity)
+        priced.append(result)
+        subtotal += result.base_unit_price * result.quantity
+        total += result.total
+        count += result.quantity
+    return CartPrice(tuple(priced), subtotal, total, count)
+
+
+def tier_badges(product):
+    """Tiers for listing badges, smallest quantity first, with the unit price they unlock."""
+    base = base_unit_price(product)
+    return [
+        {
+            'min_quantity': tier.min_quantity,
+            'percent': tier.percent,
+            'unit_price': _discounted(base, tier.percent),
+        }
+        for tier in reversed(tiers_for(product))
+    ]
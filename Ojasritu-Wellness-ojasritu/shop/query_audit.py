@@ -0,0 +1,158 @@
+"""Registry of hot storefront queries and EXPLAIN-based plan checks.
+
+Each ``@hot_query`` function returns the queryset a real endpoint runs, with
+sample filter values taken from the current database. ``audit()`` explains
+them and reports full-table scans and sorts that an index should have
+avoided; ``manage.py index_audit`` prints the result.
+"""
+import re
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Order, Product, ProductReview, StockReservation
+from .pagination import KeysetPagination
+
+PRODUCT_ORDERING = ('-is_featured', '-is_bestseller', '-created_at', '-id')
+ORDER_ORDERING = ('-created_at', '-id')
+PAGE = 24
+
+HOT_QUERIES = []
+
+
+def hot_query(label):
+    def register(fn):
+        HOT_QUERIES.append((label, fn))
+        return fn
+    return register
+
+
+def _active_products():
+    return Product.objects.filter(status='active')
+
+
+def _sample(queryset, field_name):
+    return queryset.order_by().values_list(field_name, flat=True).first()
+
+
+@hot_query('products: listing')
+def product_listing():
+    return _active_products().order_by(*PRODUCT_ORDERING)[:PAGE]
+
+
+@hot_query('products: listing, next cursor page')
+def product_listing_next_page():
+    ordering = [(name.lstrip('-'), name.startswith('-')) for name in PRODUCT_ORDERING]
+    row = _active_products().order_by(*PRODUCT_ORDERING).values_list(*(name for name, _ in ordering))[PAGE:PAGE + 1]
+    position = list(row)[0] if row else (False, False, None, 0)
+    paginator = KeysetPagination()
+    paginator.opts = Product._meta
+    seek = paginator._seek_filter(ordering, position, reverse=False)
+    return _active_products().filter(seek).order_by(*PRODUCT_ORDERING)[:PAGE]
+
+
+@hot_query('products: by category')
+def product_by_category():
+    return _active_products().filter(category_id=_sample(Product.objects, 'category_id')).order_by(*PRODUCT_ORDERING)[:PAGE]
+
+
+@hot_query('products: by dosha')
+def product_by_dosha():
+    return _active_products().filter(dosha_type='vata').order_by(*PRODUCT_ORDERING)[:PAGE]
+
+
+@hot_query('products: bestsellers')
+def product_bestsellers():
+    return _active_products().filter(is_bestseller=True).order_by(*PRODUCT_ORDERING)[:PAGE]
+
+
+@hot_query('products: detail by slug')
+def product_detail():
+    return _active_products().filter(slug=_sample(Product.objects, 'slug'))
+
+
+def _product_reviews(*ordering):
+    product_id = _sample(ProductReview.objects, 'product_id')
+    return ProductReview.objects.filter(product_id=product_id).order_by(*ordering)[:PAGE]
+
+
+@hot_query('reviews: recent')
+def reviews_recent():
+    return _product_reviews('-created_at', '-id')
+
+
+@hot_query('reviews: most helpful')
+def reviews_helpful():
+    return _product_reviews('-helpful_count', '-created_at', '-id')
+
+
+@hot_query('reviews: highest rated')
+def reviews_rating():
+    return _product_reviews('-rating', '-created_at', '-id')
+
+
+@hot_query('orders: customer history')
+def customer_orders():
+    return Order.objects.filter(customer_id=_sample(Order.objects, 'customer_id')).order_by(*ORDER_ORDERING)[:PAGE]
+
+
+@hot_query('orders: staff listing')
+def staff_orders():
+    return Order.objects.order_by(*ORDER_ORDERING)[:PAGE]
+
+
+@hot_query('orders: webhook lookup by cashfree_order_id')
+def webhook_order_lookup():
+    # Order.objects.get() drops the default ordering
+    return Order.objects.filter(cashfree_order_id=_sample(Order.objects, 'cashfree_order_id') or 'cf_missing').order_by()
+
+
+@hot_query('reservations: expired sweep')
+def expired_reservations():
+    return (
+        StockReservation.objects.filter(status='held', expires_at__lt=timezone.now())
+        .order_by('expires_at').values_list('pk', flat=True)[:500]
+    )
+
+
+@hot_query('orders: stale pending payments')
+def stale_pending_payments():
+    return (
+        Order.objects.filter(payment_status='pending', created_at__lt=timezone.now())
+        .filter(Q(payment_checked_at__isnull=True) | Q(payment_checked_at__lt=timezone.now()))
+        .exclude(cashfree_order_id='').order_by('created_at').values_list('cashfree_order_id', flat=True)
+    )
+
+
+@dataclass
+class PlanReport:
+    label: str
+    plan: str
+    seq_scans: list = field(default_factory=list)
+    sorts: bool = False
+
+    @property
+    def ok(self):
+        return not self.seq_scans and not self.sorts
+
+
+# PostgreSQL: "Seq Scan on shop_product"; SQLite: "SCAN shop_product" without "USING ... INDEX"
+_PG_SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+_PG_SORT = re.compile(r'^\s*(->\s*)?(Incremental )?Sort\b', re.MULTILINE)
+_SQLITE_SCAN = re.compile(r'\bSCAN (\w+)(?!\w| USING)')
+_SQLITE_SORT = re.compile(r'USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY')
+
+
+def explain(label, queryset):
+    plan = queryset.explain()
+    if connection.vendor == 'postgresql':
+        scans, sorts = _PG_SEQ_SCAN.findall(plan), bool(_PG_SORT.search(plan))
+    else:
+        scans, sorts = _SQLITE_SCAN.findall(plan), bool(_SQLITE_SORT.search(plan))
+    return PlanReport(label, plan, sorted(set(scans)), sorts)
+
+
+def audit():
+    return [explain(label, fn()) for label, fn in HOT_QUERIES]
@@ -0,0 +1,94 @@
+"""Running rating aggregates on ``Product``.
+
+``rating_sum``, ``total_reviews`` and the ``rating_N_count`` histogram are
+adjusted with ``F()`` expressions in the same transaction as the review
+write (see ``shop/signals.py``), so concurrent reviews never lose an update
+and reads never aggregate the reviews table. ``rating`` is the average,
+recomputed from the adjusted columns in the same ``UPDATE``.
+
+``recompute_all()`` re-derives everything from ``ProductReview`` for repairs
+after raw SQL or ``queryset.update()`` on reviews. A product with no
+reviews keeps its ``rating`` (catalog data seeds a curated one) and only
+has its counters zeroed; its first review replaces it with the average.
+"""
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+STARS = range(1, 6)
+
+
+def star_field(star):
+    return f'rating_{star}_count'
+
+
+def _average(sum_expr, count_expr):
+    return Round(Coalesce(Cast(sum_expr, FloatField()) / NullIf(count_expr, 0), Value(0.0)), 2)
+
+
+def apply_change(old=None, new=None):
+    """Move one review's contribution between products and/or stars.
+
+    ``old`` and ``new`` are ``(product_id, rating)`` pairs or ``None`` for a
+    create or delete respectively.
+    """
+    from .models import Product
+
+    if old == new:
+        return
+    if old and new and old[0] != new[0]:
+        apply_change(old, None)
+        apply_change(None, new)
+        return
+
+    product_id = (new or old)[0]
+    sum_delta = (new[1] if new else 0) - (old[1] if old else 0)
+    count_delta = (1 if new else 0) - (1 if old else 0)
+    updates = {
+        'rating_sum': F('rating_sum') + sum_delta,
+        'total_reviews': F('total_reviews') + count_delta,
+        # Right-hand sides see the pre-update row, so apply the deltas here too
+        'rating': _average(F('rating_sum') + sum_delta, F('total_reviews') + count_delta),
+    }
+    if old:
+        updates[star_field(old[1])] = F(star_field(old[1])) - 1
+    if new:
+        updates[star_field(new[1])] = F(star_field(new[1])) + 1
+    Product.objects.filter(pk=product_id).update(**updates)
+
+
+def aggregate_reviews(review_queryset):
+    """``{product_id: {field: value}}`` for every product with reviews, in one query."""
+    annotations = {'rating_sum': Sum('rating'), 'total_reviews': Count('id')}
+    for star in STARS:
+        annotations[star_field(star)] = Count('id', filter=Q(rating=star))
+    rows = review_queryset.order_by().values('product_id').annotate(**annotations)
+    aggregates = {}
+    for row in rows:
+        product_id = row.pop('product_id')
+        row['rating'] = round(row['rating_sum'] / row['total_reviews'], 2)
+        aggregates[product_id] = row
+    return aggregates
+
+
+AGGREGATE_FIELDS = ['rating', 'rating_sum', 'total_reviews'] + [star_field(star) for star in STARS]
+
+
+def recompute_all(product_model=None, review_model=None, batch_size=500):
+    """Recompute aggregates for every product; returns the ids that had drifted.
+
+    Unreviewed products keep their ``rating``; see the module docstring.
+    """
+    if product_model is None:
+        from .models import Product as product_model, ProductReview as review_model
+
+    aggregates = aggregate_reviews(review_model.objects.all())
+    empty = dict.fromkeys(AGGREGATE_FIELDS, 0)
+    changed = []
+    for product in product_model.objects.only('pk', *AGGREGATE_FIELDS).iterator(chunk_size=2000):
+        expected = aggregates.get(product.pk) or {**empty, 'rating': product.rating}
+        if any(getattr(product, field) != expected[field] for field in AGGREGATE_FIELDS):
+            for field in AGGREGATE_FIELDS:
+                setattr(product, field, expected[field])
+            changed.append(product)
+    product_model.objects.bulk_update(changed, AGGREGATE_FIELDS, batch_size=batch_size)
+    return [product.pk for product in changed]
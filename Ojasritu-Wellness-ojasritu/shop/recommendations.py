@@ -0,0 +1,144 @@
+"""Frequently-bought-together lists mined from paid orders.
+
+``build()`` streams ``Order.cart_snapshot`` of paid orders and maps the
+products sold often enough to matter to dense indices. Pairs are counted in
+flat ``array`` counters over the upper triangle of the co-occurrence matrix,
+a block of rows per pass so memory stays bounded, and only cells reaching
+the minimum support are kept, keyed by ``i * n + j``. The top-k partners per
+product (ranked by co-occurrence, then confidence) go to
+``ProductAssociation``, one compact row per product.
+
+``related_ids()`` serves a product's active partners and tops the list up
+from the same category and dosha, e.g. for products with no purchase
+history yet.
+"""
+import heapq
+from array import array
+
+from django.db import transaction
+
+from .cache import bump_catalog_version
+from .models import Order, Product, ProductAssociation
+
+TOP_K = 10
+# Pair counters per pass over the baskets (4 bytes each)
+BLOCK_CELLS = 1 << 22
+
+
+def baskets():
+    """Yield the distinct product ids of each paid order."""
+    snapshots = (Order.objects.filter(payment_status='paid').exclude(cart_snapshot=[])
+                 .values_list('cart_snapshot', flat=True).iterator(chunk_size=2000))
+    for snapshot in snapshots:
+        ids = {item.get('product_id') for item in snapshot or () if isinstance(item, dict)}
+        ids.discard(None)
+        if ids:
+            yield ids
+
+
+def count_pairs(basket_iter, min_support=1):
+    """Return ``(product_ids, order_counts, pair_counts)`` for the baskets.
+
+    ``product_ids[i]`` is the product at dense index ``i``; ``pair_counts``
+    maps ``i * n + j`` (``i < j``) to the number of orders with both, where
+    ``n`` is ``len(product_ids)``. Products (and so pairs) in fewer than
+    ``min_support`` orders are left out.
+    """
+    baskets = [tuple(basket) for basket in basket_iter]
+    sold = {}
+    for basket in baskets:
+        for pid in basket:
+            sold[pid] = sold.get(pid, 0) + 1
+    product_ids = [pid for pid, count in sold.items() if count >= min_support]
+    index = {pid: i for i, pid in enumerate(product_ids)}
+    n = len(product_ids)
+    order_counts = array('L', (sold[pid] for pid in product_ids))
+    encoded = []
+    for basket in baskets:
+        dense = sorted(index[pid] for pid in basket if pid in index)
+        if len(dense) > 1:
+            encoded.append(dense)
+
+    pair_counts = {}
+    start = 0
+    while start < n - 1:
+        # Rows start..stop-1 of the triangle; row i holds j = i+1..n-1 at base[i] + j
+        base, cells, stop = {}, 0, start
+        while stop < n - 1 and (stop == start or cells + n - 1 - stop <= BLOCK_CELLS):
+            base[stop] = cells - stop - 1
+            cells += n - 1 - stop
+            stop += 1
+        counts = array('I', bytes(4 * cells))
+        for dense in encoded:
+            for a, i in enumerate(dense):
+                if i >= stop:
+                    break
+                if i >= start:
+                    offset = base[i]
+                    for j in dense[a + 1:]:
+                        counts[offset + j] += 1
+        for i in range(start, stop):
+            offset = base[i]
+            for j in range(i + 1, n):
+                count = counts[offset + j]
+                if count >= min_support:
+                    pair_counts[i * n + j] = count
+        start = stop
+    return product_ids, order_counts, pair_counts
+
+
+def top_related(product_ids, order_counts, pair_counts, top_k=TOP_K, min_support=2):
+    """``{product_id: [(related_id, count), ...]}`` with the best ``top_k`` partners."""
+    n = len(product_ids)
+    partners = {}
+    for key, count in pair_counts.items():
+        if count < min_support:
+            continue
+        i, j = divmod(key, n)
+        partners.setdefault(i, []).append((count, j))
+        partners.setdefault(j, []).append((count, i))
+    result = {}
+    for i, candidates in partners.items():
+        # Ties go to the partner bought with i most often relative to its own sales
+        best = heapq.nlargest(top_k, candidates, key=lambda c: (c[0], c[0] / order_counts[c[1]], -c[1]))
+        result[product_ids[i]] = [(product_ids[j], count) for count, j in best]
+    return result
+
+
+@transaction.atomic
+def build(top_k=TOP_K, min_support=2):
+    """Rebuild every ``ProductAssociation`` row; returns the number written."""
+    related = top_related(*count_pairs(baskets(), min_support), top_k=top_k, min_support=min_support)
+    existing = set(Product.objects.filter(pk__in=related).values_list('pk', flat=True))
+    ProductAssociation.objects.all().delete()
+    ProductAssociation.objects.bulk_create([
+        ProductAssociation(
+            product_id=pid,
+            related_ids=[rid for rid, _ in pairs],
+            counts=[count for _, count in pairs],
+        )
+        for pid, pairs in related.items() if pid in existing
+    ], batch_size=1000)
+    # bulk writes skip signals; cached /related/ responses hang off the catalog version
+    transaction.on_commit(bump_catalog_version)
+    return len(existing)
+
+
+def related_ids(product, limit=TOP_K):
+    """Active co-purchased product ids for ``product``, topped up to ``limit``."""
+    association = ProductAssociation.objects.filter(product=product).values_list('related_ids', flat=True).first()
+    ids = [pid for pid in association or () if pid != product.pk]
+    if ids:
+        # Partners can be deactivated after the lists were built
+        active = set(Product.objects.filter(pk__in=ids, status='active').values_list('pk', flat=True))
+        ids = [pid for pid in ids if pid in active][:limit]
+    if len(ids) < limit:
+        # Same category and dosha first, then anything else in the category
+        seen = set(ids) | {product.pk}
+        active = Product.objects.filter(status='active', category_id=product.category_id).exclude(pk__in=seen)
+        ranking = ('-is_bestseller', '-total_reviews', '-rating', '-id')
+        for queryset in (active.filter(dosha_type=product.dosha_type), active.exclude(dosha_type=product.dosha_type)):
+            ids += list(queryset.order_by(*ranking).values_list('pk', flat=True)[:limit - len(ids)])
+            if len(ids) >= limit:
+                break
+    return ids
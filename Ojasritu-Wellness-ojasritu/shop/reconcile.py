@@ -0,0 +1,157 @@
+"""Reconcile pending orders whose payment webhook never arrived.
+
+``manage.py reconcile_payments`` picks orders that have been
+``payment_status='pending'`` for a while, asks Cashfree for each one's
+``order_status`` from a bounded thread pool behind a shared token bucket
+(so a backlog of thousands neither runs serially nor trips the gateway's
+rate limit), and applies the answers through the same bulk transition the
+webhook inbox uses. Orders that stay pending (still ``ACTIVE`` at Cashfree,
+or unknown to it) are stamped ``payment_checked_at`` and skipped until
+``recheck_after()`` has passed, so they do not eat every run's rate budget.
+Worker threads only talk HTTP; all database work stays on the calling
+thread.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import webhooks
+from .cashfree import CashfreeError, get_cashfree_order
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+# Cashfree order_status -> our payment_status. ACTIVE orders can still be
+# paid, so they stay pending; the stock sweeper has already freed their hold.
+GATEWAY_STATUS = {
+    'PAID': 'paid',
+    'EXPIRED': 'failed',
+    'TERMINATED': 'failed',
+}
+RATE_LIMITED_RETRIES = 3
+
+
+def stale_after():
+    return timedelta(minutes=getattr(settings, 'PAYMENT_RECONCILE_AFTER_MINUTES', 30))
+
+
+def recheck_after():
+    return timedelta(minutes=getattr(settings, 'PAYMENT_RECONCILE_RECHECK_MINUTES', 360))
+
+
+def stale_orders(now=None, limit=None):
+    """``cashfree_order_id`` of pending orders older than ``stale_after()`` and
+    not checked within ``recheck_after()``, oldest first."""
+    now = now or timezone.now()
+    refs = (
+        Order.objects.filter(payment_status='pending', created_at__lt=now - stale_after())
+        .filter(Q(payment_checked_at__isnull=True) | Q(payment_checked_at__lt=now - recheck_after()))
+        .exclude(cashfree_order_id='')
+        .order_by('created_at').values_list('cashfree_order_id', flat=True)
+    )
+    return list(refs[:limit] if limit else refs)
+
+
+class RateLimiter:
+    """Token bucket shared by the pool: ``rate`` calls per second, bursts of ``burst``."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._clock, self._sleep = clock, sleep
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            self._sleep(wait)
+
+    def pause(self, seconds):
+        """Stop every caller for ``seconds``, e.g. after a 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+            self._tokens = 0.0
+
+
+@dataclass
+class Result:
+    checked: int = 0
+    errors: int = 0
+    statuses: dict = field(default_factory=dict)
+    applied: set = field(default_factory=set)
+
+
+def _lookup(ref, limiter):
+    for attempt in range(RATE_LIMITED_RETRIES + 1):
+        limiter.acquire()
+        try:
+            data = get_cashfree_order(ref)
+        except CashfreeError as e:
+            if e.status_code == 429 and attempt < RATE_LIMITED_RETRIES:
+                limiter.pause(e.retry_after or 2 ** attempt)
+                continue
+            raise
+        return GATEWAY_STATUS.get(str(data.get('order_status', '')).upper(), 'pending')
+
+
+def _settled(error):
+    """True when asking again soon would get the same answer (e.g. 404)."""
+    return error.status_code is not None and 400 <= error.status_code < 500 and error.status_code != 429
+
+
+def fetch_statuses(refs, workers=8, rate=10.0):
+    """Ask the gateway about ``refs`` concurrently; returns ``(statuses, failures)``.
+
+    ``failures`` maps each ref whose lookup failed to its ``CashfreeError``.
+    """
+    limiter = RateLimiter(rate)
+    statuses, failures = {}, {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reconcile') as pool:
+        futures = {ref: pool.submit(_lookup, ref, limiter) for ref in refs}
+        for ref, future in futures.items():
+            try:
+                statuses[ref] = future.result()
+            except CashfreeError as e:
+                failures[ref] = e
+                logger.warning('Reconcile lookup for %s failed: %s', ref, e)
+    return statuses, failures
+
+
+def reconcile(limit=None, workers=8, rate=10.0, batch_size=500, now=None):
+    """Check stale pending orders against Cashfree and apply what changed."""
+    result = Result()
+    now = now or timezone.now()
+    refs = stale_orders(now=now, limit=limit)
+    for start in range(0, len(refs), batch_size):
+        chunk = refs[start:start + batch_size]
+        statuses, failures = fetch_statuses(chunk, workers=workers, rate=rate)
+        result.checked += len(statuses)
+        result.errors += len(failures)
+        result.statuses.update(statuses)
+        # Transient failures (timeouts, 5xx, 429) are retried on the next run
+        checked = [*statuses, *(ref for ref, error in failures.items() if _settled(error))]
+        with transaction.atomic():
+            _found, applied = webhooks.apply_statuses(statuses)
+            Order.objects.filter(cashfree_order_id__in=checked, payment_status='pending').update(payment_checked_at=now)
+        result.applied |= applied
+    return result
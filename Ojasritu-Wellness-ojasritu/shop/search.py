@@ -0,0 +1,144 @@
+"""Ranked full-text product search.
+
+Production runs on PostgreSQL, where ``Product.search_vector`` holds a
+weighted ``tsvector`` backed by a GIN index. Local SQLite databases use an
+FTS5 virtual table (``shop_product_fts``) keyed by product id. Both are
+created by migration ``0006_product_search`` and kept in sync from
+``post_save``/``post_delete`` in ``shop/signals.py``; ``rebuild_index()``
+refills either one in a single statement after bulk loads.
+
+Any other backend falls back to ``icontains`` so search keeps working, just
+without an index.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, Q
+
+from .models import Product
+
+FTS_TABLE = 'shop_product_fts'
+SEARCH_FIELDS = ('name', 'hindi_name', 'description', 'benefits', 'ingredients')
+# Relative importance of each field, used for both the tsvector weights and bm25()
+FIELD_WEIGHTS = {'name': 'A', 'hindi_name': 'A', 'benefits': 'B', 'ingredients': 'B', 'description': 'C'}
+BM25_WEIGHTS = {'A': 10.0, 'B': 4.0, 'C': 2.0}
+MAX_RESULTS = 200
+
+# Split on whitespace and on characters that carry meaning in tsquery/FTS5
+# syntax. \W is not used because Devanagari vowel signs are not alphanumeric.
+_TOKEN_SPLIT = re.compile(r'[\s"\'`*:&|!()<>\[\]{}^+\-.,;?/\\~@#$%=]+')
+
+
+def tokenize(query):
+    return [t for t in _TOKEN_SPLIT.split((query or '').lower()) if t][:10]
+
+
+def backend():
+    if connection.vendor == 'postgresql':
+        return 'postgres'
+    if connection.vendor == 'sqlite':
+        return 'fts5'
+    return 'icontains'
+
+
+def _search_vector():
+    vector = None
+    for field in SEARCH_FIELDS:
+        part = SearchVector(field, weight=FIELD_WEIGHTS[field], config='simple')
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def _fts_match(tokens):
+    # Every token must match; the last one as a prefix so results follow keystrokes
+    quoted = ['"%s"' % t.replace('"', '""') for t in tokens]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _fts_rank_args():
+    return ', '.join(str(BM25_WEIGHTS[FIELD_WEIGHTS[f]]) for f in SEARCH_FIELDS)
+
+
+def ranked_ids(query, limit=MAX_RESULTS):
+    """Return ids of active products matching ``query``, best match first."""
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    limit = min(limit, MAX_RESULTS)
+    engine = backend()
+
+    if engine == 'postgres':
+        raw = ' & '.join(tokens[:-1] + [f'{tokens[-1]}:*'])
+        search_query = SearchQuery(raw, config='simple', search_type='raw')
+        return list(
+            Product.objects.filter(status='active', search_vector=search_query)
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', '-id')
+            .values_list('id', flat=True)[:limit]
+        )
+
+    if engine == 'fts5':
+        sql = (
+            f'SELECT p.id FROM {FTS_TABLE} f JOIN shop_product p ON p.id = f.rowid '
+            f"WHERE {FTS_TABLE} MATCH %s AND p.status = 'active' "
+            f'ORDER BY bm25({FTS_TABLE}, {_fts_rank_args()}), p.id DESC LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [_fts_match(tokens), limit])
+            return [row[0] for row in cursor.fetchall()]
+
+    condition = Q()
+    for token in tokens:
+        token_q = Q()
+        for field in SEARCH_FIELDS:
+            token_q |= Q(**{f'{field}__icontains': token})
+        condition &= token_q
+    return list(Product.objects.filter(condition, status='active').values_list('id', flat=True)[:limit])
+
+
+def search_products(query, queryset=None, limit=MAX_RESULTS):
+    """Return products from ``queryset`` matching ``query`` as a ranked list."""
+    ids = ranked_ids(query, limit)
+    if not ids:
+        return []
+    if queryset is None:
+        queryset = Product.objects.filter(status='active').select_related('category')
+    by_id = {p.pk: p for p in queryset.filter(pk__in=ids)}
+    return [by_id[pk] for pk in ids if pk in by_id]
+
+
+def index_product(product):
+    engine = backend()
+    if engine == 'postgres':
+        Product.objects.filter(pk=product.pk).update(search_vector=_search_vector())
+    elif engine == 'fts5':
+        columns = ', '.join(SEARCH_FIELDS)
+        placeholders = ', '.join(['%s'] * (len(SEARCH_FIELDS) + 1))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES ({placeholders})',
+                [product.pk] + [getattr(product, f) or '' for f in SEARCH_FIELDS],
+            )
+
+
+def remove_product(product_id):
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+
+def rebuild_index():
+    """Re-derive the whole index from the product table, e.g. after bulk_create."""
+    engine = backend()
+    if engine == 'postgres':
+        return Product.objects.update(search_vector=_search_vector())
+    if engine == 'fts5':
+        columns = ', '.join(SEARCH_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {columns} FROM shop_product')
+            return cursor.rowcount
+    return 0
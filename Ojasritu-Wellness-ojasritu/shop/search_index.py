@@ -0,0 +1,244 @@
+"""In-process product search index with Devanagari folding and typo tolerance.
+
+The catalog is small enough to keep in memory, so ``/api/products/search/``
+answers from an inverted index plus a character-trigram index over the
+vocabulary instead of querying the database. Each document stores the
+serialized product card, so a search never touches the database once the
+index is built.
+
+Freshness: save/delete signals apply incremental updates in the process
+that made the write. Other workers notice the moved catalog version (see
+``shop/cache.py``) on their next query and rebuild from the database.
+"""
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from .cache import get_catalog_version
+from .search import tokenize
+
+# Field weights; category text counts for less than the product's own fields
+FIELD_WEIGHTS = {
+    'name': 10.0, 'hindi_name': 10.0, 'benefits': 4.0, 'ingredients': 4.0,
+    'description': 2.0, 'category': 1.5,
+}
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.7
+FUZZY_MIN_SIMILARITY = 0.45
+MAX_EXPANSIONS = 25
+
+# Precomposed nukta letters (क़ ख़ ग़ ज़ ड़ ढ़ फ़ य़) fold to their base consonant
+_NUKTA_FOLD = {chr(cp): base for cp, base in zip(range(0x0958, 0x0960), 'कखगजडढफय')}
+_CHAR_FOLD = str.maketrans({
+    **_NUKTA_FOLD,
+    '\u093c': None,                  # nukta sign
+    '\u200c': None, '\u200d': None,  # zero-width non-joiner / joiner
+    '\u0901': '\u0902',              # chandrabindu -> anusvara
+    '\u0940': '\u093f',              # matra ii -> i
+    '\u0942': '\u0941',              # matra uu -> u
+    '\u0908': '\u0907',              # vowel II -> I
+    '\u090a': '\u0909',              # vowel UU -> U
+})
+# Nasal consonant + virama before another consonant is written as anusvara
+# interchangeably: गन्ध == गंध, चम्पा == चंपा
+_NASAL_CLUSTER = re.compile('[ङञणनम]\u094d(?=[क-ह])')
+
+
+def normalize(text):
+    """Fold case, Latin diacritics and common Devanagari spelling variants."""
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(ch for ch in text if not ('\u0300' <= ch <= '\u036f'))
+    text = text.translate(_CHAR_FOLD)
+    return _NASAL_CLUSTER.sub('\u0902', text)
+
+
+def terms(text):
+    return tokenize(normalize(text))
+
+
+def trigrams(term):
+    padded = f'  {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Doc:
+    __slots__ = ('pk', 'category_id', 'terms', 'payload')
+
+    def __init__(self, pk, category_id, terms, payload):
+        self.pk = pk
+        self.category_id = category_id
+        self.terms = terms
+        self.payload = payload
+
+
+class ProductSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._docs = {}
+        self._postings = {}
+        self._trigrams = {}
+        self._vocab = []
+        self._vocab_dirty = False
+
+    # ----- building -----
+
+    def _document(self, product, category, payload=None):
+        from .api import ProductSerializer
+
+        weights = {}
+        fields = [(f, getattr(product, f)) for f in ('name', 'hindi_name', 'benefits', 'ingredients', 'description')]
+        fields += [('category', f'{category.name} {category.hindi_name}')]
+        for field, text in fields:
+            for term in terms(text):
+                weights[term] = max(weights.get(term, 0.0), FIELD_WEIGHTS[field])
+        if payload is None:
+            payload = ProductSerializer(product).data
+        return _Doc(product.pk, category.pk, weights, payload)
+
+    def _add(self, doc):
+        self._docs[doc.pk] = doc
+        for term, weight in doc.terms.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = {}
+                for gram in trigrams(term):
+                    self._trigrams.setdefault(gram, set()).add(term)
+                self._vocab_dirty = True
+            posting[doc.pk] = weight
+
+    def _discard(self, pk):
+        doc = self._docs.pop(pk, None)
+        if doc is None:
+            return
+        for term in doc.terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(pk, None)
+            if not posting:
+                del self._postings[term]
+                for gram in trigrams(term):
+                    grams = self._trigrams.get(gram)
+                    if grams is not None:
+                        grams.discard(term)
+                        if not grams:
+                            del self._trigrams[gram]
+                self._vocab_dirty = True
+
+    def rebuild(self):
+        from .api import ProductSerializer
+        from .models import Product
+
+        version = get_catalog_version()
+        products = list(Product.objects.filter(status='active').select_related('category'))
+        # One ListSerializer pass is far cheaper than a serializer per product
+        payloads = ProductSerializer(products, many=True).data
+        with self._lock:
+            self._docs, self._postings, self._trigrams = {}, {}, {}
+            for product, payload in zip(products, payloads):
+                self._add(self._document(product, product.category, payload))
+            self._vocab_dirty = True
+            self._version = version
+
+    def _ensure_fresh(self):
+        if self._version != get_catalog_version():
+            self.rebuild()
+
+    # ----- incremental updates from signals -----
+
+    def update_product(self, product):
+        if self._version is None:
+            return
+        with self._lock:
+            self._discard(product.pk)
+            if product.status == 'active':
+                self._add(self._document(product, product.category))
+            self._version = get_catalog_version()
+
+    def remove_product(self, pk):
+        if self._version is None:
+            return
+        with self._lock:
+            self._discard(pk)
+            self._version = get_catalog_version()
+
+    def update_category(self, category):
+        if self._version is None:
+            return
+        from .models import Product
+
+        with self._lock:
+            affected = [pk for pk, doc in self._docs.items() if doc.category_id == category.pk]
+            for product in Product.objects.filter(pk__in=affected).select_related('category'):
+                self._discard(product.pk)
+                self._add(self._document(product, category))
+            self._version = get_catalog_version()
+
+    # ----- querying -----
+
+    def _prefix_terms(self, token):
+        if self._vocab_dirty:
+            self._vocab = sorted(self._postings)
+            self._vocab_dirty = False
+        found = []
+        i = bisect_left(self._vocab, token)
+        while i < len(self._vocab) and self._vocab[i].startswith(token) and len(found) < MAX_EXPANSIONS:
+            found.append(self._vocab[i])
+            i += 1
+        return found
+
+    def _fuzzy_terms(self, token):
+        grams = trigrams(token)
+        shared = {}
+        for gram in grams:
+            for term in self._trigrams.get(gram, ()):
+                shared[term] = shared.get(term, 0) + 1
+        scored = []
+        for term, count in shared.items():
+            similarity = 2.0 * count / (len(grams) + len(term) + 1)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                scored.append((similarity, term))
+        return heapq.nlargest(MAX_EXPANSIONS, scored)
+
+    def _expand(self, token, prefix):
+        """Map a query token to ``{index_term: score_factor}``."""
+        matches = {}
+        if token in self._postings:
+            matches[token] = 1.0
+        if prefix:
+            for term in self._prefix_terms(token):
+                matches.setdefault(term, PREFIX_FACTOR)
+        if not matches:
+            for similarity, term in self._fuzzy_terms(token):
+                matches[term] = FUZZY_FACTOR * similarity
+        return matches
+
+    def search(self, query, limit=20):
+        """Return serialized product cards ranked by relevance."""
+        tokens = terms(query)
+        if not tokens:
+            return []
+        self._ensure_fresh()
+        with self._lock:
+            scores = None
+            for i, token in enumerate(tokens):
+                token_scores = {}
+                for term, factor in self._expand(token, prefix=(i == len(tokens) - 1)).items():
+                    for pk, weight in self._postings[term].items():
+                        score = weight * factor
+                        if score > token_scores.get(pk, 0.0):
+                            token_scores[pk] = score
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {pk: scores[pk] + s for pk, s in token_scores.items() if pk in scores}
+                if not scores:
+                    return []
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+            return [self._docs[pk].payload for pk, _ in ranked]
+
+
+product_index = ProductSearchIndex()
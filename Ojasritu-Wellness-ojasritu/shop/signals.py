@@ -0,0 +1,95 @@
+import logging
+
+from django.contrib.auth.signals import user_logged_in
+from django.db import DatabaseError, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import carts, ratings, search
+from .cache import CONTENT, bump_catalog_version, bump_version
+from .search_index import product_index
+from .models import FAQ, Article, Category, Product, ProductReview
+
+logger = logging.getLogger(__name__)
+
+
+# Rating receivers are connected before the cache bump so the new catalog
+# version is never read with the old aggregates.
+
+@receiver(pre_save, sender=ProductReview)
+def remember_previous_rating(sender, instance, raw=False, **kwargs):
+    previous = None
+    if instance.pk and not raw:
+        previous = (
+            ProductReview.objects.filter(pk=instance.pk).values_list('product_id', 'rating').first()
+        )
+    instance._previous_rating = previous
+
+
+@receiver(post_save, sender=ProductReview)
+def update_rating_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ratings.apply_change(getattr(instance, '_previous_rating', None), (instance.product_id, instance.rating))
+    instance._previous_rating = (instance.product_id, instance.rating)
+
+
+@receiver(post_delete, sender=ProductReview)
+def update_rating_on_delete(sender, instance, **kwargs):
+    ratings.apply_change((instance.product_id, instance.rating), None)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=ProductReview)
+@receiver(post_delete, sender=ProductReview)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Any catalog write moves every cached listing to a new, empty key space.
+
+    The bump waits for commit: bumped inside the writer's transaction, a
+    concurrent request could refill the new key space from the old rows.
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+def invalidate_content_validators(sender, **kwargs):
+    """Articles and FAQs share one version that feeds their ETags."""
+    transaction.on_commit(lambda: bump_version(CONTENT))
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, **kwargs):
+    search.index_product(instance)
+    product_index.update_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_for_search(sender, instance, **kwargs):
+    search.remove_product(instance.pk)
+    product_index.remove_product(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, **kwargs):
+    product_index.update_category(instance)
+
+
+# Every login path (email_login, GoogleAuthAPIView, the allauth redirect
+# flow) goes through django.contrib.auth.login(), which keeps the session
+# data of an anonymous visitor and then sends user_logged_in.
+@receiver(user_logged_in)
+def merge_session_cart(sender, request, user, **kwargs):
+    session = getattr(request, 'session', None)
+    if session is None or carts.SESSION_CART_KEY not in session:
+        return
+    try:
+        carts.merge_session_cart(session, user)
+    except DatabaseError:
+        # Never fail a login over the cart; the session cart is kept for next time
+        logger.exception('Could not merge session cart for user %s', user.pk)
@@ -0,0 +1,99 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from shop.models import Cart, CartItem, Category, Product
+
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='buyer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Herbs', slug='herbs')
+        self.products = [
+            Product.objects.create(
+                name=f'Herb {i}', slug=f'herb-{i}', sku=f'BAT-{i}', description='d', benefits='b', ingredients='i',
+                price=Decimal('100.00'), category=self.category, dosha_type='vata', image='products/p.png',
+            )
+            for i in range(6)
+        ]
+        self.cart = Cart.objects.create(customer=self.user)
+
+    def batch(self, operations):
+        return self.client.post('/api/cart/batch/', {'operations': operations}, format='json')
+
+    def quantities(self):
+        return dict(self.cart.items.values_list('product_id', 'quantity'))
+
+    def test_operations_fold_into_final_quantities(self):
+        p = self.products
+        kept = CartItem.objects.create(cart=self.cart, product=p[0], quantity=2)
+        dropped = CartItem.objects.create(cart=self.cart, product=p[1], quantity=1)
+        response = self.batch([
+            {'op': 'add', 'product_id': p[0].pk, 'quantity': 1},
+            {'op': 'add', 'product_id': p[0].pk},
+            {'op': 'remove', 'item_id': dropped.pk},
+            {'op': 'add', 'product_id': p[2].pk, 'quantity': 3},
+            {'op': 'set', 'product_id': p[2].pk, 'quantity': 5},
+            {'op': 'set', 'product_id': p[3].pk, 'quantity': 0},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.quantities(), {p[0].pk: 4, p[2].pk: 5})
+        # The existing line is updated in place, not replaced
+        self.assertEqual(CartItem.objects.get(product=p[0]).pk, kept.pk)
+        data = response.json()
+        self.assertEqual(len(data['items']), 2)
+        self.assertEqual(Decimal(str(data['total_price'])), Decimal('900.00'))
+
+    def test_folded_adds_are_capped(self):
+        p = self.products[0]
+        CartItem.objects.create(cart=self.cart, product=p, quantity=900)
+        response = self.batch([{'op': 'add', 'product_id': p.pk, 'quantity': 999}] * 3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.quantities(), {p.pk: 999})
+
+    def test_query_count_does_not_grow_with_operations(self):
+        CartItem.objects.create(cart=self.cart, product=self.products[5], quantity=1)
+        # cart lock, lines, product check, upsert, delete, cart + items, plus savepoints
+        for products in (self.products[:1], self.products[:5]):
+            operations = [{'op': 'add', 'product_id': p.pk} for p in products]
+            operations.append({'op': 'remove', 'product_id': self.products[5].pk})
+            with self.assertNumQueries(9):
+                self.assertEqual(self.batch(operations).status_code, 200)
+            CartItem.objects.create(cart=self.cart, product=self.products[5], quantity=1)
+
+    def test_invalid_batch_changes_nothing(self):
+        self.products[4].status = 'inactive'
+        self.products[4].save()
+        CartItem.objects.create(cart=self.cart, product=self.products[0], quantity=1)
+        other = CartItem.objects.create(
+            cart=Cart.objects.create(customer=get_user_model().objects.create_user(username='other')),
+            product=self.products[1],
+        )
+        invalid = [
+            [{'op': 'add', 'product_id': self.products[4].pk}],
+            [{'op': 'add', 'product_id': 999999}],
+            [{'op': 'remove', 'item_id': other.pk}],
+            [{'op': 'set', 'product_id': self.products[0].pk, 'quantity': -1}],
+            [{'op': 'explode', 'product_id': self.products[0].pk}],
+            [],
+        ]
+        for operations in invalid:
+            response = self.batch([{'op': 'remove', 'product_id': self.products[0].pk}] + operations if operations else [])
+            self.assertEqual(response.status_code, 400, operations)
+            self.assertIn('error', response.json())
+        self.assertEqual(self.quantities(), {self.products[0].pk: 1})
+        self.assertTrue(CartItem.objects.filter(pk=other.pk).exists())
+
+    def test_creates_cart_on_first_batch(self):
+        self.cart.delete()
+        response = self.batch([{'op': 'add', 'product_id': self.products[0].pk, 'quantity': 2}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Cart.objects.get(customer=self.user).items.get().quantity, 2)
+
+    def test_requires_authentication(self):
+        response = APIClient().post('/api/cart/batch/', {'operations': []}, format='json')
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.db.models.query import QuerySet
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from rest_framework.test import APIClient
+
+from shop import carts
+from shop.models import Cart, CartItem, Category, Product
+
+
+def make_product(slug):
+    category, _ = Category.objects.get_or_create(name='Herbs', slug='herbs')
+    return Product.objects.create(
+        name=slug.title(), slug=slug, sku=slug.upper(), description='d', benefits='b', ingredients='i',
+        price=Decimal('100.00'), category=category, dosha_type='vata', image='products/p.png',
+    )
+
+
+# Cart writes serialize on a row lock (carts.lock_cart), which SQLite does not
+# have; run with DATABASE_URL pointing at PostgreSQL to exercise real concurrency.
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentAddToCartTests(TransactionTestCase):
+    """Parallel taps on "add to cart" must all land, whichever one creates the line."""
+
+    WORKERS = 8
+    REQUESTS = 24
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='tapper')
+        self.product = make_product('ashwagandha')
+
+    def tap(self, quantity):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            return client.post('/api/cart/add/', {'product_id': self.product.pk, 'quantity': quantity}, format='json').status_code
+        finally:
+            connection.close()
+
+    def test_parallel_adds_sum_up(self):
+        quantities = [1 + i % 3 for i in range(self.REQUESTS)]
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            codes = list(pool.map(self.tap, quantities))
+
+        self.assertEqual(codes, [200] * self.REQUESTS)
+        self.assertEqual(Cart.objects.filter(customer=self.user).count(), 1)
+        item = CartItem.objects.get(cart__customer=self.user, product=self.product)
+        self.assertEqual(item.quantity, sum(quantities))
+
+
+class CartMutationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='buyer')
+        self.product = make_product('triphala')
+        self.cart = carts.get_cart(self.user)
+
+    def test_add_item_increments_in_place(self):
+        self.assertTrue(carts.add_item(self.cart, self.product, 2))
+        self.assertFalse(carts.add_item(self.cart, self.product, 3))
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+    def test_add_item_is_capped(self):
+        carts.add_item(self.cart, self.product, 600)
+        carts.add_item(self.cart, self.product, 600)
+        self.assertEqual(CartItem.objects.get().quantity, carts.MAX_QUANTITY)
+
+    def test_add_item_losing_the_insert_race(self):
+        # The other request inserts the line after our UPDATE matched nothing
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=2)
+        real_update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **kwargs):
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            self.assertFalse(carts.add_item(self.cart, self.product, 3))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+    def test_set_quantity(self):
+        carts.set_quantity(self.cart, self.product, 4)
+        carts.set_quantity(self.cart, self.product, 1)
+        self.assertEqual(CartItem.objects.get().quantity, 1)
+        carts.set_quantity(self.cart, self.product, 0)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_duplicate_lines_are_rejected(self):
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CartItem.objects.create(cart=self.cart, product=self.product, quantity=1)
+
+    def test_invalid_quantity(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for quantity in (0, -1, 'two', 1000):
+            response = client.post('/api/cart/add/', {'product_id': self.product.pk, 'quantity': quantity}, format='json')
+            self.assertEqual(response.status_code, 400, quantity)
+        self.assertFalse(CartItem.objects.exists())
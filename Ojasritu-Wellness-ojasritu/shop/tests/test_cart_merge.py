@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in
+from django.test import Client, RequestFactory, TestCase
+
+from shop import carts
+from shop.models import Cart, CartItem, Category, Product
+
+
+class SessionCartMergeTests(TestCase):
+    """Logging in folds the anonymous session cart into the user's DB cart."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='buyer', email='buyer@example.com', password='pw-12345')
+        self.category = Category.objects.create(name='Herbs', slug='herbs')
+        self.products = [
+            Product.objects.create(
+                name=f'Herb {i}', slug=f'herb-{i}', sku=f'MRG-{i}', description='d', benefits='b', ingredients='i',
+                price=Decimal('100.00'), category=self.category, dosha_type='vata', image='products/p.png',
+            )
+            for i in range(8)
+        ]
+
+    def start_session(self, cart):
+        client = Client()
+        session = client.session
+        session[carts.SESSION_CART_KEY] = cart
+        session.save()
+        return client
+
+    def quantities(self):
+        return dict(CartItem.objects.filter(cart__customer=self.user).values_list('product_id', 'quantity'))
+
+    def test_email_login_merges_and_clears_session(self):
+        p = self.products
+        cart = Cart.objects.create(customer=self.user)
+        CartItem.objects.create(cart=cart, product=p[0], quantity=2)
+        p[3].status = 'inactive'
+        p[3].save()
+        client = self.start_session({str(p[0].pk): 1, str(p[1].pk): 3, str(p[3].pk): 1, '999999': 2, 'junk': 'x'})
+
+        response = client.post('/api/auth/login/', {'email': 'buyer@example.com', 'password': 'pw-12345'},
+                               content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.quantities(), {p[0].pk: 3, p[1].pk: 3})
+        self.assertNotIn(carts.SESSION_CART_KEY, client.session)
+
+    def test_query_count_is_independent_of_cart_size(self):
+        request = RequestFactory().get('/')
+        Cart.objects.create(customer=self.user)
+        for products in (self.products[:1], self.products):
+            CartItem.objects.all().delete()
+            request.session = {carts.SESSION_CART_KEY: {str(p.pk): 2 for p in products}}
+            # last_login, cart lock, products, existing lines, upsert, plus savepoints
+            with self.assertNumQueries(7):
+                user_logged_in.send(sender=type(self.user), request=request, user=self.user)
+            self.assertEqual(self.quantities(), {p.pk: 2 for p in products})
+            self.assertEqual(request.session, {})
+
+    def test_login_without_session_cart_is_untouched(self):
+        client = Client()
+        self.assertTrue(client.login(username='buyer', password='pw-12345'))
+        self.assertFalse(Cart.objects.filter(customer=self.user).exists())
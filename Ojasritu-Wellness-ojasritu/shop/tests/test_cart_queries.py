@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from shop.models import Cart, CartItem, Category, Product
+
+
+class CartQueryBudgetTests(TestCase):
+    """Cart responses cost the same number of queries however many lines the cart has."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='buyer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Herbs', slug='herbs')
+        self.cart = Cart.objects.create(customer=self.user)
+        self.products = [self.make_product(i) for i in range(12)]
+
+    def make_product(self, i):
+        return Product.objects.create(
+            name=f'Herb {i}', slug=f'herb-{i}', sku=f'CRT-{i}', description='d', benefits='b', ingredients='i',
+            price=Decimal('100.00') + i, category=self.category, dosha_type='vata', image='products/p.png',
+            bulk_discount={'10': 10},
+        )
+
+    def fill(self, n):
+        for product in self.products[:n]:
+            CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+
+    def test_get_cart(self):
+        for n in (1, 10):
+            CartItem.objects.all().delete()
+            self.fill(n)
+            with self.assertNumQueries(2):
+                data = self.client.get('/api/cart/').json()
+            self.assertEqual(len(data['items']), n)
+            self.assertEqual(data['items'][0]['product']['category_name'], 'Herbs')
+
+    def test_add_and_remove(self):
+        self.fill(10)
+        product = self.products[11]
+        # product, cart, increment (no row), insert, priced lines, plus savepoints
+        with self.assertNumQueries(9):
+            data = self.client.post('/api/cart/add/', {'product_id': product.pk, 'quantity': 10}, format='json').json()
+        self.assertEqual(data['cart_items_count'], 11)
+        expected = sum((Decimal('100.00') + i) * 2 for i in range(10)) + Decimal('111.00') * 9
+        self.assertEqual(Decimal(str(data['cart_total'])), expected)
+
+        # Existing line: one UPDATE quantity = quantity + 1, no read-modify-write
+        with self.assertNumQueries(6):
+            data = self.client.post('/api/cart/add/', {'product_id': product.pk, 'quantity': 1}, format='json').json()
+        self.assertEqual(data['cart_items_count'], 11)
+
+        item = CartItem.objects.get(product=product)
+        with self.assertNumQueries(5):
+            data = self.client.delete(f'/api/cart/remove/{item.pk}/').json()
+        self.assertEqual(data['cart_items_count'], 10)
+        self.assertEqual(Decimal(str(data['cart_total'])), sum((Decimal('100.00') + i) * 2 for i in range(10)))
+
+    def test_remove_requires_own_item(self):
+        self.fill(1)
+        other = get_user_model().objects.create_user(username='other')
+        client = APIClient()
+        client.force_authenticate(other)
+        item = CartItem.objects.get()
+        self.assertEqual(client.delete(f'/api/cart/remove/{item.pk}/').status_code, 404)
+        self.assertTrue(CartItem.objects.filter(pk=item.pk).exists())
@@ -0,0 +1,132 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase, override_settings
+
+from shop import cashfree
+
+
+class StandInCashfree(BaseHTTPRequestHandler):
+    """Answers like Cashfree's /pg API from a scripted queue of statuses."""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real gateway
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        server.requests.append((self.command, self.path, self.client_address[1]))
+        status = server.script.pop(0) if server.script else 200
+        if isinstance(status, tuple):
+            status, payload = status
+        elif status == 200 and self.command == 'POST':
+            payload = {'order_id': body['order_id'], 'payment_session_id': 'session_123'}
+        elif status == 200:
+            payload = {'order_id': self.path.rsplit('/', 1)[-1], 'order_status': 'PAID'}
+        else:
+            payload = {'message': f'upstream {status}'}
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = _reply
+
+
+class CashfreeClientTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInCashfree)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests, self.server.script = [], []
+        settings = override_settings(
+            CASHFREE_API_BASE=f'http://127.0.0.1:{self.server.server_port}/pg',
+            CASHFREE_APP_ID='app', CASHFREE_SECRET_KEY='secret', CASHFREE_RETRY_BACKOFF=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cashfree.reset_session()
+        cashfree.reset_gateway_stats()
+        self.addCleanup(cashfree.reset_session)
+
+    def create(self, order_id='CF-1'):
+        return cashfree.create_cashfree_order(
+            order_id=order_id, amount=100, customer={'id': '1'}, return_url='http://x/r', notify_url='http://x/n',
+        )
+
+    def test_connections_are_reused(self):
+        for i in range(3):
+            self.assertEqual(self.create(f'CF-{i}')['payment_session_id'], 'session_123')
+        self.assertEqual(cashfree.get_cashfree_order('CF-0')['order_status'], 'PAID')
+        ports = {port for _, _, port in self.server.requests}
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual(len(ports), 1)
+
+    def test_get_is_retried_on_5xx(self):
+        self.server.script = [503, 502]
+        self.assertEqual(cashfree.get_cashfree_order('CF-9')['order_status'], 'PAID')
+        self.assertEqual([r[:2] for r in self.server.requests], [('GET', '/pg/orders/CF-9')] * 3)
+        stats = cashfree.gateway_stats()['get_order']
+        self.assertEqual((stats['calls'], stats['retries'], stats['errors']), (1, 2, 0))
+
+    def test_get_gives_up_after_max_retries(self):
+        self.server.script = [500] * 10
+        with override_settings(CASHFREE_MAX_RETRIES=2):
+            cashfree.reset_session()
+            with self.assertRaises(cashfree.CashfreeError):
+                cashfree.get_cashfree_order('CF-9')
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(cashfree.gateway_stats()['get_order']['errors'], 1)
+
+    def test_create_order_is_not_retried(self):
+        self.server.script = [503]
+        with self.assertRaisesMessage(cashfree.CashfreeError, 'upstream 503'):
+            self.create()
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_non_object_bodies_raise_cashfree_errors(self):
+        self.server.script = [(400, ['bad request']), (200, 'ok')]
+        with self.assertRaisesMessage(cashfree.CashfreeError, '["bad request"]') as raised:
+            cashfree.get_cashfree_order('CF-9')
+        self.assertEqual(raised.exception.status_code, 400)
+        with self.assertRaisesMessage(cashfree.CashfreeError, 'Unexpected Cashfree response'):
+            cashfree.get_cashfree_order('CF-9')
+
+    def test_unreachable_gateway(self):
+        with override_settings(CASHFREE_API_BASE='http://127.0.0.1:9/pg', CASHFREE_MAX_RETRIES=0):
+            with self.assertRaisesMessage(cashfree.CashfreeError, 'Cashfree unreachable'), \
+                    self.assertLogs('shop.cashfree', 'WARNING'):
+                self.create()
+        self.assertEqual(cashfree.gateway_stats()['create_order']['errors'], 1)
+
+    def test_backoff_is_jittered(self):
+        retry = cashfree._JitteredRetry(total=5, backoff_factor=1).increment(method='GET', url='/')
+        retry = retry.increment(method='GET', url='/').increment(method='GET', url='/')
+        delays = {retry.get_backoff_time() for _ in range(20)}
+        self.assertGreater(len(delays), 1)
+        self.assertTrue(all(0 <= d <= 4 for d in delays))
+
+    @override_settings(CASHFREE_MAX_CONCURRENT=2, CASHFREE_SLOT_WAIT=0)
+    def test_gateway_slots_are_bounded(self):
+        with cashfree.gateway_slot(), cashfree.gateway_slot():
+            with self.assertRaises(cashfree.GatewayBusy):
+                with cashfree.gateway_slot():
+                    pass
+        with cashfree.gateway_slot():
+            pass
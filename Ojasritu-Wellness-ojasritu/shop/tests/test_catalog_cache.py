@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from shop.cache import catalog_cache_stats, get_catalog_version
+from shop.models import Category, Product, ProductReview
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Herbs', slug='herbs')
+        self.product = Product.objects.create(
+            name='Triphala', slug='triphala', sku='TPC-1', description='d', benefits='b',
+            ingredients='i', price=349, category=self.category, dosha_type='tridosha',
+            image='products/triphala.png', is_bestseller=True,
+        )
+
+    def test_second_request_is_served_without_queries(self):
+        first = self.client.get('/api/products/?dosha=tridosha')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/products/?dosha=tridosha')
+        self.assertEqual(first.content, second.content)
+        stats = catalog_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_equivalent_filters_share_an_entry(self):
+        self.client.get('/api/products/?bestseller=true')
+        with self.assertNumQueries(0):
+            resp = self.client.get('/api/products/?bestseller=1')
+        self.assertEqual(resp.json()['results'][0]['slug'], 'triphala')
+
+    def test_product_save_bumps_version_and_invalidates(self):
+        self.client.get('/api/products/')
+        version = get_catalog_version()
+        self.product.price = 299
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertGreater(get_catalog_version(), version)
+        resp = self.client.get('/api/products/')
+        self.assertEqual(resp.json()['results'][0]['price'], '299.00')
+
+    def test_category_and_review_writes_bump_version(self):
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Oils', slug='oils')
+        self.assertGreater(get_catalog_version(), version)
+
+        version = get_catalog_version()
+        user = get_user_model().objects.create_user(username='reviewer')
+        with self.captureOnCommitCallbacks(execute=True):
+            review = ProductReview.objects.create(product=self.product, customer=user, rating=4, title='t', comment='c')
+        self.assertGreater(get_catalog_version(), version)
+
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            review.delete()
+        self.assertGreater(get_catalog_version(), version)
+
+    def test_bump_waits_for_commit(self):
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.product.save()
+            self.assertEqual(get_catalog_version(), version)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_category_list_is_cached(self):
+        self.client.get('/api/categories/')
+        with self.assertNumQueries(0):
+            resp = self.client.get('/api/categories/')
+        self.assertEqual(resp.json()['results'][0]['slug'], 'herbs')
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.assertEqual(self.client.get('/api/catalog/cache-stats/').status_code, 403)
+        staff = get_user_model().objects.create_user(username='staff', is_staff=True)
+        self.client.force_authenticate(user=staff)
+        resp = self.client.get('/api/catalog/cache-stats/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('hit_ratio', resp.json())
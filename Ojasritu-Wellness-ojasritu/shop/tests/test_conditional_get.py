@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from shop.models import Category, Product, Article, FAQ
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Herbs', slug='herbs')
+        self.product = Product.objects.create(
+            name='Triphala', slug='triphala', sku='TPC-1', description='d', benefits='b',
+            ingredients='i', price=349, category=category, dosha_type='tridosha',
+            image='products/triphala.png',
+        )
+
+    def assertRevalidates(self, url):
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp.headers['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('Last-Modified', resp.headers)
+        with self.assertNumQueries(0):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.content, b'')
+        self.assertEqual(resp.headers['ETag'], etag)
+        return etag
+
+    def test_products_list_and_detail(self):
+        list_etag = self.assertRevalidates('/api/products/')
+        detail_etag = self.assertRevalidates('/api/products/triphala/')
+        self.assertNotEqual(list_etag, detail_etag)
+
+    def test_catalog_write_changes_etag(self):
+        etag = self.assertRevalidates('/api/products/?dosha=tridosha')
+        self.product.price = 299
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        resp = self.client.get('/api/products/?dosha=tridosha', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp.headers['ETag'], etag)
+
+    def test_categories(self):
+        self.assertRevalidates('/api/categories/')
+
+    def test_if_modified_since(self):
+        resp = self.client.get('/api/categories/')
+        resp = self.client.get('/api/categories/', HTTP_IF_MODIFIED_SINCE=resp.headers['Last-Modified'])
+        self.assertEqual(resp.status_code, 304)
+
+    def test_faqs_and_articles_follow_content_version(self):
+        FAQ.objects.create(question_en='Q', answer_en='A', category='general')
+        author = get_user_model().objects.create_user(username='author')
+        Article.objects.create(title='Ojas', slug='ojas', content='c', excerpt='e',
+                               featured_image='articles/a.png', category='ayurveda', author=author)
+        faq_etag = self.assertRevalidates('/api/faqs/')
+        self.assertRevalidates('/api/articles/')
+        self.assertRevalidates('/api/articles/ojas/')
+
+        # Catalog writes do not invalidate content
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        resp = self.client.get('/api/faqs/', HTTP_IF_NONE_MATCH=faq_etag)
+        self.assertEqual(resp.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FAQ.objects.create(question_en='Q2', answer_en='A2', category='general')
+        resp = self.client.get('/api/faqs/', HTTP_IF_NONE_MATCH=faq_etag)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_missing_product_is_not_tagged(self):
+        resp = self.client.get('/api/products/does-not-exist/')
+        self.assertEqual(resp.status_code, 404)
+        self.assertNotIn('ETag', resp.headers)
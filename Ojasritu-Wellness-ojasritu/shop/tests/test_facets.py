@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from shop.models import Category, Product
+
+
+class ProductFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.herbs = Category.objects.create(name='Herbs', slug='herbs')
+        self.oils = Category.objects.create(name='Oils', slug='oils')
+        rows = [
+            ('ashwagandha', self.herbs, 'vata', True, True, False),
+            ('brahmi', self.herbs, 'pitta', False, True, True),
+            ('triphala', self.herbs, 'tridosha', True, False, False),
+            ('kumkumadi', self.oils, 'pitta', True, True, False),
+            ('mahanarayan', self.oils, 'vata', False, False, True),
+        ]
+        for i, (slug, category, dosha, bestseller, organic, featured) in enumerate(rows):
+            Product.objects.create(
+                name=slug.title(), slug=slug, sku=f'FAC-{i}', description='d', benefits='b',
+                ingredients='i', price=100, category=category, dosha_type=dosha,
+                is_bestseller=bestseller, is_organic=organic, is_featured=featured,
+                image='products/p.png',
+            )
+        Product.objects.create(
+            name='Draft', slug='draft', sku='FAC-X', description='d', benefits='b', ingredients='i',
+            price=100, category=self.oils, dosha_type='kapha', status='draft', image='products/p.png',
+        )
+
+    def counts(self, data, facet):
+        return {entry['value']: entry['count'] for entry in data['facets'][facet]}
+
+    def test_unfiltered_counts(self):
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/products/facets/').json()
+        self.assertEqual(data['total'], 5)
+        self.assertEqual(self.counts(data, 'category'), {'herbs': 3, 'oils': 2})
+        self.assertEqual(self.counts(data, 'dosha'), {'vata': 2, 'pitta': 2, 'tridosha': 1})
+        self.assertEqual(self.counts(data, 'bestseller'), {True: 3, False: 2})
+        self.assertEqual(self.counts(data, 'organic'), {True: 3, False: 2})
+        self.assertEqual(self.counts(data, 'featured'), {True: 2, False: 3})
+        self.assertEqual(data['facets']['category'][0]['label'], 'Herbs')
+
+    def test_counts_ignore_own_filter(self):
+        data = self.client.get('/api/products/facets/?category=herbs&bestseller=1').json()
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(data['filters'], {'category': 'herbs', 'bestseller': True})
+        # Category counts apply only the bestseller filter
+        self.assertEqual(self.counts(data, 'category'), {'herbs': 2, 'oils': 1})
+        # Bestseller counts apply only the category filter
+        self.assertEqual(self.counts(data, 'bestseller'), {True: 2, False: 1})
+        self.assertEqual(self.counts(data, 'dosha'), {'vata': 1, 'pitta': 0, 'tridosha': 1})
+
+    def test_total_matches_list_endpoint(self):
+        data = self.client.get('/api/products/facets/?dosha=pitta&organic=1').json()
+        listing = self.client.get('/api/products/?dosha=pitta&organic=1').json()
+        self.assertEqual(data['total'], len(listing['results']))
+        self.assertEqual({p['slug'] for p in listing['results']}, {'brahmi', 'kumkumadi'})
+
+    def test_cached_per_filter_combination(self):
+        self.client.get('/api/products/facets/?featured=1')
+        with self.assertNumQueries(0):
+            self.client.get('/api/products/facets/?featured=yes')
+        with self.assertNumQueries(1):
+            self.client.get('/api/products/facets/?featured=1&dosha=vata')
+
+    def test_catalog_write_invalidates(self):
+        self.client.get('/api/products/facets/')
+        product = Product.objects.get(slug='draft')
+        product.status = 'active'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        data = self.client.get('/api/products/facets/').json()
+        self.assertEqual(data['total'], 6)
+        self.assertEqual(self.counts(data, 'dosha')['kapha'], 1)
@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from shop.models import Category, Product
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Herbs', slug='herbs')
+        for i in range(3):
+            Product.objects.create(
+                name=f'Churna {i}', slug=f'churna-{i}', sku=f'FLD-{i}', description='लंबा विवरण ' * 50,
+                benefits='b', ingredients='i', price=100 + i, discount_price=90, category=category,
+                dosha_type='vata', image='products/p.png',
+            )
+
+    def test_card_preset(self):
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/products/?fields=card').json()
+        card = data['results'][0]
+        self.assertEqual(set(card), {
+            'id', 'name', 'hindi_name', 'slug', 'price', 'discount_price', 'discount_percentage',
+            'category_name', 'image', 'dosha_type', 'quantity_in_stock', 'is_bestseller',
+            'rating', 'total_reviews', 'bulk_tiers',
+        })
+        self.assertEqual(card['category_name'], 'Herbs')
+        self.assertTrue(card['image'].startswith('http://testserver/'))
+
+    def test_fields_and_omit(self):
+        data = self.client.get('/api/products/?fields=name,price,bogus').json()
+        self.assertEqual(set(data['results'][0]), {'name', 'price'})
+        data = self.client.get('/api/products/?fields=card,description&omit=image').json()
+        self.assertIn('description', data['results'][0])
+        self.assertNotIn('image', data['results'][0])
+        data = self.client.get('/api/products/?omit=description,benefits,ingredients').json()
+        self.assertNotIn('description', data['results'][0])
+        self.assertIn('sku', data['results'][0])
+
+    def test_queryset_loads_only_rendered_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/products/?fields=name,price')
+        sql = queries[0]['sql']
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('shop_category', sql)
+        self.assertIn('"price"', sql)
+
+    def test_cursor_pagination_with_sparse_fields(self):
+        first = self.client.get('/api/products/?fields=name&page_size=2').json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(first['results']) + len(second['results']), 3)
+        self.assertEqual(set(second['results'][0]), {'name'})
+
+    def test_detail(self):
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/products/churna-0/?fields=name,rating_histogram').json()
+        self.assertEqual(set(data), {'name', 'rating_histogram'})
+        data = self.client.get('/api/products/churna-0/?omit=reviews').json()
+        self.assertNotIn('reviews', data)
+        self.assertIn('usage_instructions', data)
+
+    def test_cache_entries_are_per_fieldset(self):
+        self.client.get('/api/products/?fields=name,price')
+        with self.assertNumQueries(0):
+            data = self.client.get('/api/products/?fields=price,name').json()
+        self.assertEqual(set(data['results'][0]), {'name', 'price'})
+        data = self.client.get('/api/products/?fields=slug').json()
+        self.assertEqual(set(data['results'][0]), {'slug'})
+
+    def test_search_respects_fields(self):
+        data = self.client.get('/api/products/search/?q=churna&fields=slug,image').json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(set(data['results'][0]), {'slug', 'image'})
+        self.assertTrue(data['results'][0]['image'].startswith('http://testserver/'))
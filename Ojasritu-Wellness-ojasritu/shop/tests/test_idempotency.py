@@ -0,0 +1,131 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from shop import idempotency
+from shop.models import Cart, CartItem, Category, IdempotencyKey, Order, Product, Profile
+
+
+class CheckoutIdempotencyTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='buyer', email='b@example.com')
+        Profile.objects.create(user=self.user, phone='9876543210')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Herbs', slug='herbs')
+        self.product = Product.objects.create(
+            name='Amla', slug='amla', sku='AMLA', description='d', benefits='b', ingredients='i', price=100,
+            category=category, dosha_type='vata', image='products/p.png', quantity_in_stock=10,
+        )
+        CartItem.objects.create(cart=Cart.objects.create(customer=self.user), product=self.product, quantity=1)
+        self.gateway = mock.Mock(side_effect=lambda **kw: {'payment_session_id': f'sess-{kw["order_id"]}'})
+        patcher = mock.patch('shop.api.create_cashfree_order', self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, url='/api/cashfree/create/', key='key-1', data=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(url, data or {}, format='json', **headers)
+
+    def test_repeat_replays_first_response(self):
+        first = self.post()
+        second = self.post()
+        # The legacy endpoints share the scope, so a retry landing there replays too
+        third = self.post('/api/prebook/cart/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(third.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(self.gateway.call_count, 1)
+
+    def test_without_header_every_post_creates_an_order(self):
+        self.post(key=None)
+        self.post(key=None)
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_keys_are_per_user(self):
+        self.post()
+        other = get_user_model().objects.create_user(username='other')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.post().status_code, 400)  # their cart is empty: not a replay
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_reused_with_different_body(self):
+        self.post()
+        self.assertEqual(self.post(data={'note': 'gift'}).status_code, 422)
+
+    def test_failure_releases_key(self):
+        self.product.quantity_in_stock = 0
+        self.product.save()
+        self.assertEqual(self.post().status_code, 409)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.product.quantity_in_stock = 5
+        self.product.save()
+        self.assertEqual(self.post().status_code, 200)
+
+    def test_duplicate_waits_for_in_flight_request(self):
+        row = IdempotencyKey.objects.create(
+            user=self.user, scope='checkout', key='key-1', request_hash=idempotency._fingerprint(mock.Mock(data={})),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+        def first_request_finishes(_delay):
+            IdempotencyKey.objects.filter(pk=row.pk).update(
+                status='done', response_status=200, response_body={'order_id': 'CF-FIRST'},
+            )
+
+        with mock.patch('shop.idempotency.time.sleep', side_effect=first_request_finishes) as sleep:
+            response = self.post()
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(response.json(), {'order_id': 'CF-FIRST'})
+        self.assertFalse(Order.objects.exists())
+
+    def test_duplicate_gives_up_with_409(self):
+        IdempotencyKey.objects.create(
+            user=self.user, scope='checkout', key='key-1', request_hash=idempotency._fingerprint(mock.Mock(data={})),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        with self.settings(IDEMPOTENCY_WAIT_SECONDS=0):
+            response = self.post()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '2')
+
+    def test_abandoned_claim_is_taken_over(self):
+        # The worker holding the key died mid-request and never released it
+        row = IdempotencyKey.objects.create(
+            user=self.user, scope='checkout', key='key-1', request_hash=idempotency._fingerprint(mock.Mock(data={})),
+            claimed_at=timezone.now() - idempotency.claim_lease() - timedelta(seconds=1),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        with mock.patch('shop.idempotency.time.sleep') as sleep:
+            response = self.post()
+        sleep.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', response)
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.response_body['order_id']), ('done', response.json()['order_id']))
+        self.assertEqual(self.post().json(), response.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_expired_key_is_reusable_and_purged(self):
+        self.post()
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertNotIn('Idempotent-Replayed', self.post())
+        self.assertEqual(Order.objects.count(), 2)
+
+        IdempotencyKey.objects.create(
+            user=self.user, scope='checkout', key='old', request_hash='x', status='done',
+            expires_at=timezone.now() - timedelta(days=1),
+        )
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Purged 1', out.getvalue())
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
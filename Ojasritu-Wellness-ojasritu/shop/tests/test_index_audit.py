@@ -0,0 +1,24 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from shop import query_audit
+from shop.models import Order, Product
+
+
+class IndexAuditTests(TestCase):
+    def test_hot_queries_use_indexes_on_seeded_data(self):
+        out = StringIO()
+        call_command('index_audit', seed=3000, strict=True, stdout=out)
+        self.assertIn(f'{len(query_audit.HOT_QUERIES)}/{len(query_audit.HOT_QUERIES)} hot queries use an index',
+                      out.getvalue())
+        # The seed data is rolled back
+        self.assertEqual(Product.objects.count(), 0)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_flags_full_scans_and_sorts(self):
+        report = query_audit.explain('unindexed', Product.objects.filter(hindi_name='x').order_by('price'))
+        self.assertFalse(report.ok)
+        self.assertEqual(report.seq_scans, ['shop_product'])
+        self.assertTrue(report.sorts)
@@ -0,0 +1,144 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from shop import cashfree, inventory, webhooks
+from shop.cache import get_catalog_version
+from shop.cashfree import CashfreeError
+from shop.models import Cart, CartItem, Category, Order, Product, Profile
+
+
+@override_settings(CASHFREE_SECRET_KEY='')
+class StockReservationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='buyer', email='b@example.com')
+        Profile.objects.create(user=self.user, phone='9876543210')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Herbs', slug='herbs')
+        self.amla = self.make_product(category, 'amla', stock=5)
+        self.neem = self.make_product(category, 'neem', stock=1)
+        self.cart = Cart.objects.create(customer=self.user)
+
+    def make_product(self, category, slug, stock):
+        return Product.objects.create(
+            name=slug.title(), slug=slug, sku=slug.upper(), description='d', benefits='b', ingredients='i',
+            price=100, category=category, dosha_type='vata', image='products/p.png', quantity_in_stock=stock,
+        )
+
+    def stock(self, product):
+        product.refresh_from_db(fields=['quantity_in_stock'])
+        return product.quantity_in_stock
+
+    def checkout(self, gateway=None):
+        gateway = gateway or mock.Mock(return_value={'payment_session_id': 'sess'})
+        with mock.patch('shop.api.create_cashfree_order', gateway):
+            return self.client.post('/api/cashfree/create/', {}, format='json')
+
+    def webhook(self, order, payment_status):
+        with mock.patch('shop.api.verify_signature', return_value=True):
+            response = self.client.post(
+                '/api/cashfree/webhook/', {'order_id': order.cashfree_order_id, 'payment_status': payment_status},
+                format='json', HTTP_X_CASHFREE_SIGNATURE='sig',
+            )
+        webhooks.drain()
+        return response
+
+    def test_checkout_reserves_and_payment_commits(self):
+        CartItem.objects.create(cart=self.cart, product=self.amla, quantity=3)
+        response = self.checkout()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock(self.amla), 2)
+        order = Order.objects.get(order_id=response.data['order_id'])
+        reservation = order.reservations.get()
+        self.assertEqual((reservation.status, reservation.quantity), ('held', 3))
+
+        self.assertEqual(self.webhook(order, 'SUCCESS').status_code, 200)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, 'committed')
+        self.assertEqual(self.stock(self.amla), 2)
+
+    def test_failed_payment_releases_stock(self):
+        CartItem.objects.create(cart=self.cart, product=self.amla, quantity=3)
+        order = Order.objects.get(order_id=self.checkout().data['order_id'])
+        self.webhook(order, 'FAILED')
+        self.assertEqual(order.reservations.get().status, 'released')
+        self.assertEqual(self.stock(self.amla), 5)
+        # A repeated webhook does not hand the stock back twice
+        self.webhook(order, 'FAILED')
+        self.assertEqual(self.stock(self.amla), 5)
+
+    def test_insufficient_stock_takes_nothing(self):
+        CartItem.objects.create(cart=self.cart, product=self.amla, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.neem, quantity=2)
+        gateway = mock.Mock()
+        response = self.checkout(gateway)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((response.data['product_id'], response.data['available']), (self.neem.pk, 1))
+        gateway.assert_not_called()
+        self.assertEqual((self.stock(self.amla), self.stock(self.neem)), (5, 1))
+        self.assertFalse(Order.objects.exists())
+
+    def test_gateway_error_releases_stock(self):
+        CartItem.objects.create(cart=self.cart, product=self.amla, quantity=2)
+        response = self.checkout(mock.Mock(side_effect=CashfreeError('down')))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stock(self.amla), 5)
+        self.assertEqual(Order.objects.get().payment_status, 'failed')
+
+    @override_settings(CASHFREE_MAX_CONCURRENT=1, CASHFREE_SLOT_WAIT=0)
+    def test_busy_gateway_rejects_before_reserving(self):
+        CartItem.objects.create(cart=self.cart, product=self.amla, quantity=2)
+        with cashfree.gateway_slot():
+            response = self.checkout()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertEqual(self.stock(self.amla), 5)
+        self.assertFalse(Order.objects.exists())
+
+    def test_sweeper_releases_only_expired(self):
+        CartItem.objects.create(cart=self.cart, product=self.amla, quantity=1)
+        stale = Order.objects.get(order_id=self.checkout().data['order_id'])
+        fresh = Order.objects.get(order_id=self.checkout().data['order_id'])
+        stale.reservations.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        out = StringIO()
+        call_command('release_expired_reservations', stdout=out)
+        self.assertIn('Released 1', out.getvalue())
+        self.assertEqual(stale.reservations.get().status, 'released')
+        self.assertEqual(fresh.reservations.get().status, 'held')
+        self.assertEqual(self.stock(self.amla), 4)
+
+    def test_payment_after_expiry_retakes_stock(self):
+        CartItem.objects.create(cart=self.cart, product=self.amla, quantity=2)
+        order = Order.objects.get(order_id=self.checkout().data['order_id'])
+        inventory.release_expired(now=timezone.now() + inventory.reservation_ttl() + timedelta(seconds=1))
+        self.assertEqual(self.stock(self.amla), 5)
+        self.webhook(order, 'PAID')
+        self.assertEqual(order.reservations.get().status, 'committed')
+        self.assertEqual(self.stock(self.amla), 3)
+
+    def test_catalog_version_moves_only_when_availability_flips(self):
+        CartItem.objects.create(cart=self.cart, product=self.amla, quantity=1)
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.checkout()
+        self.assertEqual(get_catalog_version(), version)
+
+        CartItem.objects.filter(cart=self.cart).update(product=self.neem)
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.get(order_id=self.checkout().data['order_id'])
+        self.assertEqual(self.stock(self.neem), 0)
+        sold_out = get_catalog_version()
+        self.assertNotEqual(sold_out, version)
+        with self.captureOnCommitCallbacks(execute=True):
+            inventory.release(order)
+        self.assertNotEqual(get_catalog_version(), sold_out)
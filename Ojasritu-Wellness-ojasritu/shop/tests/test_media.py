@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from shop.media import _storage_url, absolute, media_url
+from shop.models import Article, Category, Product, Profile
+
+
+class MediaURLTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(
+            name='Herbs', slug='herbs', icon='categories/herbs.png', background_image='categories/bg/herbs.jpg',
+        )
+        Product.objects.create(
+            name='Triphala', slug='triphala', sku='MED-1', description='d', benefits='b', ingredients='i',
+            price=349, category=self.category, dosha_type='tridosha', image='products/triphala.png',
+        )
+
+    def test_serializers_render_absolute_urls(self):
+        category = self.client.get('/api/categories/').json()['results'][0]
+        self.assertEqual(category['icon'], 'http://testserver/media/categories/herbs.png')
+        self.assertEqual(category['background_image'], 'http://testserver/media/categories/bg/herbs.jpg')
+        product = self.client.get('/api/products/').json()['results'][0]
+        self.assertEqual(product['image'], 'http://testserver/media/products/triphala.png')
+
+        author = get_user_model().objects.create_user(username='author', password='pw')
+        Article.objects.create(title='Ojas', slug='ojas', content='c', excerpt='e',
+                               featured_image='articles/ojas.png', category='ayurveda', author=author)
+        article = self.client.get('/api/articles/ojas/').json()
+        self.assertEqual(article['featured_image'], 'http://testserver/media/articles/ojas.png')
+
+        Profile.objects.update_or_create(user=author, defaults={'avatar': 'avatars/a.png'})
+        self.client.force_authenticate(author)
+        profile = self.client.get('/api/profile/').json()
+        self.assertEqual(profile['avatar'], 'http://testserver/media/avatars/a.png')
+
+    def test_prefix_follows_request_host(self):
+        product = self.client.get('/api/products/', HTTP_HOST='localhost', secure=True).json()['results'][0]
+        self.assertEqual(product['image'], 'https://localhost/media/products/triphala.png')
+
+    @override_settings(MEDIA_PUBLIC_ORIGIN='https://cdn.ojasritu.co.in/')
+    def test_configured_public_origin(self):
+        product = self.client.get('/api/products/').json()['results'][0]
+        self.assertEqual(product['image'], 'https://cdn.ojasritu.co.in/media/products/triphala.png')
+        self.assertEqual(absolute('https://elsewhere/x.png'), 'https://elsewhere/x.png')
+
+    def test_without_request_and_empty_files(self):
+        self.assertEqual(media_url(self.category.icon), '/media/categories/herbs.png')
+        self.assertIsNone(media_url(Category(name='Empty').icon))
+
+    def test_urls_are_memoized(self):
+        _storage_url.cache_clear()
+        self.client.get('/api/products/?page_size=1')
+        cache.clear()
+        self.client.get('/api/products/?page_size=1')
+        info = _storage_url.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 1))
@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from shop.pagination import KeysetPagination
+
+from shop.models import Category, Product, Order
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Herbs', slug='herbs')
+        # Mix the flags so the ordering has plenty of ties on the leading fields
+        for i in range(11):
+            Product.objects.create(
+                name=f'Product {i}', slug=f'product-{i}', sku=f'SKU-{i}',
+                description='d', benefits='b', ingredients='i', price=100,
+                category=category, dosha_type='vata', image='products/p.png',
+                is_featured=(i % 3 == 0), is_bestseller=(i % 2 == 0),
+            )
+        self.expected = list(Product.objects.order_by('-is_featured', '-is_bestseller', '-created_at', '-id')
+                             .values_list('slug', flat=True))
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            pages.append(resp.json())
+            url = resp.json()[link]
+        return pages
+
+    def test_forward_walk_visits_every_product_once_in_order(self):
+        pages = self.walk('/api/products/?page_size=4', 'next')
+        self.assertEqual([len(p['results']) for p in pages], [4, 4, 3])
+        self.assertIsNone(pages[0]['previous'])
+        slugs = [item['slug'] for page in pages for item in page['results']]
+        self.assertEqual(slugs, self.expected)
+
+    def test_backward_walk_from_last_page(self):
+        last = self.walk('/api/products/?page_size=4', 'next')[-1]
+        pages = self.walk(last['previous'], 'previous')
+        slugs = [item['slug'] for page in reversed(pages) for item in page['results']]
+        self.assertEqual(slugs, self.expected[:8])
+
+    def test_cursor_is_combined_with_filters(self):
+        resp = self.client.get('/api/products/?bestseller=1&page_size=2')
+        first = [p['slug'] for p in resp.json()['results']]
+        resp = self.client.get(resp.json()['next'])
+        second = [p['slug'] for p in resp.json()['results']]
+        bestsellers = [s for s in self.expected if int(s.split('-')[1]) % 2 == 0]
+        self.assertEqual(first + second, bestsellers[:4])
+
+    def test_uniform_ordering_seeks_with_a_row_comparison(self):
+        first = self.client.get('/api/products/?page_size=4').json()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first['next'])
+        seek = [q['sql'] for q in queries if 'FROM "shop_product"' in q['sql'] and 'LIMIT 5' in q['sql']]
+        self.assertEqual(len(seek), 1)
+        self.assertIn('("shop_product"."is_featured", "shop_product"."is_bestseller", '
+                      '"shop_product"."created_at", "shop_product"."id") < (', seek[0])
+        self.assertNotIn(' OR ', seek[0])
+
+    def test_mixed_direction_ordering_walks_in_order(self):
+        view = type('View', (), {'cursor_ordering': ['-is_featured', 'name']})()
+        expected = list(Product.objects.order_by('-is_featured', 'name', 'id').values_list('slug', flat=True))
+        slugs, url = [], '/api/products/?page_size=3'
+        while url:
+            paginator = KeysetPagination()
+            request = Request(APIRequestFactory().get(url))
+            slugs += [p.slug for p in paginator.paginate_queryset(Product.objects.all(), request, view)]
+            url = paginator.get_next_link()
+        self.assertEqual(slugs, expected)
+
+    def test_invalid_cursor_returns_404(self):
+        resp = self.client.get('/api/products/?cursor=not-a-cursor')
+        self.assertEqual(resp.status_code, 404)
+
+    def test_staff_orders_are_paginated(self):
+        User = get_user_model()
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        for i in range(30):
+            Order.objects.create(order_id=f'ORD-{i}', customer=staff, total_amount=1,
+                                 final_amount=1, payment_method='cashfree')
+        self.client.force_authenticate(user=staff)
+        pages = self.walk('/api/orders/', 'next')
+        self.assertEqual([len(p['results']) for p in pages], [24, 6])
+        ids = [o['order_id'] for page in pages for o in page['results']]
+        self.assertEqual(len(set(ids)), 30)
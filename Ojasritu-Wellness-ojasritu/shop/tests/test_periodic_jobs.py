@@ -0,0 +1,27 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from shop.management.commands import run_periodic_jobs
+
+
+class PeriodicJobsTests(TestCase):
+    def test_once_runs_every_job_even_if_one_fails(self):
+        def fake(name, **kwargs):
+            if name == 'reconcile_payments':
+                raise RuntimeError('gateway down')
+
+        with mock.patch.object(run_periodic_jobs, 'call_command', side_effect=fake) as job, \
+                self.assertLogs(run_periodic_jobs.logger, 'ERROR') as logs:
+            call_command('run_periodic_jobs', once=True, stdout=StringIO())
+        self.assertIn('reconcile_payments failed', logs.output[0])
+        self.assertEqual([c.args[0] for c in job.call_args_list], [name for name, _ in run_periodic_jobs.JOBS])
+
+    def test_jobs_exist(self):
+        out = StringIO()
+        call_command('run_periodic_jobs', once=True, stdout=out)
+        self.assertIn('Released 0 expired stock reservations', out.getvalue())
+        self.assertIn('Checked 0 pending orders', out.getvalue())
+        self.assertIn('Purged 0 expired idempotency keys', out.getvalue())
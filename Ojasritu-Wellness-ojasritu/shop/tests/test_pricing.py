@@ -0,0 +1,85 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from shop import pricing
+from shop.models import Cart, CartItem, Category, Product
+
+
+class PricingEngineTests(SimpleTestCase):
+    def product(self, pk=1, price='100.00', discount_price=None, tiers=None):
+        return Product(id=pk, price=Decimal(price), discount_price=discount_price and Decimal(discount_price),
+                       bulk_discount=tiers or {})
+
+    def test_tiers(self):
+        product = self.product(price='333.33', tiers={'10': 10, '50': '15.5'})
+        self.assertEqual(pricing.price_line(product, 9).total, Decimal('2999.97'))
+        line = pricing.price_line(product, 10)
+        self.assertEqual((line.unit_price, line.discount_percent), (Decimal('300.00'), Decimal('10')))
+        self.assertEqual(line.total, Decimal('3000.00'))
+        line = pricing.price_line(product, 50)
+        # 333.33 * 0.845 = 281.66385 -> 281.66
+        self.assertEqual(line.unit_price, Decimal('281.66'))
+        self.assertEqual(line.total, Decimal('14083.00'))
+        self.assertEqual(line.savings, Decimal('2583.50'))
+
+    def test_discount_price_is_the_base(self):
+        product = self.product(price='200', discount_price='150', tiers={'2': 10})
+        self.assertEqual(pricing.price_line(product, 2).unit_price, Decimal('135.00'))
+
+    def test_invalid_tiers_are_ignored(self):
+        product = self.product(tiers={'x': 10, '5': 'lots', '1': 50, '3': 100, '4': [1], '6': 20})
+        self.assertEqual(pricing.tiers_for(product), (pricing.Tier(6, Decimal('20')),))
+        self.assertEqual(pricing.tiers_for(self.product(tiers=[10, 20])), ())
+
+    def test_parsed_tables_are_shared(self):
+        pricing._parse_tiers.cache_clear()
+        for pk in range(5):
+            pricing.price_line(self.product(pk=pk, tiers={'10': 5}), 12)
+        info = pricing._parse_tiers.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 4))
+
+    def test_price_cart(self):
+        a = self.product(pk=1, price='10.00', tiers={'3': 50})
+        b = self.product(pk=2, price='2.50')
+        quote = pricing.price_cart([(a, 4), (b, 2)])
+        self.assertEqual(quote.subtotal, Decimal('45.00'))
+        self.assertEqual(quote.total, Decimal('25.00'))
+        self.assertEqual(quote.discount, Decimal('20.00'))
+        self.assertEqual(quote.item_count, 6)
+
+
+class PricingIntegrationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Herbs', slug='herbs')
+        self.product = Product.objects.create(
+            name='Triphala', slug='triphala', sku='PRC-1', description='d', benefits='b', ingredients='i',
+            price=Decimal('120.00'), category=category, dosha_type='tridosha', image='products/p.png',
+            bulk_discount={'50': 15, '10': 10},
+        )
+        self.user = get_user_model().objects.create_user(username='buyer')
+
+    def test_cart_uses_tiers(self):
+        cart = Cart.objects.create(customer=self.user)
+        item = CartItem.objects.create(cart=cart, product=self.product, quantity=10)
+        self.assertEqual(item.get_total_price(), Decimal('1080.00'))
+        self.assertEqual(cart.get_total_price(), Decimal('1080.00'))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get('/api/cart/').json()
+        self.assertEqual(data['subtotal'], 1200.0)
+        self.assertEqual(data['discount'], 120.0)
+        self.assertEqual(data['total_price'], 1080.0)
+        self.assertEqual(data['items'][0]['unit_price'], 108.0)
+
+    def test_listing_badges(self):
+        data = APIClient().get('/api/products/?fields=card').json()
+        self.assertEqual(data['results'][0]['bulk_tiers'], [
+            {'min_quantity': 10, 'percent': '10', 'unit_price': '108.00'},
+            {'min_quantity': 50, 'percent': '15', 'unit_price': '102.00'},
+        ])
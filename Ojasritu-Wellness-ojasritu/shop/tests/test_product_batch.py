@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from shop.models import Category, Product
+
+
+class ProductBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Herbs', slug='herbs')
+        self.products = [
+            Product.objects.create(
+                name=f'Herb {i}', slug=f'herb-{i}', sku=f'BAT-{i}', description='d', benefits='b',
+                ingredients='i', price=100 + i, category=category, dosha_type='vata',
+                image='products/p.png', status='draft' if i == 4 else 'active',
+            )
+            for i in range(5)
+        ]
+
+    def test_ids_preserve_request_order(self):
+        a, b, c = self.products[2], self.products[0], self.products[3]
+        with self.assertNumQueries(1):
+            data = self.client.get(f'/api/products/batch/?ids={a.pk},{b.pk},{c.pk},{a.pk}').json()
+        self.assertEqual([p['id'] for p in data['results']], [a.pk, b.pk, c.pk])
+        self.assertEqual(data['missing'], [])
+        self.assertEqual(data['results'][0]['image'], 'http://testserver/media/products/p.png')
+
+    def test_slugs_and_missing(self):
+        data = self.client.get('/api/products/batch/?slugs=herb-1,nope,herb-4,herb-0').json()
+        self.assertEqual([p['slug'] for p in data['results']], ['herb-1', 'herb-0'])
+        # Inactive products are not exposed
+        self.assertEqual(data['missing'], ['nope', 'herb-4'])
+
+    def test_repeated_lookups_come_from_cache(self):
+        ids = [p.pk for p in self.products[:2]]
+        self.client.get(f'/api/products/batch/?ids={ids[0]}')
+        # Only the uncached product is queried
+        with self.assertNumQueries(1):
+            data = self.client.get(f'/api/products/batch/?ids={ids[1]},{ids[0]}').json()
+        self.assertEqual([p['id'] for p in data['results']], [ids[1], ids[0]])
+        with self.assertNumQueries(0):
+            self.client.get(f'/api/products/batch/?ids={ids[0]},{ids[1]}', HTTP_HOST='localhost')
+
+    def test_catalog_write_invalidates(self):
+        product = self.products[0]
+        self.client.get(f'/api/products/batch/?ids={product.pk}')
+        product.price = 999
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        data = self.client.get(f'/api/products/batch/?ids={product.pk}').json()
+        self.assertEqual(data['results'][0]['price'], '999.00')
+
+    def test_fields_apply(self):
+        data = self.client.get('/api/products/batch/?slugs=herb-0&fields=slug,price').json()
+        self.assertEqual(data['results'], [{'slug': 'herb-0', 'price': '100.00'}])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get('/api/products/batch/').status_code, 400)
+        self.assertEqual(self.client.get('/api/products/batch/?ids=1&slugs=a').status_code, 400)
+        self.assertEqual(self.client.get('/api/products/batch/?ids=1,x').status_code, 400)
+        ids = ','.join(str(i) for i in range(51))
+        self.assertEqual(self.client.get(f'/api/products/batch/?ids={ids}').status_code, 400)
@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from shop.models import Category, Product, ProductReview
+
+User = get_user_model()
+
+
+class ProductReviewEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Herbs', slug='herbs')
+        self.product = Product.objects.create(
+            name='Triphala', slug='triphala', sku='REV-1', description='d', benefits='b',
+            ingredients='i', price=349, category=category, dosha_type='tridosha', image='products/p.png',
+        )
+        now = timezone.now()
+        # (rating, helpful_count) in creation order, oldest first
+        rows = [(5, 0), (3, 9), (4, 2), (1, 4), (5, 7), (2, 0), (4, 1)]
+        self.reviews = []
+        for i, (rating, helpful) in enumerate(rows):
+            review = ProductReview.objects.create(
+                product=self.product, customer=User.objects.create_user(username=f'r{i}'),
+                rating=rating, helpful_count=helpful, title=f'Review {i}', comment='c',
+            )
+            ProductReview.objects.filter(pk=review.pk).update(created_at=now - timedelta(days=len(rows) - i))
+            self.reviews.append(review)
+
+    def titles(self, results):
+        return [r['title'] for r in results]
+
+    def test_detail_embeds_latest_reviews_in_one_prefetch(self):
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/products/triphala/').json()
+        self.assertEqual(self.titles(data['reviews']), [f'Review {i}' for i in (6, 5, 4, 3, 2)])
+        self.assertEqual(data['reviews'][0]['customer_name'], 'r6')
+
+    def test_paginated_sorts(self):
+        expected = {
+            'recent': [6, 5, 4, 3, 2, 1, 0],
+            'helpful': [1, 4, 3, 2, 6, 5, 0],
+            'rating': [4, 0, 6, 2, 1, 5, 3],
+        }
+        for sort, order in expected.items():
+            url = f'/api/products/triphala/reviews/?sort={sort}&page_size=3'
+            seen = []
+            while url:
+                with self.assertNumQueries(2):
+                    data = self.client.get(url).json()
+                seen += self.titles(data['results'])
+                url = data['next']
+            self.assertEqual(seen, [f'Review {i}' for i in order], sort)
+
+    def test_histogram_and_summary(self):
+        data = self.client.get('/api/products/triphala/reviews/').json()
+        self.assertEqual(data['sort'], 'recent')
+        self.assertEqual(data['total_reviews'], 7)
+        self.assertEqual(data['rating'], 3.43)
+        self.assertEqual(data['histogram'], {'1': 1, '2': 1, '3': 1, '4': 2, '5': 2})
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/api/products/triphala/reviews/?sort=funny').status_code, 400)
+        self.assertEqual(self.client.get('/api/products/nope/reviews/').status_code, 404)
+        self.product.status = 'draft'
+        self.product.save()
+        self.assertEqual(self.client.get('/api/products/triphala/reviews/').status_code, 404)
@@ -0,0 +1,136 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from shop.models import (
+    Category, Product, ProductReview, Order, Rebooking, Article, FAQ, ContactMessage
+)
+
+
+def make_catalog(n_products, reviews_per_product=0):
+    """Create a category with ``n_products`` active products and optional reviews."""
+    User = get_user_model()
+    category, _ = Category.objects.get_or_create(slug='herbs', defaults={'name': 'Herbs'})
+    products = []
+    start = Product.objects.count()
+    for i in range(start, start + n_products):
+        products.append(Product.objects.create(
+            name=f'Product {i}', slug=f'product-{i}', sku=f'SKU-{i}',
+            description='desc', benefits='लाभ', ingredients='Amla',
+            price=100 + i, category=category, dosha_type='vata',
+            image='products/p.png',
+        ))
+    for p in products:
+        for j in range(reviews_per_product):
+            reviewer, _ = User.objects.get_or_create(username=f'reviewer{j}')
+            ProductReview.objects.create(product=p, customer=reviewer, rating=5, title='t', comment='c')
+    return category, products
+
+
+class QueryBudgetTests(TestCase):
+    """Pin the number of SQL queries per router endpoint.
+
+    Each endpoint is exercised with a small and a large data set; the query
+    count must be identical so it cannot grow with the size of a page.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.User = get_user_model()
+        self.staff = self.User.objects.create_user(username='staff', email='staff@example.com', password='x', is_staff=True)
+
+    def assertConstantQueries(self, url, expected, grow, user=None):
+        if user is not None:
+            self.client.force_authenticate(user=user)
+        with self.assertNumQueries(expected):
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        # Catalog writes bump the cache version on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            grow()
+        with self.assertNumQueries(expected):
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp
+
+    def test_products_list(self):
+        make_catalog(2)
+        self.assertConstantQueries('/api/products/', 1, lambda: make_catalog(25))
+
+    def test_product_detail_with_reviews(self):
+        _, products = make_catalog(1, reviews_per_product=1)
+        product = products[0]
+
+        def grow():
+            for j in range(1, 8):
+                reviewer = self.User.objects.create_user(username=f'extra{j}')
+                ProductReview.objects.create(product=product, customer=reviewer, rating=4, title='t', comment='c')
+
+        self.assertConstantQueries(f'/api/products/{product.slug}/', 2, grow)
+
+    def test_categories_list(self):
+        make_catalog(1)
+
+        def grow():
+            for i in range(10):
+                Category.objects.create(name=f'Cat {i}', slug=f'cat-{i}')
+
+        self.assertConstantQueries('/api/categories/', 1, grow)
+
+    def test_orders_list(self):
+        def make_orders(n, start):
+            for i in range(n):
+                customer = self.User.objects.create_user(username=f'buyer{start + i}')
+                Order.objects.create(
+                    order_id=f'ORD-{start + i}', customer=customer, total_amount=100,
+                    final_amount=100, payment_method='cashfree',
+                )
+
+        make_orders(1, 0)
+        self.assertConstantQueries('/api/orders/', 1, lambda: make_orders(10, 1), user=self.staff)
+
+    def test_rebookings_list(self):
+        def make_rebookings(n, start):
+            for i in range(n):
+                customer = self.User.objects.create_user(username=f'patient{start + i}')
+                Rebooking.objects.create(
+                    customer=customer, consultation_type='general',
+                    scheduled_date=timezone.now().date(), scheduled_time='10:00',
+                    health_concerns='none', dosha_type='vata',
+                )
+
+        make_rebookings(1, 0)
+        self.assertConstantQueries('/api/rebookings/', 1, lambda: make_rebookings(10, 1), user=self.staff)
+
+    def test_articles_list(self):
+        def make_articles(n, start):
+            for i in range(n):
+                author = self.User.objects.create_user(username=f'author{start + i}')
+                Article.objects.create(
+                    title=f'Article {start + i}', slug=f'article-{start + i}', content='c',
+                    excerpt='e', featured_image='articles/a.png', category='ayurveda', author=author,
+                )
+
+        make_articles(1, 0)
+        self.assertConstantQueries('/api/articles/', 1, lambda: make_articles(10, 1))
+
+    def test_faqs_list(self):
+        def make_faqs(n):
+            for i in range(n):
+                FAQ.objects.create(question_en=f'Q{i}', answer_en='A', category='general')
+
+        make_faqs(1)
+        self.assertConstantQueries('/api/faqs/', 1, lambda: make_faqs(10))
+
+    def test_contact_list(self):
+        def make_messages(n):
+            for i in range(n):
+                ContactMessage.objects.create(
+                    name='n', email=f'c{i}@example.com', subject='s', message='m', category='general',
+                )
+
+        make_messages(1)
+        self.assertConstantQueries('/api/contact/', 1, lambda: make_messages(10), user=self.staff)
@@ -0,0 +1,104 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from shop.models import Category, Product, ProductReview
+
+User = get_user_model()
+
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Herbs', slug='herbs')
+        self.product = Product.objects.create(
+            name='Triphala', slug='triphala', sku='RAT-1', description='d', benefits='b',
+            ingredients='i', price=349, category=category, dosha_type='tridosha',
+            image='products/p.png',
+        )
+        self.other = Product.objects.create(
+            name='Brahmi', slug='brahmi', sku='RAT-2', description='d', benefits='b',
+            ingredients='i', price=299, category=category, dosha_type='pitta',
+            image='products/p.png',
+        )
+        self.users = [User.objects.create_user(username=f'reviewer{i}') for i in range(3)]
+
+    def review(self, user, rating, product=None):
+        return ProductReview.objects.create(
+            product=product or self.product, customer=user, rating=rating, title='t', comment='c',
+        )
+
+    def assertAggregates(self, product, total, rating_sum, histogram):
+        product.refresh_from_db()
+        self.assertEqual(product.total_reviews, total)
+        self.assertEqual(product.rating_sum, rating_sum)
+        self.assertEqual(product.get_rating_histogram(), dict(zip(range(1, 6), histogram)))
+        self.assertEqual(product.rating, round(rating_sum / total, 2) if total else 0.0)
+
+    def test_create_update_delete(self):
+        first = self.review(self.users[0], 5)
+        self.review(self.users[1], 4)
+        self.review(self.users[2], 4)
+        self.assertAggregates(self.product, 3, 13, [0, 0, 0, 2, 1])
+        self.assertEqual(self.product.rating, 4.33)
+
+        first.rating = 1
+        first.save()
+        self.assertAggregates(self.product, 3, 9, [1, 0, 0, 2, 0])
+
+        first.delete()
+        self.assertAggregates(self.product, 2, 8, [0, 0, 0, 2, 0])
+
+        ProductReview.objects.filter(product=self.product).delete()
+        self.assertAggregates(self.product, 0, 0, [0, 0, 0, 0, 0])
+
+    def test_moving_review_between_products(self):
+        review = self.review(self.users[0], 3)
+        review.product = self.other
+        review.save()
+        self.assertAggregates(self.product, 0, 0, [0, 0, 0, 0, 0])
+        self.assertAggregates(self.other, 1, 3, [0, 0, 1, 0, 0])
+
+    def test_detail_reads_aggregates_without_aggregating(self):
+        self.review(self.users[0], 5)
+        self.review(self.users[1], 2)
+        client = APIClient()
+        with self.assertNumQueries(2):
+            data = client.get('/api/products/triphala/').json()
+        self.assertEqual(data['rating'], 3.5)
+        self.assertEqual(data['total_reviews'], 2)
+        self.assertEqual(data['rating_histogram'], {'1': 0, '2': 1, '3': 0, '4': 0, '5': 1})
+        listing = client.get('/api/products/?dosha=tridosha').json()
+        self.assertEqual(listing['results'][0]['total_reviews'], 2)
+
+    def test_recompute_command_repairs_drift(self):
+        self.review(self.users[0], 5)
+        self.review(self.users[1], 1, product=self.other)
+        # queryset.update() bypasses signals and leaves the aggregates stale
+        ProductReview.objects.filter(product=self.product).update(rating=2)
+        Product.objects.filter(pk=self.other.pk).update(rating_sum=40, total_reviews=9)
+
+        out = StringIO()
+        call_command('recompute_ratings', stdout=out)
+        self.assertIn('2 products were out of date', out.getvalue())
+        self.assertAggregates(self.product, 1, 2, [0, 1, 0, 0, 0])
+        self.assertAggregates(self.other, 1, 1, [1, 0, 0, 0, 0])
+
+        out = StringIO()
+        call_command('recompute_ratings', stdout=out)
+        self.assertIn('0 products were out of date', out.getvalue())
+
+    def test_recompute_keeps_curated_rating_without_reviews(self):
+        Product.objects.filter(pk=self.other.pk).update(rating=4.7, rating_sum=3, rating_1_count=1)
+        call_command('recompute_ratings', stdout=StringIO())
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.rating, 4.7)
+        self.assertEqual((self.other.rating_sum, self.other.rating_1_count), (0, 0))
+
+        self.review(self.users[0], 3, product=self.other)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.rating, 3.0)
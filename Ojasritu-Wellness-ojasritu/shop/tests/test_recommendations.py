@@ -0,0 +1,132 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from shop import recommendations
+from shop.api import cashfree_create_order
+from shop.models import Cart, CartItem, Category, Order, Product, ProductAssociation, Profile
+
+User = get_user_model()
+
+
+class BoughtTogetherTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='buyer')
+        herbs = Category.objects.create(name='Herbs', slug='herbs')
+        oils = Category.objects.create(name='Oils', slug='oils')
+        self.p = {}
+        for i, (slug, category, dosha) in enumerate([
+            ('amla', herbs, 'pitta'), ('triphala', herbs, 'tridosha'), ('brahmi', herbs, 'pitta'),
+            ('neem', herbs, 'pitta'), ('kumkumadi', oils, 'pitta'), ('bhringraj', oils, 'vata'),
+            ('anu-taila', oils, 'vata'),
+        ]):
+            self.p[slug] = Product.objects.create(
+                name=slug.title(), slug=slug, sku=f'FBT-{i}', description='d', benefits='b', ingredients='i',
+                price=100, category=category, dosha_type=dosha, image='products/p.png', quantity_in_stock=10,
+            )
+
+    def order(self, *slugs, paid=True):
+        Order.objects.create(
+            order_id=f'ORD-{Order.objects.count()}', customer=self.user, total_amount=100, final_amount=100,
+            payment_method='cashfree', payment_status='paid' if paid else 'pending',
+            cart_snapshot=[{'product_id': self.p[s].pk, 'quantity': 1} for s in slugs],
+        )
+
+    def test_count_pairs(self):
+        ids, order_counts, pairs = recommendations.count_pairs([{1, 2, 3}, {2, 3}, {3}])
+        n = len(ids)
+        index = {pid: i for i, pid in enumerate(ids)}
+        self.assertEqual([order_counts[index[pid]] for pid in (1, 2, 3)], [1, 2, 3])
+        a, b = sorted((index[2], index[3]))
+        self.assertEqual(pairs[a * n + b], 2)
+        self.assertEqual(sum(pairs.values()), 4)
+
+    def test_count_pairs_across_blocks_with_support(self):
+        baskets = [{1, 2, 3, 4}, {1, 2, 3}, {2, 3, 4}, {5, 1}]
+        with mock.patch.object(recommendations, 'BLOCK_CELLS', 1):
+            ids, order_counts, pairs = recommendations.count_pairs(baskets, min_support=2)
+        n = len(ids)
+        found = {frozenset((ids[key // n], ids[key % n])): count for key, count in pairs.items()}
+        # 5 sold once, so it is never indexed
+        self.assertNotIn(5, ids)
+        self.assertEqual(found, {frozenset({1, 2}): 2, frozenset({1, 3}): 2, frozenset({2, 3}): 3,
+                                 frozenset({2, 4}): 2, frozenset({3, 4}): 2})
+
+    def test_build_and_serve(self):
+        for _ in range(3):
+            self.order('amla', 'triphala', 'kumkumadi')
+        self.order('amla', 'triphala')
+        self.order('amla', 'bhringraj')
+        self.order('amla', 'bhringraj')
+        self.order('amla', 'neem', paid=False)
+        self.order('amla', 'neem', paid=False)
+
+        out = StringIO()
+        call_command('build_bought_together', stdout=out)
+        self.assertIn('for 4 products', out.getvalue())
+        association = ProductAssociation.objects.get(product=self.p['amla'])
+        self.assertEqual(association.related_ids,
+                         [self.p['triphala'].pk, self.p['kumkumadi'].pk, self.p['bhringraj'].pk])
+        self.assertEqual(association.counts, [4, 3, 2])
+
+        data = self.client.get('/api/products/amla/related/?limit=4').json()
+        # Mined partners first, then same category and dosha (brahmi, neem) as filler
+        self.assertEqual([c['slug'] for c in data['results']], ['triphala', 'kumkumadi', 'bhringraj', 'neem'])
+        self.assertTrue(data['results'][0]['image'].startswith('http://testserver/'))
+        with self.assertNumQueries(0):
+            self.client.get('/api/products/amla/related/?limit=2')
+
+    def test_inactive_partners_are_replaced(self):
+        for _ in range(2):
+            self.order('amla', 'triphala', 'kumkumadi')
+        recommendations.build()
+        Product.objects.filter(pk=self.p['triphala'].pk).update(status='inactive')
+        data = self.client.get('/api/products/amla/related/?limit=3').json()
+        self.assertEqual([c['slug'] for c in data['results']], ['kumkumadi', 'neem', 'brahmi'])
+
+    def test_cold_start_fallback(self):
+        data = self.client.get('/api/products/kumkumadi/related/').json()
+        # Same category: same dosha has nothing, then the other oils
+        self.assertEqual([c['slug'] for c in data['results']], ['anu-taila', 'bhringraj'])
+        data = self.client.get('/api/products/brahmi/related/').json()
+        self.assertEqual([c['slug'] for c in data['results']][:2], ['neem', 'amla'])
+        self.assertEqual(self.client.get('/api/products/nope/related/').status_code, 404)
+
+    def test_unknown_slugs_are_not_cached(self):
+        with mock.patch('shop.api.cached_catalog_data') as cached:
+            for i in range(3):
+                self.assertEqual(self.client.get(f'/api/products/nope-{i}/related/').status_code, 404)
+        cached.assert_not_called()
+
+    def test_rebuild_invalidates_cached_lists(self):
+        self.client.get('/api/products/bhringraj/related/')
+        self.order('bhringraj', 'amla')
+        self.order('bhringraj', 'amla')
+        with self.captureOnCommitCallbacks(execute=True):
+            recommendations.build()
+        data = self.client.get('/api/products/bhringraj/related/').json()
+        self.assertEqual(data['results'][0]['slug'], 'amla')
+
+    def test_checkout_records_cart_snapshot(self):
+        Profile.objects.create(user=self.user, phone='9876543210')
+        cart = Cart.objects.create(customer=self.user)
+        CartItem.objects.create(cart=cart, product=self.p['amla'], quantity=2)
+        CartItem.objects.create(cart=cart, product=self.p['neem'], quantity=1)
+        request = APIRequestFactory().post('/api/cashfree/create/', {}, format='json')
+        force_authenticate(request, user=self.user)
+        with mock.patch('shop.api.create_cashfree_order', return_value={'payment_session_id': 'sess'}):
+            response = cashfree_create_order(request)
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get(order_id=response.data['order_id'])
+        self.assertEqual(
+            [(item['product_id'], item['quantity']) for item in order.cart_snapshot],
+            [(self.p['amla'].pk, 2), (self.p['neem'].pk, 1)],
+        )
+        self.assertEqual(order.final_amount, 300)
@@ -0,0 +1,192 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from shop import cashfree, reconcile
+from shop.models import Order
+
+
+class FakeGateway(BaseHTTPRequestHandler):
+    """GET /pg/orders/<id> answering from ``server.orders``; ``server.script`` queues error codes."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        ref = self.path.rsplit('/', 1)[-1]
+        with server.lock:
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+            server.calls.append(ref)
+            code = server.script.pop(0) if server.script else (200 if ref in server.orders else 404)
+        time.sleep(server.delay)
+        payload = {'order_id': ref, 'order_status': server.orders.get(ref)} if code == 200 else {'message': 'nope'}
+        data = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if code == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(data)
+        with server.lock:
+            server.in_flight -= 1
+
+
+class ReconcilePaymentsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGateway)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        server = self.server
+        server.lock, server.in_flight, server.peak = threading.Lock(), 0, 0
+        server.calls, server.script, server.orders, server.delay = [], [], {}, 0
+        settings = override_settings(
+            CASHFREE_API_BASE=f'http://127.0.0.1:{server.server_port}/pg',
+            CASHFREE_APP_ID='app', CASHFREE_SECRET_KEY='secret', CASHFREE_RETRY_BACKOFF=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cashfree.reset_session()
+        self.addCleanup(cashfree.reset_session)
+        self.user = get_user_model().objects.create_user(username='buyer', email='b@example.com')
+
+    def order(self, ref, gateway_status=None, age=timedelta(hours=1), **fields):
+        order = Order.objects.create(
+            order_id=f'ORD-{ref}', customer=self.user, total_amount=100, final_amount=100,
+            payment_method='cashfree', cashfree_order_id=ref, **fields,
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - age)
+        if gateway_status:
+            self.server.orders[ref] = gateway_status
+        return order
+
+    def state(self, order):
+        order.refresh_from_db()
+        return order.payment_status, order.status
+
+    def test_applies_gateway_status_to_stale_orders(self):
+        paid = self.order('cf-paid', 'PAID')
+        expired = self.order('cf-expired', 'EXPIRED')
+        active = self.order('cf-active', 'ACTIVE')
+        fresh = self.order('cf-fresh', 'PAID', age=timedelta(minutes=1))
+        settled = self.order('cf-settled', 'PAID', payment_status='failed')
+        self.order('', age=timedelta(days=1))
+
+        result = reconcile.reconcile(workers=4, rate=1000)
+        self.assertEqual(sorted(self.server.calls), ['cf-active', 'cf-expired', 'cf-paid'])
+        self.assertEqual((result.checked, result.errors, result.applied), (3, 0, {'cf-paid', 'cf-expired'}))
+        self.assertEqual(self.state(paid), ('paid', 'completed'))
+        self.assertEqual(self.state(expired), ('failed', 'cancelled'))
+        self.assertEqual(self.state(active), ('pending', 'pending'))
+        self.assertEqual(self.state(fresh), ('pending', 'pending'))
+        self.assertEqual(self.state(settled), ('failed', 'pending'))
+
+    def test_lookups_run_concurrently_within_the_pool_bound(self):
+        for i in range(12):
+            self.order(f'cf-{i}', 'PAID')
+        self.server.delay = 0.05
+        start = time.monotonic()
+        result = reconcile.reconcile(workers=4, rate=1000)
+        elapsed = time.monotonic() - start
+        self.assertEqual(len(result.applied), 12)
+        self.assertEqual(self.server.peak, 4)
+        # Serially this would take 12 x 50 ms
+        self.assertLess(elapsed, 0.5)
+
+    def test_rate_limited_lookup_is_retried(self):
+        order = self.order('cf-1', 'PAID')
+        self.server.script = [429, 429]
+        result = reconcile.reconcile(workers=1, rate=1000)
+        self.assertEqual(self.server.calls, ['cf-1'] * 3)
+        self.assertEqual(result.errors, 0)
+        self.assertEqual(self.state(order), ('paid', 'completed'))
+
+    def test_failed_lookups_leave_orders_pending(self):
+        missing = self.order('cf-missing')
+        paid = self.order('cf-paid', 'PAID')
+        result = reconcile.reconcile(workers=2, rate=1000, batch_size=1)
+        self.assertEqual((result.checked, result.errors), (1, 1))
+        self.assertEqual(self.state(missing), ('pending', 'pending'))
+        self.assertEqual(self.state(paid), ('paid', 'completed'))
+
+    def test_unsettled_orders_are_not_rechecked_until_due(self):
+        active = self.order('cf-active', 'ACTIVE')
+        self.order('cf-missing')
+        self.order('cf-flaky', 'PAID', age=timedelta(hours=2))
+        self.server.script = [503] * 4  # the oldest order's lookup exhausts its GET retries
+        reconcile.reconcile(workers=1, rate=1000)
+        self.assertEqual(sorted(self.server.calls), ['cf-active', 'cf-flaky', 'cf-flaky', 'cf-flaky', 'cf-flaky', 'cf-missing'])
+
+        # Only the transient failure is asked about again on the next run
+        self.server.calls = []
+        result = reconcile.reconcile(workers=1, rate=1000)
+        self.assertEqual(self.server.calls, ['cf-flaky'])
+        self.assertEqual(result.applied, {'cf-flaky'})
+
+        self.server.calls = []
+        later = timezone.now() + reconcile.recheck_after() + timedelta(seconds=1)
+        reconcile.reconcile(workers=1, rate=1000, now=later)
+        self.assertEqual(sorted(self.server.calls), ['cf-active', 'cf-missing'])
+        active.refresh_from_db()
+        self.assertIsNotNone(active.payment_checked_at)
+
+    def test_command_rejects_non_positive_rate(self):
+        with self.assertRaises(CommandError):
+            call_command('reconcile_payments', '--rate', '0')
+        with self.assertRaises(ValueError):
+            reconcile.RateLimiter(0)
+
+    def test_command(self):
+        self.order('cf-1', 'PAID')
+        self.order('cf-2', 'ACTIVE')
+        out = StringIO()
+        call_command('reconcile_payments', rate=1000, stdout=out)
+        self.assertIn('Checked 2 pending orders, updated 1 (0 lookups failed)', out.getvalue())
+
+
+class RateLimiterTests(TestCase):
+    def test_spaces_calls_after_the_burst(self):
+        now, slept = [0.0], []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        limiter = reconcile.RateLimiter(rate=2, burst=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            limiter.acquire()
+        self.assertEqual(slept, [0.5, 0.5])
+
+    def test_pause_blocks_callers(self):
+        now, slept = [0.0], []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        limiter = reconcile.RateLimiter(rate=100, clock=lambda: now[0], sleep=sleep)
+        limiter.pause(3)
+        limiter.acquire()
+        self.assertEqual(sum(slept), 3)
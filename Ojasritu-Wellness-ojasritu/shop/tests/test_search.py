@@ -0,0 +1,73 @@
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from shop import search
+from shop.models import Category, Product
+
+
+@override_settings(PRODUCT_SEARCH_BACKEND='database')
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Powders', slug='powders')
+        self.triphala = self.make('Triphala Churna', 'त्रिफला चूर्ण', ingredients='Amla, Haritaki, Bibhitaki')
+        self.ashwagandha = self.make('Ashwagandha Capsule', 'अश्वगंधा कैप्सूल', benefits='तनाव कम करे, ऊर्जा')
+        self.amla = self.make('Amla Juice', 'आंवला रस', description='Rich in vitamin C, pairs with triphala')
+
+    def make(self, name, hindi_name, description='Ayurvedic formula', benefits='लाभ', ingredients='Herbs', **extra):
+        return Product.objects.create(
+            name=name, hindi_name=hindi_name, slug=name.lower().replace(' ', '-'), sku=name[:6],
+            description=description, benefits=benefits, ingredients=ingredients, price=100,
+            category=self.category, dosha_type='tridosha', image='products/p.png', **extra,
+        )
+
+    def slugs(self, query):
+        resp = self.client.get('/api/products/search/', {'q': query})
+        self.assertEqual(resp.status_code, 200)
+        return [p['slug'] for p in resp.json()['results']]
+
+    def test_name_match_ranks_above_description_match(self):
+        self.assertEqual(self.slugs('triphala'), ['triphala-churna', 'amla-juice'])
+
+    def test_prefix_match_on_last_token(self):
+        self.assertEqual(self.slugs('ashwa'), ['ashwagandha-capsule'])
+
+    def test_hindi_name_and_benefits(self):
+        self.assertEqual(self.slugs('त्रिफला'), ['triphala-churna'])
+        self.assertEqual(self.slugs('तनाव'), ['ashwagandha-capsule'])
+
+    def test_all_tokens_must_match(self):
+        self.assertEqual(self.slugs('amla haritaki'), ['triphala-churna'])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.slugs('"amla" * (juice'), ['amla-juice'])
+        self.assertEqual(self.slugs(''), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.amla.name = 'Gooseberry Juice'
+        self.amla.save()
+        self.assertEqual(self.slugs('amla'), ['triphala-churna'])
+        self.assertEqual(self.slugs('gooseberry'), ['amla-juice'])
+        self.amla.delete()
+        self.assertEqual(self.slugs('gooseberry'), [])
+
+    def test_inactive_products_are_hidden(self):
+        self.triphala.status = 'inactive'
+        self.triphala.save()
+        self.assertEqual(self.slugs('triphala'), ['amla-juice'])
+
+    def test_rebuild_after_bulk_create(self):
+        Product.objects.bulk_create([Product(
+            name='Brahmi Tablet', slug='brahmi-tablet', sku='BRT-1', description='d', benefits='b',
+            ingredients='Brahmi', price=10, category=self.category, dosha_type='vata', image='products/p.png',
+        )])
+        self.assertEqual(search.ranked_ids('brahmi'), [])
+        call_command('rebuild_search_index', stdout=open('/dev/null', 'w'))
+        self.assertEqual(self.slugs('brahmi'), ['brahmi-tablet'])
+
+    def test_search_products_respects_queryset_filters(self):
+        self.amla.dosha_type = 'pitta'
+        self.amla.save()
+        results = search.search_products('triphala', Product.objects.filter(dosha_type='pitta'))
+        self.assertEqual(results, [self.amla])
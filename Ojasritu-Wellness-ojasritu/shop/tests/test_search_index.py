@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from shop.models import Category, Product
+from shop.search_index import normalize, product_index
+
+
+class NormalizeTests(TestCase):
+    def test_devanagari_spelling_variants_fold_together(self):
+        self.assertEqual(normalize('अश्वगन्धा'), normalize('अश्वगंधा'))   # nasal cluster vs anusvara
+        self.assertEqual(normalize('फ़ल'), normalize('फल'))               # nukta
+        self.assertEqual(normalize('आँवला'), normalize('आंवला'))           # chandrabindu
+        self.assertEqual(normalize('नीम'), normalize('निम'))               # long vs short matra
+
+    def test_latin_case_and_diacritics(self):
+        self.assertEqual(normalize('Āyurveda'), 'ayurveda')
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.powders = Category.objects.create(name='Ayurvedic Powders', hindi_name='चूर्ण', slug='powders')
+        self.oils = Category.objects.create(name='Herbal Oils', hindi_name='तेल', slug='oils')
+        self.triphala = self.make('Triphala Churna', 'त्रिफला चूर्ण', self.powders, ingredients='Amla, Haritaki')
+        self.ashwagandha = self.make('Ashwagandha Capsule', 'अश्वगंधा कैप्सूल', self.powders,
+                                     benefits='तनाव कम करे')
+        self.bhringraj = self.make('Bhringraj Hair Tonic', 'भृंगराज', self.oils, description='For strong hair')
+
+    def make(self, name, hindi_name, category, description='Ayurvedic formula', benefits='लाभ', ingredients='Herbs'):
+        return Product.objects.create(
+            name=name, hindi_name=hindi_name, slug=name.lower().replace(' ', '-'), sku=name[:6],
+            description=description, benefits=benefits, ingredients=ingredients, price=100,
+            category=category, dosha_type='tridosha', image='products/p.png',
+        )
+
+    def slugs(self, query):
+        resp = self.client.get('/api/products/search/', {'q': query})
+        self.assertEqual(resp.status_code, 200)
+        return [p['slug'] for p in resp.json()['results']]
+
+    def test_typo_tolerance(self):
+        self.assertEqual(self.slugs('triphla'), ['triphala-churna'])
+        self.assertEqual(self.slugs('aswagandha'), ['ashwagandha-capsule'])
+
+    def test_hindi_variant_spelling(self):
+        self.assertEqual(self.slugs('अश्वगन्धा'), ['ashwagandha-capsule'])
+        self.assertEqual(self.slugs('तनाव'), ['ashwagandha-capsule'])
+
+    def test_prefix_and_category_terms(self):
+        self.assertEqual(self.slugs('bhring'), ['bhringraj-hair-tonic'])
+        self.assertEqual(self.slugs('herbal oil'), ['bhringraj-hair-tonic'])
+
+    def test_name_outranks_category(self):
+        self.assertEqual(self.slugs('churna')[0], 'triphala-churna')
+
+    def test_warm_queries_do_not_touch_the_database(self):
+        self.slugs('triphala')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.slugs('amla'), ['triphala-churna'])
+        resp = self.client.get('/api/products/search/', {'q': 'amla'})
+        self.assertTrue(resp.json()['results'][0]['image'].startswith('http://testserver/'))
+
+    def test_incremental_updates(self):
+        self.slugs('triphala')
+        self.triphala.name = 'Haritaki Churna'
+        self.triphala.save()
+        self.bhringraj.status = 'inactive'
+        self.bhringraj.save()
+        self.oils.name = 'Massage Oils'
+        self.oils.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.slugs('triphala'), [])
+            self.assertEqual(self.slugs('haritaki'), ['triphala-churna'])
+            self.assertEqual(self.slugs('bhringraj'), [])
+        self.ashwagandha.delete()
+        self.assertEqual(self.slugs('ashwagandha'), [])
+
+    def test_foreign_version_bump_triggers_rebuild(self):
+        self.slugs('triphala')
+        Product.objects.filter(pk=self.triphala.pk).update(name='Guduchi Churna')
+        cache.incr('catalog:version')  # as another worker would
+        self.assertEqual(self.slugs('guduchi'), ['triphala-churna'])
+        self.assertIsNotNone(product_index._version)
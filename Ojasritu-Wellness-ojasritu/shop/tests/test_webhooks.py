@@ -0,0 +1,124 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from shop import webhooks
+from shop.models import Order, WebhookEvent
+
+
+class WebhookInboxTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(username='buyer', email='b@example.com')
+        self.orders = [
+            Order.objects.create(
+                order_id=f'ORD-{i}', customer=self.user, total_amount=100, final_amount=100,
+                payment_method='cashfree', cashfree_order_id=f'cf-{i}',
+            )
+            for i in range(3)
+        ]
+
+    def post(self, payload, signature_ok=True):
+        with mock.patch('shop.api.verify_signature', return_value=signature_ok):
+            return self.client.post(
+                '/api/cashfree/webhook/', json.dumps(payload), content_type='application/json',
+                HTTP_X_CASHFREE_SIGNATURE='sig',
+            )
+
+    def state(self, order):
+        order.refresh_from_db()
+        return order.payment_status, order.status
+
+    def test_webhook_is_stored_not_applied(self):
+        response = self.post({'order_id': 'cf-0', 'payment_status': 'SUCCESS'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.state(self.orders[0]), ('pending', 'pending'))
+        event = WebhookEvent.objects.get()
+        self.assertEqual((event.dedupe_key, event.payment_status), ('cf-0:paid', 'paid'))
+        self.assertIn('cf-0', event.body)
+        self.assertNotIn('Authorization', event.headers)
+        self.assertEqual(event.headers['X-Cashfree-Signature'], 'sig')
+
+    def test_retries_collapse_to_one_event(self):
+        for _ in range(3):
+            self.assertEqual(self.post({'order_id': 'cf-0', 'payment_status': 'PAID'}).status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_bad_signature_and_missing_fields_are_not_stored(self):
+        self.assertEqual(self.post({'order_id': 'cf-0', 'payment_status': 'PAID'}, signature_ok=False).status_code, 403)
+        self.assertEqual(self.post({'order_id': 'cf-0'}).status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_nested_payload_shape(self):
+        self.post({'type': 'PAYMENT_SUCCESS_WEBHOOK',
+                   'data': {'order': {'order_id': 'cf-1'}, 'payment': {'payment_status': 'SUCCESS'}}})
+        self.assertEqual(WebhookEvent.objects.get().dedupe_key, 'cf-1:paid')
+
+    def test_batch_is_applied_in_bulk(self):
+        self.post({'order_id': 'cf-0', 'payment_status': 'SUCCESS'})
+        self.post({'order_id': 'cf-1', 'payment_status': 'FAILED'})
+        self.post({'order_id': 'cf-2', 'payment_status': 'PENDING'})
+        self.post({'order_id': 'cf-missing', 'payment_status': 'SUCCESS'})
+        # claim, orders, one order bulk_update, a commit and a release for
+        # the whole batch (each in its own savepoint), one stamp per outcome
+        with self.assertNumQueries(17):
+            self.assertEqual(webhooks.process_batch(), (4, 0))
+        self.assertEqual(self.state(self.orders[0]), ('paid', 'completed'))
+        self.assertEqual(self.state(self.orders[1]), ('failed', 'cancelled'))
+        self.assertEqual(self.state(self.orders[2]), ('pending', 'pending'))
+        outcomes = dict(WebhookEvent.objects.values_list('order_ref', 'outcome'))
+        self.assertEqual(outcomes, {'cf-0': 'applied', 'cf-1': 'applied', 'cf-2': 'ignored', 'cf-missing': 'unknown_order'})
+        self.assertEqual(webhooks.process_batch(), (0, 0))
+
+    def test_late_failure_does_not_downgrade_paid_order(self):
+        self.post({'order_id': 'cf-0', 'payment_status': 'FAILED'})
+        self.post({'order_id': 'cf-0', 'payment_status': 'SUCCESS'})
+        webhooks.drain()
+        self.assertEqual(self.state(self.orders[0]), ('paid', 'completed'))
+
+        self.post({'order_id': 'cf-1', 'payment_status': 'SUCCESS'})
+        webhooks.drain()
+        self.post({'order_id': 'cf-1', 'payment_status': 'FAILED'})
+        webhooks.drain()
+        self.assertEqual(self.state(self.orders[1]), ('paid', 'completed'))
+        self.assertEqual(WebhookEvent.objects.get(dedupe_key='cf-1:failed').outcome, 'ignored')
+
+    def test_failing_batch_is_retried_then_parked(self):
+        self.post({'order_id': 'cf-0', 'payment_status': 'SUCCESS'})
+        with mock.patch('shop.webhooks.inventory.commit_orders', side_effect=RuntimeError('boom')):
+            self.assertEqual(webhooks.drain(), (0, webhooks.MAX_ATTEMPTS))
+        event = WebhookEvent.objects.get()
+        self.assertEqual((event.attempts, event.processed_at, event.last_error), (webhooks.MAX_ATTEMPTS, None, 'boom'))
+        self.assertEqual(self.state(self.orders[0]), ('pending', 'pending'))
+
+    def test_bad_event_does_not_park_its_batch(self):
+        for i in range(3):
+            self.post({'order_id': f'cf-{i}', 'payment_status': 'SUCCESS'})
+        poison = self.orders[1].pk
+        commit_orders = webhooks.inventory.commit_orders
+
+        def commit(order_ids):
+            if poison in order_ids:
+                raise RuntimeError('bad event')
+            return commit_orders(order_ids)
+
+        with mock.patch('shop.webhooks.inventory.commit_orders', side_effect=commit):
+            self.assertEqual(webhooks.drain(), (2, webhooks.MAX_ATTEMPTS))
+        self.assertEqual(self.state(self.orders[0]), ('paid', 'completed'))
+        self.assertEqual(self.state(self.orders[2]), ('paid', 'completed'))
+        self.assertEqual(self.state(self.orders[1]), ('pending', 'pending'))
+        events = {e.order_ref: e for e in WebhookEvent.objects.all()}
+        self.assertEqual((events['cf-0'].attempts, events['cf-2'].attempts), (0, 0))
+        self.assertEqual((events['cf-1'].attempts, events['cf-1'].processed_at), (webhooks.MAX_ATTEMPTS, None))
+
+    def test_command_drains_inbox(self):
+        self.post({'order_id': 'cf-0', 'payment_status': 'SUCCESS'})
+        out = StringIO()
+        call_command('process_webhooks', stdout=out)
+        self.assertIn('Processed 1 webhook events (0 failed)', out.getvalue())
+        self.assertEqual(self.state(self.orders[0]), ('paid', 'completed'))
@@ -9,10 +9,14 @@ from .api import (
     add_to_cart,
     get_cart,
     remove_from_cart,
+    cart_batch,
+    cashfree_create_order,
+    cashfree_webhook,
     create_prebooking,
     create_prebooking_from_cart,
     LogoutAPIView,
     ojas_gurukul_notify,
+    catalog_cache_status,
 )
 
 # Include the DRF router first (provides: products, categories, orders, etc.)
@@ -44,6 +48,11 @@ urlpatterns += [
     path('cart/add/', add_to_cart, name='api-cart-add'),
     path('cart/', get_cart, name='api-cart-get'),
     path('cart/remove/<int:item_id>/', remove_from_cart, name='api-cart-remove'),
+    path('cart/batch/', cart_batch, name='api-cart-batch'),
+
+    # Cashfree checkout (reserves stock, see shop/inventory.py) and webhook
+    path('cashfree/create/', cashfree_create_order, name='api-cashfree-create'),
+    path('cashfree/webhook/', cashfree_webhook, name='api-cashfree-webhook'),
 
     # Pre-booking endpoints
     path('prebook/', create_prebooking, name='api-prebook'),
@@ -52,6 +61,9 @@ urlpatterns += [
     # Ojas Gurukul notify
     path('ojas-gurukul/notify/', ojas_gurukul_notify, name='api-ojas-gurukul-notify'),
 
+    # Catalog cache counters (staff only)
+    path('catalog/cache-stats/', catalog_cache_status, name='api-catalog-cache-stats'),
+
     # Legacy logout endpoint
     path('logout/', LogoutAPIView.as_view(), name='api-logout'),
 ]
@@ -1,5 +1,6 @@
 from django.shortcuts import render, redirect
 from django.shortcuts import get_object_or_404
+from .carts import SESSION_CART_KEY
 from .models import Product
 from django.conf import settings
 from django.http import JsonResponse, HttpResponse
@@ -31,15 +32,16 @@ def product_list(request):
     dosha = request.GET.get('dosha')
     bestseller = request.GET.get('bestseller')
 
-    if search:
-        from django.db.models import Q
-        qs = qs.filter(Q(name__icontains=search) | Q(description__icontains=search))
     if category:
         qs = qs.filter(category__slug=category)
     if dosha:
         qs = qs.filter(dosha_type=dosha)
     if bestseller:
         qs = qs.filter(is_bestseller=True)
+    if search:
+        # Indexed, ranked search instead of icontains scans (see shop/search.py)
+        from .search import search_products
+        qs = search_products(search, qs)
 
     return render(request, "products.html", {"products": qs})
 
@@ -67,17 +69,17 @@ def add_to_cart(request, product_id):
         Product.objects.get(pk=product_id)
     except Product.DoesNotExist:
         return HttpResponse("Product not found", status=404)
-    cart = request.session.get('cart', {})
+    cart = request.session.get(SESSION_CART_KEY, {})
     cart[str(product_id)] = cart.get(str(product_id), 0) + 1
-    request.session['cart'] = cart
+    request.session[SESSION_CART_KEY] = cart
     return redirect('cart')
 
 
 def remove_from_cart(request, item_id):
     """Remove an item from the session cart by product id and redirect."""
-    cart = request.session.get('cart', {})
+    cart = request.session.get(SESSION_CART_KEY, {})
     cart.pop(str(item_id), None)
-    request.session['cart'] = cart
+    request.session[SESSION_CART_KEY] = cart
     return redirect('cart')
 
 
@@ -0,0 +1,169 @@
+"""Durable inbox for Cashfree payment webhooks.
+
+``cashfree_webhook`` only verifies the signature and appends the raw event
+to ``WebhookEvent`` with ``INSERT ... ON CONFLICT DO NOTHING`` on
+``order id:status``, then answers 200, so Cashfree's retries cost one
+index probe and never reach order code. ``manage.py process_webhooks``
+drains the inbox: each batch is claimed with
+``SELECT ... FOR UPDATE SKIP LOCKED`` (several workers can run), folded to
+one transition per order and applied with one ``bulk_update`` plus one
+stock commit and one stock release for the whole batch. A batch that
+fails is bisected so one bad event cannot hold back the rest.
+"""
+import logging
+from collections import OrderedDict
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import inventory
+from .cashfree import normalize_status
+from .models import Order, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+# A later event never moves an order back down this ladder
+_RANK = {'pending': 0, 'failed': 1, 'paid': 2}
+_ORDER_STATUS = {'paid': 'completed', 'failed': 'cancelled'}
+_STORED_HEADERS_EXCLUDE = {'cookie', 'authorization'}
+
+
+def parse(payload):
+    """Return ``(order_id, raw_status)`` from a flat or a 2023-08-01 style payload."""
+    data = payload.get('data') if isinstance(payload.get('data'), dict) else {}
+    order_id = payload.get('order_id') or (data.get('order') or {}).get('order_id')
+    raw_status = payload.get('payment_status') or (data.get('payment') or {}).get('payment_status')
+    return order_id, raw_status
+
+
+def record(raw_body, headers, order_id, raw_status):
+    """Append an event to the inbox; a repeat of a stored event is a no-op."""
+    status = normalize_status(raw_status)
+    WebhookEvent.objects.bulk_create([WebhookEvent(
+        dedupe_key=f'{order_id}:{status}', order_ref=order_id, payment_status=status,
+        body=raw_body.decode('utf-8', errors='replace'),
+        headers={k: v for k, v in headers.items() if k.lower() not in _STORED_HEADERS_EXCLUDE},
+    )], ignore_conflicts=True)
+
+
+def _claim(batch_size):
+    queryset = WebhookEvent.objects.filter(processed_at__isnull=True, attempts__lt=MAX_ATTEMPTS).order_by('id')
+    if connection.features.has_select_for_update_skip_locked:
+        queryset = queryset.select_for_update(skip_locked=True)
+    return list(queryset.only('id', 'order_ref', 'payment_status')[:batch_size])
+
+
+def apply_statuses(statuses):
+    """Move orders to the gateway's ``{cashfree_order_id: status}`` in bulk.
+
+    Only upgrades along ``pending -> failed -> paid`` are written, with one
+    ``bulk_update`` and one stock commit/release for the lot. Must run
+    inside a transaction; returns ``(found, applied)`` sets of order refs.
+    """
+    orders = Order.objects.filter(cashfree_order_id__in=list(statuses)).order_by().select_for_update()
+    orders = {o.cashfree_order_id: o for o in orders.only('id', 'cashfree_order_id', 'payment_status', 'status')}
+    changed, paid, failed = [], [], []
+    now = timezone.now()
+    for ref, status in statuses.items():
+        order = orders.get(ref)
+        if order is None or status == 'pending' or _RANK[order.payment_status] >= _RANK[status]:
+            continue
+        order.payment_status = status
+        order.status = _ORDER_STATUS[status]
+        order.updated_at = now
+        changed.append(order)
+        (paid if status == 'paid' else failed).append(order.pk)
+
+    if changed:
+        Order.objects.bulk_update(changed, ['payment_status', 'status', 'updated_at'], batch_size=500)
+    if paid:
+        inventory.commit_orders(paid)
+    if failed:
+        inventory.release_orders(failed)
+    return set(orders), {o.cashfree_order_id for o in changed}
+
+
+def _apply(events):
+    """Fold ``events`` into one transition per order and apply them."""
+    target = OrderedDict()
+    for event in events:
+        current = target.get(event.order_ref, 'pending')
+        if _RANK.get(event.payment_status, 0) > _RANK[current]:
+            target[event.order_ref] = event.payment_status
+        else:
+            target.setdefault(event.order_ref, current)
+
+    found, applied = apply_statuses(target)
+    outcomes = {}
+    for event in events:
+        if event.order_ref not in found:
+            outcome = 'unknown_order'
+        elif event.order_ref in applied and target[event.order_ref] == event.payment_status:
+            outcome = 'applied'
+        else:
+            outcome = 'ignored'
+        outcomes.setdefault(outcome, []).append(event.pk)
+    return outcomes
+
+
+def _stamp(outcomes):
+    now = timezone.now()
+    for outcome, ids in outcomes.items():
+        WebhookEvent.objects.filter(pk__in=ids).update(processed_at=now, outcome=outcome)
+        if outcome == 'unknown_order':
+            logger.error('Webhook for non-existent order(s): %s', ids)
+
+
+def _apply_isolating(events):
+    """Apply ``events`` in a savepoint, bisecting on failure.
+
+    Returns ``(handled, failures)`` where ``failures`` pairs each event that
+    fails on its own with its exception; every other event is applied.
+    """
+    try:
+        with transaction.atomic():
+            _stamp(_apply(events))
+        return len(events), []
+    except Exception as e:
+        if len(events) == 1:
+            logger.exception('Webhook event %s failed', events[0].pk)
+            return 0, [(events[0], e)]
+    middle = len(events) // 2
+    handled, failures = _apply_isolating(events[:middle])
+    more, more_failures = _apply_isolating(events[middle:])
+    return handled + more, failures + more_failures
+
+
+def process_batch(batch_size=200):
+    """Claim and apply up to ``batch_size`` events; returns ``(handled, failed)``.
+
+    A failing batch is split until the failing events are isolated; only
+    those count an attempt and are parked after ``MAX_ATTEMPTS``.
+    """
+    with transaction.atomic():
+        events = _claim(batch_size)
+        if not events:
+            return 0, 0
+        handled, failures = _apply_isolating(events)
+        for event, error in failures:
+            WebhookEvent.objects.filter(pk=event.pk).update(
+                attempts=F('attempts') + 1, last_error=str(error)[:2000],
+            )
+        return handled, len(failures)
+
+
+def drain(batch_size=200):
+    """Process batches until the inbox is empty; returns ``(handled, failed)``.
+
+    Failing events are retried until they reach ``MAX_ATTEMPTS`` and drop
+    out of the claim query, so this always terminates.
+    """
+    handled = failed = 0
+    while True:
+        count, errors = process_batch(batch_size)
+        if not count and not errors:
+            return handled, failed
+        handled += count
+        failed += errors
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 import dj_database_url
+from corsheaders.defaults import default_headers as default_cors_headers
 
 # =========================
 # BASE
@@ -139,6 +140,8 @@ if _railway_host:
     CORS_ALLOWED_ORIGINS.append(f"https://{_railway_host}")
 
 CORS_ALLOW_CREDENTIALS = True
+# Checkout sends Idempotency-Key (shop/idempotency.py)
+CORS_ALLOW_HEADERS = (*default_cors_headers, "idempotency-key")
 
 # =========================
 # CSRF CONFIG (🔥 FINAL FIX)
@@ -268,12 +271,31 @@ CACHES = {
     }
 }
 
+# LocMemCache is per process, so a catalog version bump in one gunicorn worker
+# is invisible to the others. Point REDIS_URL at a shared Redis in production.
+if os.getenv("REDIS_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL"),
+    }
+
+# Catalog listings are keyed on a version number bumped by shop/signals.py,
+# so this only bounds how long superseded entries linger.
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", "600"))
+
+# /api/products/search/ backend: "memory" (in-process index, shop/search_index.py)
+# or "database" (Postgres tsvector / SQLite FTS5, shop/search.py)
+PRODUCT_SEARCH_BACKEND = os.getenv("PRODUCT_SEARCH_BACKEND", "memory")
+
 # Session configuration for performance
 SESSION_CACHE_ALIAS = "default"
 
 # Media files configuration
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Fixed origin for absolute media URLs in API responses (e.g. a CDN domain).
+# Empty: use the scheme and host of each request (see shop/media.py).
+MEDIA_PUBLIC_ORIGIN = os.getenv("MEDIA_PUBLIC_ORIGIN", "")
 
 # Add MEDIA_URL to CORS origins
 if f"https://{os.getenv('RAILWAY_PUBLIC_DOMAIN', 'ojasritu.co.in')}" not in CORS_ALLOWED_ORIGINS:
@@ -314,6 +336,29 @@ SOCIALACCOUNT_ADAPTER = "allauth.socialaccount.adapters.DefaultSocialAccountAdap
 CASHFREE_APP_ID = os.getenv("CASHFREE_APP_ID", "")
 CASHFREE_SECRET_KEY = os.getenv("CASHFREE_SECRET_KEY", "")
 CASHFREE_ENV = os.getenv("CASHFREE_ENV", "TEST")  # "TEST" or "PROD"
+# Pooled gateway client (shop/cashfree.py): timeouts in seconds, pool size
+# per worker process; only idempotent GETs are retried
+CASHFREE_CONNECT_TIMEOUT = float(os.getenv("CASHFREE_CONNECT_TIMEOUT", "3.05"))
+CASHFREE_READ_TIMEOUT = float(os.getenv("CASHFREE_READ_TIMEOUT", "10"))
+CASHFREE_POOL_SIZE = int(os.getenv("CASHFREE_POOL_SIZE", "10"))
+CASHFREE_MAX_RETRIES = int(os.getenv("CASHFREE_MAX_RETRIES", "3"))
+# Threads per process allowed to wait on Cashfree at once; keep it below
+# GUNICORN_THREADS so catalog requests always have threads left
+CASHFREE_MAX_CONCURRENT = int(os.getenv("CASHFREE_MAX_CONCURRENT", "4"))
+# Gateway base URL override (e.g. a local stand-in for load tests)
+CASHFREE_API_BASE = os.getenv("CASHFREE_API_BASE", "")
+# Idempotency-Key records for order creation (purge_idempotency_keys)
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+# Stock is held this long for a pending checkout before the sweeper
+# (manage.py release_expired_reservations) returns it
+STOCK_RESERVATION_TTL_MINUTES = int(os.getenv("STOCK_RESERVATION_TTL_MINUTES", "15"))
+# manage.py reconcile_payments: orders pending longer than this are checked
+# against Cashfree, at most CASHFREE_RECONCILE_RATE status calls per second
+PAYMENT_RECONCILE_AFTER_MINUTES = int(os.getenv("PAYMENT_RECONCILE_AFTER_MINUTES", "30"))
+# ...and an order Cashfree still reports as unpaid (or does not know) is not
+# asked about again for this long
+PAYMENT_RECONCILE_RECHECK_MINUTES = int(os.getenv("PAYMENT_RECONCILE_RECHECK_MINUTES", "360"))
+CASHFREE_RECONCILE_RATE = float(os.getenv("CASHFREE_RECONCILE_RATE", "10"))
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = "no-reply@ojasritu.co.in"
@@ -326,6 +371,9 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
-    ]
+    ],
+    # Seek-based cursor pagination over each model's Meta.ordering (see shop/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'shop.pagination.KeysetPagination',
+    'PAGE_SIZE': 24,
 }
 